@@ -1,6 +1,6 @@
 import { createResource } from "frappe-ui"
 import { computed, ref, toRaw } from "vue"
-import { isOffline } from "@/utils/offline"
+import { generateOfflineId, isOffline } from "@/utils/offline"
 import { useSerialNumberStore } from "@/stores/serialNumber"
 
 
@@ -56,6 +56,17 @@ export function useInvoice() {
 		},
 	})
 
+	const submitInvoiceAsyncResource = createResource({
+		url: "pos_next.api.invoice_submissions.submit_invoice_async",
+		makeParams(params) {
+			return {
+				invoice: JSON.stringify(params.invoice),
+				data: JSON.stringify(params.data || {}),
+			}
+		},
+		auto: false,
+	})
+
 	const validateCartItemsResource = createResource({
 		url: "pos_next.api.invoices.validate_cart_items",
 		makeParams({ items, pos_profile }) {
@@ -701,11 +712,20 @@ export function useInvoice() {
 		return result?.data || result
 	}
 
-	async function submitInvoice(targetDoctype = "Sales Invoice", deliveryDate = null) {
+	async function submitInvoice(
+		targetDoctype = "Sales Invoice",
+		deliveryDate = null,
+		reservationId = null,
+		background = false,
+	) {
 		/**
 		 * Two-step submission process:
 		 * 1. Create/update draft invoice
 		 * 2. Validate stock and submit
+		 *
+		 * With background submission (Sales Invoice only) the server validates and
+		 * queues the invoice in one call and returns a receipt token; the outcome
+		 * arrives later (see useInvoiceSubmissions).
 		 */
 		try {
 			// Step 1: Create invoice draft
@@ -764,6 +784,31 @@ export function useInvoice() {
 				}))
 			}
 
+			const submitData = {
+				change_amount:
+					remainingAmount.value < 0 ? Math.abs(remainingAmount.value) : 0,
+			}
+
+			// Lets the server exclude this cart's own stock reservation
+			if (reservationId) {
+				submitData.reservation_id = reservationId
+			}
+
+			if (background && targetDoctype === "Sales Invoice") {
+				// Generated here so a retried request is recognised as the same sale
+				invoiceData.posa_offline_id = generateOfflineId()
+				const queued = await submitInvoiceAsyncResource.submit({
+					invoice: invoiceData,
+					data: submitData,
+				})
+				resetInvoice()
+				return {
+					...queued,
+					name: queued.sales_invoice,
+					grand_total: queued.result?.grand_total,
+				}
+			}
+
 			const draftInvoice = await updateInvoiceResource.submit({
 				data: invoiceData,
 			})
@@ -783,11 +828,6 @@ export function useInvoice() {
 				)
 			}
 
-			const submitData = {
-				change_amount:
-					remainingAmount.value < 0 ? Math.abs(remainingAmount.value) : 0,
-			}
-
 			try {
 				const result = await submitInvoiceResource.submit({
 					invoice: invoiceDoc,
@@ -1040,6 +1080,7 @@ export function useInvoice() {
 		// Resources
 		updateInvoiceResource,
 		submitInvoiceResource,
+		submitInvoiceAsyncResource,
 		validateCartItemsResource,
 		applyOffersResource,
 		getItemDetailsResource,
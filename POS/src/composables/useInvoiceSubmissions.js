@@ -0,0 +1,129 @@
+/**
+ * @fileoverview Background Invoice Submission Tracking
+ *
+ * Reports the outcome of invoices queued with submit_invoice_async (POS Settings
+ * "Allow Submissions in Background Job"). The server publishes a
+ * "pos_invoice_submission" event once a queued invoice is submitted or fails.
+ * Tracked receipt tokens are also polled with get_submission_status, so an
+ * event missed while the socket was down still resolves. A failed invoice
+ * (already paid at the till) can be queued again with requeueSubmission.
+ *
+ * @module composables/useInvoiceSubmissions
+ */
+
+import { call } from "@/utils/apiWrapper"
+import { logger } from "@/utils/logger"
+
+const log = logger.create("InvoiceSubmissions")
+
+const EVENT_NAME = "pos_invoice_submission"
+const POLL_INTERVAL_MS = 5000
+const FINAL_STATUSES = new Set(["Completed", "Failed"])
+
+/** @type {Set<Function>} Registered completion handlers */
+const completionHandlers = new Set()
+
+/** @type {Map<string, NodeJS.Timeout>} Poll timers per tracked receipt token */
+const trackedTokens = new Map()
+
+let isListening = false
+
+/**
+ * Hand a final status of a tracked token to the handlers, once
+ * @param {Object} status - {token, status, sales_invoice, result, error}
+ */
+function settle(status) {
+	if (!FINAL_STATUSES.has(status?.status) || !trackedTokens.has(status.token)) {
+		return
+	}
+
+	clearInterval(trackedTokens.get(status.token))
+	trackedTokens.delete(status.token)
+
+	completionHandlers.forEach((handler) => {
+		try {
+			handler(status)
+		} catch (error) {
+			log.error("Submission handler failed", { token: status.token, error: error.message })
+		}
+	})
+}
+
+async function poll(token) {
+	try {
+		settle(await call("pos_next.api.invoice_submissions.get_submission_status", { token }))
+	} catch (error) {
+		log.warn("Submission status check failed", { token, error: error.message })
+	}
+}
+
+function startListening() {
+	if (isListening || !window.frappe?.realtime) {
+		return
+	}
+
+	window.frappe.realtime.on(EVENT_NAME, settle)
+	isListening = true
+}
+
+function stopListening() {
+	if (!isListening) {
+		return
+	}
+
+	window.frappe?.realtime?.off(EVENT_NAME, settle)
+	isListening = false
+}
+
+/**
+ * Composable for invoices submitted in the background
+ * @returns {Object} Composable API
+ */
+export function useInvoiceSubmissions() {
+	/**
+	 * Follow a queued invoice until it is submitted or fails
+	 * @param {string} token - Receipt token returned by submit_invoice_async
+	 */
+	function trackSubmission(token) {
+		if (!token || trackedTokens.has(token)) {
+			return
+		}
+
+		startListening()
+		trackedTokens.set(token, setInterval(() => poll(token), POLL_INTERVAL_MS))
+	}
+
+	/**
+	 * Register a handler for the outcome of tracked invoices
+	 * @param {Function} handler - (status) => void, status.status is "Completed" or "Failed"
+	 * @returns {Function} Cleanup function to unregister handler
+	 */
+	function onSubmissionComplete(handler) {
+		completionHandlers.add(handler)
+		startListening()
+
+		return () => {
+			completionHandlers.delete(handler)
+			if (completionHandlers.size === 0) {
+				stopListening()
+			}
+		}
+	}
+
+	/**
+	 * Queue a failed invoice for submission again and follow it
+	 * @param {string} token - Receipt token of the failed invoice
+	 * @returns {Promise<Object>} The submission status
+	 */
+	async function requeueSubmission(token) {
+		const status = await call("pos_next.api.invoice_submissions.requeue_submission", { token })
+		trackSubmission(token)
+		return status
+	}
+
+	return {
+		trackSubmission,
+		onSubmissionComplete,
+		requeueSubmission,
+	}
+}
@@ -3,7 +3,16 @@
  *
  * Listens to Socket.IO events for stock changes and notifies registered handlers.
  * Provides intelligent event management with deduplication and batching.
- * Each handler is responsible for filtering by warehouse and updating its cache.
+ * Stock events are published to per-warehouse rooms (doc:Warehouse/<name>), so
+ * terminals only receive them after subscribing to their warehouse(s) with
+ * subscribeWarehouses(). Handlers still filter by warehouse before applying.
+ *
+ * Each warehouse's events carry an increasing sequence number. A gap, or a
+ * reconnect, replays the missed events from the server; when they are too old
+ * to replay, resync handlers are asked to reload that warehouse's stock.
+ *
+ * In delta mode an update carries a signed "delta" instead of actual_qty;
+ * handlers apply it to the quantity they hold.
  *
  * Performance optimization: Batch delay and size are dynamically adjusted
  * based on device CPU cores and performance tier.
@@ -11,6 +20,7 @@
 
 import { performanceConfig } from "@/utils/performanceConfig"
 import { logger } from "@/utils/logger"
+import { call } from "@/utils/apiWrapper"
 import { ref } from "vue"
 
 const log = logger.create('RealtimeStock')
@@ -19,6 +29,11 @@ const log = logger.create('RealtimeStock')
 const isListening = ref(false)
 const eventHandlers = new Set()
 const pendingUpdates = new Map()
+const subscribedWarehouses = new Set()
+const resyncHandlers = new Set()
+const lastSeq = new Map() // warehouse -> last applied sequence number
+const catchingUp = new Set()
+const catchUpAgain = new Set()
 let batchTimeout = null
 
 /**
@@ -76,6 +91,37 @@ function scheduleBatchUpdate() {
 	}, BATCH_DELAY_MS)
 }
 
+/**
+ * Add updates to pending batch (deduplicate by item_code + warehouse)
+ * Delta updates ({item_code, warehouse, delta}) are folded into the update
+ * already pending for the same item, so none of them is lost.
+ */
+function queueUpdates(stockUpdates) {
+	stockUpdates.forEach((update) => {
+		const key = `${update.item_code}|${update.warehouse}`
+		const pending = pendingUpdates.get(key)
+
+		if (update.delta !== undefined && pending) {
+			if (pending.delta !== undefined) {
+				pendingUpdates.set(key, { ...pending, delta: pending.delta + update.delta })
+			} else {
+				const qty = (pending.actual_qty ?? pending.stock_qty ?? 0) + update.delta
+				pendingUpdates.set(key, {
+					...pending,
+					actual_qty: qty,
+					stock_qty: qty,
+					available_qty: qty - (pending.reserved_qty || 0),
+				})
+			}
+			return
+		}
+
+		pendingUpdates.set(key, update)
+	})
+
+	scheduleBatchUpdate()
+}
+
 /**
  * Handle incoming stock update event
  */
@@ -84,13 +130,78 @@ function handleStockUpdate(data) {
 		return
 	}
 
-	// Add updates to pending batch (deduplicate by item_code + warehouse)
-	data.stock_updates.forEach((update) => {
-		const key = `${update.item_code}|${update.warehouse}`
-		pendingUpdates.set(key, update)
-	})
+	const warehouse = data.warehouses?.[0]
+	if (data.seq && warehouse) {
+		const last = lastSeq.get(warehouse)
+		if (last !== undefined) {
+			// Already applied (e.g. through a replay)
+			if (data.seq <= last) {
+				return
+			}
+			// Missed events: the replay includes this one
+			if (data.seq > last + 1) {
+				catchUp(warehouse)
+				return
+			}
+		}
+		lastSeq.set(warehouse, data.seq)
+	}
 
-	scheduleBatchUpdate()
+	queueUpdates(data.stock_updates)
+}
+
+/**
+ * Replay the events a warehouse missed since the last applied sequence number.
+ * Without a known sequence number this only records the current one.
+ */
+async function catchUp(warehouse) {
+	if (catchingUp.has(warehouse)) {
+		catchUpAgain.add(warehouse)
+		return
+	}
+
+	catchingUp.add(warehouse)
+	const since = lastSeq.get(warehouse)
+
+	try {
+		const response = await call("pos_next.api.stock_events.get_stock_events_since", {
+			warehouse,
+			seq: since ?? null,
+		})
+		const result = response?.message || response
+		if (!result || !subscribedWarehouses.has(warehouse)) {
+			return
+		}
+
+		if (result.resync) {
+			log.info(`Stock events for ${warehouse} too old to replay, resyncing`)
+			lastSeq.set(warehouse, result.seq)
+			resyncHandlers.forEach((handler) => {
+				try {
+					handler(warehouse)
+				} catch (error) {
+					log.error("Resync handler error", error)
+				}
+			})
+			return
+		}
+
+		// Events up to the last applied sequence may have arrived live meanwhile
+		const applied = lastSeq.get(warehouse) ?? 0
+		;(result.events || []).forEach((event) => {
+			if (event.seq > applied && event.message?.stock_updates) {
+				queueUpdates(event.message.stock_updates)
+			}
+		})
+		lastSeq.set(warehouse, Math.max(applied, result.seq))
+	} catch (error) {
+		log.warn(`Failed to replay stock events for ${warehouse}`, error)
+	} finally {
+		catchingUp.delete(warehouse)
+		if (catchUpAgain.delete(warehouse)) {
+			catchUp(warehouse)
+		}
+	}
 }
 
 /**
@@ -100,6 +211,41 @@ function handleInvoiceCreated(data) {
 	// Can be used to update sales dashboards, notifications, etc.
 }
 
+/**
+ * Join the Socket.IO room of each warehouse and replay what was missed meanwhile
+ */
+function joinWarehouseRooms() {
+	subscribedWarehouses.forEach((warehouse) => {
+		window.frappe.realtime.doc_subscribe("Warehouse", warehouse)
+		catchUp(warehouse)
+	})
+}
+
+/**
+ * Subscribe to stock events of the given warehouses, leaving rooms no longer needed
+ * @param {Array<string>} warehouses - Warehouse names
+ */
+function subscribeWarehouses(warehouses) {
+	const wanted = new Set((warehouses || []).filter(Boolean))
+	const realtime = window.frappe?.realtime
+
+	subscribedWarehouses.forEach((warehouse) => {
+		if (!wanted.has(warehouse)) {
+			subscribedWarehouses.delete(warehouse)
+			lastSeq.delete(warehouse)
+			realtime?.doc_unsubscribe?.("Warehouse", warehouse)
+		}
+	})
+
+	wanted.forEach((warehouse) => {
+		if (!subscribedWarehouses.has(warehouse)) {
+			subscribedWarehouses.add(warehouse)
+			realtime?.doc_subscribe?.("Warehouse", warehouse)
+			catchUp(warehouse)
+		}
+	})
+}
+
 /**
  * Start listening to real-time events
  */
@@ -117,6 +263,9 @@ function startListening() {
 	window.frappe.realtime.on("pos_stock_update", handleStockUpdate)
 	window.frappe.realtime.on("pos_invoice_created", handleInvoiceCreated)
 
+	// Rooms are lost on reconnect, join them again
+	window.frappe.realtime.socket?.on("connect", joinWarehouseRooms)
+
 	isListening.value = true
 }
 
@@ -131,7 +280,13 @@ function stopListening() {
 	if (window.frappe?.realtime) {
 		window.frappe.realtime.off("pos_stock_update", handleStockUpdate)
 		window.frappe.realtime.off("pos_invoice_created", handleInvoiceCreated)
+		window.frappe.realtime.socket?.off("connect", joinWarehouseRooms)
+		subscribedWarehouses.forEach((warehouse) => {
+			window.frappe.realtime.doc_unsubscribe?.("Warehouse", warehouse)
+		})
 	}
+	subscribedWarehouses.clear()
+	lastSeq.clear()
 
 	// Clear pending updates
 	if (batchTimeout) {
@@ -186,12 +341,24 @@ export function useRealtimeStock() {
 		}
 	}
 
+	/**
+	 * Register a callback for warehouses whose missed events can no longer be replayed
+	 * @param {Function} handler - Called with the warehouse name; should reload its stock
+	 * @returns {Function} Cleanup function to unregister handler
+	 */
+	function onStockResync(handler) {
+		resyncHandlers.add(handler)
+		return () => resyncHandlers.delete(handler)
+	}
+
 	// Note: Each handler is responsible for its own cleanup via the returned cleanup function.
 	// The singleton listener remains active as long as there are registered handlers.
 
 	return {
 		isListening,
 		onStockUpdate,
+		onStockResync,
+		subscribeWarehouses,
 		flushUpdates,
 		startListening,
 		stopListening,
@@ -37,6 +37,7 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 
 	// Lazy loading state - dynamically adjusted based on device performance
 	const currentOffset = ref(0)
+	const nextCursor = ref(null) // Keyset cursor for the next unfiltered page (null = use offset)
 	const itemsPerPage = computed(() => performanceConfig.get("itemsPerPage")) // Reactive: auto-adjusted 20/50/100 based on device
 	const hasMore = ref(true)
 	const totalItemsLoaded = ref(0)
@@ -591,6 +592,7 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 
 		// Reset pagination state
 		currentOffset.value = 0
+		nextCursor.value = null
 		hasMore.value = true
 		totalItemsLoaded.value = 0
 
@@ -713,6 +715,25 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 			// - Cache not available or cache load failed
 			log.debug("Fetching fresh data from server")
 
+			// ----------------------------------------------------------------
+			// DELTA PATH: Bring the cached catalog up to date
+			// ----------------------------------------------------------------
+			// With a watermark from an earlier full load, only the items changed
+			// since then are transferred (get_items_changed_since). A full load is
+			// needed without a watermark, or when the profile's filters changed.
+			if (!forceServerFetch && stats.cacheReady && stats.items > 0 && (await syncCatalogDelta(profile))) {
+				const limit = hasFilters ? 10000 : itemsPerPage.value
+				const cached = await offlineWorker.searchCachedItems("", limit)
+
+				replaceAllItems(cached || [])
+				totalItemsLoaded.value = cached?.length || 0
+				currentOffset.value = cached?.length || 0
+				hasMore.value = hasFilters ? false : (cached?.length || 0) >= itemsPerPage.value
+				serverDataFresh.value = true
+				log.success(`Loaded ${cached?.length || 0} items from delta-synced cache`)
+				return
+			}
+
 			// ----------------------------------------------------------------
 			// FILTERED LOADING PATH: Load ALL items from specified groups
 			// ----------------------------------------------------------------
@@ -724,6 +745,9 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 
 				// Parallel fetch from multiple groups for optimal performance
 				// Example: Fetch "Bundles" (500 items) + "Electronics" (300 items) simultaneously
+				// Taken before fetching, so changes made during the load are sent
+				// again by the next delta rather than lost
+				const watermark = await fetchCatalogWatermark(profile)
 				const fetchedItems = await fetchItemsFromGroups(profile, itemGroupFilters)
 
 				// CRITICAL: Store ALL fetched items (not just first page)
@@ -743,6 +767,7 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 					// Clear cache first to remove any disabled/stale items, then cache fresh data
 					await offlineWorker.clearItemsCache()
 					await offlineWorker.cacheItems(fetchedItems)
+					await storeCatalogWatermark(watermark)
 					cacheReady.value = true
 
 					// Mark data as fresh - prevents redundant fetches on page refresh
@@ -763,14 +788,9 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 				log.debug(`Fetching ${itemsPerPage.value} items (no filters)`)
 
 				// Fetch first batch (e.g., 20-50 items) for fast initial render
-				const response = await call("pos_next.api.items.get_items", {
-					pos_profile: profile,
-					search_term: "",
-					item_group: null, // No filter - get items from all groups
-					start: 0,
-					limit: itemsPerPage.value,
-				})
-				const list = response?.message || response || []
+				const page = await fetchCatalogPage(profile, { cursor: "", limit: itemsPerPage.value })
+				const list = page.items
+				nextCursor.value = page.nextCursor
 
 				if (list.length > 0) {
 					// Store first batch in allItems
@@ -794,10 +814,9 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 
 				// Start background sync to cache remaining items over time
 				// This improves offline experience without blocking initial load
-				// Only start if cache is new or has few items
-				if (!stats.cacheReady || stats.items < 50) {
-					startBackgroundCacheSync(profile, [])
-				}
+				// The cache was just cleared, so it always needs the full catalog
+				// (and the watermark that lets later syncs load deltas only)
+				startBackgroundCacheSync(profile, [])
 			}
 		} catch (error) {
 			log.error("Error loading items", error)
@@ -954,16 +973,15 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 
 		try {
 			// Fetch next batch from server
-			// start: currentOffset (e.g., 50 after first batch)
+			// cursor: keyset position after the last loaded item (offset fallback)
 			// limit: itemsPerPage (e.g., 50 items per batch)
-			const response = await call("pos_next.api.items.get_items", {
-				pos_profile: posProfile.value,
-				search_term: "",
-				item_group: null, // No filter - get items from all groups
-				start: currentOffset.value,
+			const page = await fetchCatalogPage(posProfile.value, {
+				cursor: nextCursor.value,
+				offset: currentOffset.value,
 				limit: itemsPerPage.value,
 			})
-			const list = response?.message || response || []
+			const list = page.items
+			nextCursor.value = page.nextCursor
 
 			if (list.length > 0) {
 				// Append new items to existing allItems array (maintains reactivity)
@@ -995,6 +1013,90 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 		}
 	}
 
+	/**
+	 * Fetch one unfiltered catalog page
+	 * Uses the keyset cursor when one is known - every page costs the same and
+	 * inserts/renames between pages cannot skip or repeat items - otherwise
+	 * falls back to the numeric offset (e.g. after loading from cache).
+	 * @param {string} profile - POS Profile name
+	 * @param {Object} options - { cursor, offset, limit }
+	 * @returns {Promise<{items: Array, nextCursor: string|null}>}
+	 */
+	async function fetchCatalogPage(profile, { cursor = null, offset = 0, limit }) {
+		const response = await call("pos_next.api.items.get_items", {
+			pos_profile: profile,
+			search_term: "",
+			item_group: null, // No filter - get items from all groups
+			...(cursor !== null ? { cursor } : { start: offset }),
+			limit,
+		})
+		const page = response?.message || response || []
+
+		if (Array.isArray(page)) {
+			return { items: page, nextCursor: null }
+		}
+		return { items: page.items || [], nextCursor: page.next_cursor || null }
+	}
+
+	/**
+	 * Apply the catalog changes since the stored watermark
+	 * Upserts changed items, removes tombstoned ones and refreshes stock through
+	 * the worker, which then stores the new watermark.
+	 * @param {string} profile - POS Profile name
+	 * @returns {Promise<boolean>} False when there is no watermark (full load needed)
+	 */
+	async function syncCatalogDelta(profile) {
+		try {
+			const watermark = await offlineWorker.getItemsWatermark()
+			if (!watermark) {
+				return false
+			}
+
+			const response = await call("pos_next.api.items.get_items_changed_since", {
+				pos_profile: profile,
+				watermark,
+			})
+			const delta = response?.message || response
+			if (!delta || delta.full_sync_required) {
+				return false
+			}
+
+			const result = await offlineWorker.applyItemsDelta(delta)
+			log.info("Catalog delta applied", {
+				upserted: result?.upserted || 0,
+				removed: result?.removed || 0,
+				stockUpdated: result?.stockUpdated || 0,
+			})
+			return true
+		} catch (error) {
+			log.warn("Catalog delta sync failed, falling back to a full load", error)
+			return false
+		}
+	}
+
+	/**
+	 * Get a fresh catalog watermark, to be stored once a full load completes
+	 * @param {string} profile - POS Profile name
+	 * @returns {Promise<string|null>}
+	 */
+	async function fetchCatalogWatermark(profile) {
+		try {
+			const response = await call("pos_next.api.items.get_items_changed_since", {
+				pos_profile: profile,
+			})
+			return (response?.message || response)?.watermark || null
+		} catch (error) {
+			log.warn("Could not get a catalog watermark", error)
+			return null
+		}
+	}
+
+	async function storeCatalogWatermark(watermark) {
+		if (watermark) {
+			await offlineWorker.applyItemsDelta({ watermark })
+		}
+	}
+
 	/**
 	 * Background sync with filter awareness
 	 * @param {string} profile - POS Profile name
@@ -1027,8 +1129,26 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 		log.info("Starting background cache sync (no filters)")
 		cacheSyncing.value = true
 
-		// Start from current offset to avoid re-fetching already loaded items
+		// First-time provisioning: pull the whole catalog as one compressed
+		// stream; fall back to batched paging if the export is unavailable
+		try {
+			await offlineWorker.importCatalogExport(profile)
+			const stats = await offlineWorker.getCacheStats()
+			cacheStats.value = stats
+			cacheReady.value = stats.cacheReady
+			cacheSyncing.value = false
+			log.success("Background sync complete - catalog export imported")
+			return
+		} catch (error) {
+			log.warn("Catalog export failed, falling back to batched sync", error)
+		}
+
+		// Stored once every page is cached, so later syncs load deltas only
+		const watermark = await fetchCatalogWatermark(profile)
+
+		// Start after the items already loaded to avoid re-fetching them
 		let offset = currentOffset.value || 0
+		let cursor = nextCursor.value
 		const batchSize = performanceConfig.get("backgroundSyncBatchSize") // Auto-adjusted: 100/200/300 based on device
 		const statsUpdateFrequency = performanceConfig.get("statsUpdateFrequency") // Auto-adjusted: 5/3/2 based on device
 		let batchCount = 0
@@ -1037,14 +1157,9 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 		const fetchBatch = async () => {
 			try {
 				log.debug(`Background sync: fetching batch at offset ${offset}`)
-				const response = await call("pos_next.api.items.get_items", {
-					pos_profile: profile,
-					search_term: "",
-					item_group: null, // No filters for background sync
-					start: offset,
-					limit: batchSize,
-				})
-				const list = response?.message || response || []
+				const page = await fetchCatalogPage(profile, { cursor, offset, limit: batchSize })
+				const list = page.items
+				cursor = page.nextCursor
 
 				if (list.length > 0) {
 					// Cache the batch
@@ -1066,6 +1181,7 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 
 					// Stop if we got less than requested (reached end)
 					if (list.length < batchSize) {
+						await storeCatalogWatermark(watermark)
 						log.success("Background sync complete - all items cached")
 						// Update stats one final time when sync completes
 						const finalStats = await offlineWorker.getCacheStats()
@@ -1076,6 +1192,7 @@ export const useItemSearchStore = defineStore("itemSearch", () => {
 						cacheSyncing.value = false
 					}
 				} else {
+					await storeCatalogWatermark(watermark)
 					log.success("Background sync complete - no more items")
 					// Update stats when sync completes with no items
 					const finalStats = await offlineWorker.getCacheStats()
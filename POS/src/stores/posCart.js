@@ -1,6 +1,7 @@
 import { useInvoice } from "@/composables/useInvoice"
 import { usePOSOffersStore } from "@/stores/posOffers"
 import { usePOSSettingsStore } from "@/stores/posSettings"
+import { call } from "@/utils/apiWrapper"
 import { parseError } from "@/utils/errorHandler"
 import {
 	checkStockAvailability,
@@ -179,6 +180,9 @@ export const usePOSCartStore = defineStore("posCart", () => {
 	// Generation counter to track cart changes and invalidate stale operations
 	let cartGeneration = 0
 
+	// Stock reservation of this cart (pos_next.api.stock_reservations), created lazily
+	let reservationId = null
+
 	// Async queue for sequential offer processing
 	const offerQueue = createAsyncQueue()
 
@@ -264,6 +268,8 @@ export const usePOSCartStore = defineStore("posCart", () => {
 		debouncedProcessOffers.cancel()
 		offerQueue.cancel()
 
+		releaseReservation()
+
 		clearInvoiceCart()
 		customer.value = null
 		appliedOffers.value = []
@@ -301,7 +307,84 @@ export const usePOSCartStore = defineStore("posCart", () => {
 			return
 		}
 
-		return await baseSubmitInvoice(targetDoctype.value, deliveryDate.value)
+		// Submit with the reservation as last synced; the server releases it after commit
+		debouncedSyncReservation.cancel()
+		const result = await baseSubmitInvoice(
+			targetDoctype.value,
+			deliveryDate.value,
+			reservationId,
+			settingsStore.allowSubmissionsInBackgroundJob,
+		)
+		// The reservation now belongs to the invoice (a queued one keeps it until submitted)
+		if (result) {
+			reservationId = null
+		}
+		return result
+	}
+
+	/**
+	 * Reserve the cart's quantities so other terminals cannot sell the same units.
+	 * Only when stock reservations are enabled in POS Settings. Shortages are
+	 * reported as warnings; blocking is left to the stock validation on submit.
+	 */
+	async function syncReservation() {
+		if (!settingsStore.enableStockReservations || !posProfile.value || !navigator.onLine) {
+			return
+		}
+
+		const items = invoiceItems.value
+			.filter((item) => item.item_code && item.warehouse)
+			.map((item) => ({
+				item_code: item.item_code,
+				warehouse: item.warehouse,
+				stock_qty: item.quantity * (item.conversion_factor || 1),
+			}))
+
+		// Nothing reserved and nothing to reserve
+		if (!items.length && !reservationId) {
+			return
+		}
+
+		if (!reservationId) {
+			reservationId =
+				globalThis.crypto?.randomUUID?.() ||
+				`${Date.now()}-${Math.random().toString(36).slice(2)}`
+		}
+
+		try {
+			const response = await call("pos_next.api.stock_reservations.sync_cart_reservation", {
+				reservation_id: reservationId,
+				pos_profile: posProfile.value,
+				items: JSON.stringify(items),
+			})
+			const result = response?.message || response
+			for (const shortage of result?.shortages || []) {
+				const cartItem = invoiceItems.value.find((i) => i.item_code === shortage.item_code)
+				showWarning(
+					__("Only {0} of {1} can be reserved; other terminals hold the rest", [
+						shortage.available_qty,
+						cartItem?.item_name || shortage.item_code,
+					]),
+				)
+			}
+		} catch (error) {
+			console.error("Error syncing stock reservation:", error)
+		}
+	}
+
+	const debouncedSyncReservation = createDebounce(syncReservation, 300)
+
+	function releaseReservation() {
+		debouncedSyncReservation.cancel()
+		if (!reservationId) {
+			return
+		}
+
+		const id = reservationId
+		reservationId = null
+		call("pos_next.api.stock_reservations.release_cart_reservation", {
+			reservation_id: id,
+		}).catch((error) => console.error("Error releasing stock reservation:", error))
 	}
 
 	async function createSalesOrder() {
@@ -1318,6 +1401,14 @@ export const usePOSCartStore = defineStore("posCart", () => {
 		{ immediate: true, flush: "post" },
 	)
 
+	// Keep this cart's stock reservation in line with its quantities
+	watch(
+		() => invoiceItems.value.map(item =>
+			`${item.item_code}:${item.warehouse || ''}:${item.quantity}:${item.conversion_factor || 1}`
+		).join(','),
+		() => debouncedSyncReservation(),
+	)
+
 	// Additional watcher for applied offers changes (to handle removal edge cases)
 	watch(
 		() => appliedOffers.value.length,
@@ -59,6 +59,8 @@ export const usePOSSettingsStore = defineStore("posSettings", () => {
 		// Miscellaneous
 		input_qty: 0,
 		allow_negative_stock: 0,
+		enable_stock_reservations: 0,
+		stock_reservation_ttl: 300,
 		// Sales Persons
 		enable_sales_persons: "Disabled",
 	})
@@ -201,6 +203,9 @@ export const usePOSSettingsStore = defineStore("posSettings", () => {
 	const allowNegativeStock = computed(() =>
 		Boolean(settings.value.allow_negative_stock),
 	)
+	const enableStockReservations = computed(() =>
+		Boolean(settings.value.enable_stock_reservations),
+	)
 
 	// Computed - Sales Persons
 	const enableSalesPersons = computed(() =>
@@ -318,6 +323,8 @@ export const usePOSSettingsStore = defineStore("posSettings", () => {
 			allow_change_posting_date: 0,
 			input_qty: 0,
 			allow_negative_stock: 0,
+			enable_stock_reservations: 0,
+			stock_reservation_ttl: 300,
 			enable_sales_persons: "Disabled",
 		}
 		isLoaded.value = false
@@ -441,6 +448,7 @@ export const usePOSSettingsStore = defineStore("posSettings", () => {
 		// Computed - Miscellaneous
 		inputQty,
 		allowNegativeStock,
+		enableStockReservations,
 
 		// Computed - Sales Persons
 		enableSalesPersons,
@@ -15,6 +15,7 @@ export {
 
 export {
 	pingServer,
+	generateOfflineId,
 	saveOfflineInvoice,
 	getOfflineInvoices,
 	getOfflineInvoiceCount,
@@ -37,6 +37,13 @@ export const isOffline = () => {
 // NOTE: Periodic server ping is now handled by the offline worker
 // This prevents duplicate pings and centralizes the logic
 
+// Client-generated id of a sale, stored as Sales Invoice posa_offline_id.
+// submit_invoice returns the original invoice when the same id is submitted
+// again, so a retry after a lost response cannot create a duplicate sale.
+export const generateOfflineId = () =>
+	globalThis.crypto?.randomUUID?.() ||
+	`${Date.now()}-${Math.random().toString(36).slice(2)}-${Math.random().toString(36).slice(2)}`
+
 // Save invoice to offline queue
 export const saveOfflineInvoice = async (invoiceData) => {
 	try {
@@ -47,6 +54,7 @@ export const saveOfflineInvoice = async (invoiceData) => {
 
 		// Clean data (remove reactive properties)
 		const cleanData = JSON.parse(JSON.stringify(invoiceData))
+		cleanData.posa_offline_id = cleanData.posa_offline_id || generateOfflineId()
 
 		// Add to queue
 		await db.invoice_queue.add({
@@ -95,6 +103,9 @@ export const getOfflineInvoiceCount = async () => {
 	}
 }
 
+// Invoices sent per submit_invoices_bulk request (server limit is 100)
+const SYNC_BATCH_SIZE = 50
+
 // Sync offline invoices to server
 export const syncOfflineInvoices = async () => {
 	if (isOffline()) {
@@ -111,8 +122,43 @@ export const syncOfflineInvoices = async () => {
 	let failedCount = 0
 	const errors = []
 
-	for (const invoice of pendingInvoices) {
-		try {
+	const markFailed = async (invoice, error) => {
+		console.error(`Error syncing invoice ${invoice.id}:`, error)
+
+		// Store error details
+		errors.push({
+			invoiceId: invoice.id,
+			customer: invoice.data.customer || "Walk-in Customer",
+			error: error,
+		})
+
+		// Increment retry count
+		await db.invoice_queue.update(invoice.id, {
+			retry_count: (invoice.retry_count || 0) + 1,
+		})
+
+		failedCount++
+
+		// If retry count exceeds threshold, mark as failed
+		if ((invoice.retry_count || 0) >= 3) {
+			await db.invoice_queue.update(invoice.id, {
+				sync_failed: true,
+				error: error.message,
+			})
+		}
+	}
+
+	for (let start = 0; start < pendingInvoices.length; start += SYNC_BATCH_SIZE) {
+		const batch = pendingInvoices.slice(start, start + SYNC_BATCH_SIZE)
+		const payload = []
+
+		for (const invoice of batch) {
+			// Invoices queued before offline ids existed get one now, kept for later retries
+			if (!invoice.data.posa_offline_id) {
+				invoice.data = { ...invoice.data, posa_offline_id: generateOfflineId() }
+				await db.invoice_queue.update(invoice.id, { data: invoice.data })
+			}
+
 			// Transform items: map 'quantity' to 'qty' for ERPNext compatibility
 			// Offline storage uses 'quantity' (cart format) but server expects 'qty'
 			const invoiceData = { ...invoice.data }
@@ -123,46 +169,33 @@ export const syncOfflineInvoices = async () => {
 				}))
 			}
 
-			// Submit invoice to server
-			// The API expects 'data' parameter with nested 'invoice' and 'data' keys
-			const response = await call("pos_next.api.invoices.submit_invoice", {
-				data: JSON.stringify({
-					invoice: invoiceData,
-					data: {},
-				}),
+			payload.push({ invoice: invoiceData, data: {} })
+		}
+
+		let results
+		try {
+			// Each invoice is submitted and committed separately on the server;
+			// results come back in order, one per invoice
+			results = await call("pos_next.api.invoices.submit_invoices_bulk", {
+				invoices: JSON.stringify(payload),
 			})
+		} catch (error) {
+			// The whole request failed (e.g. connection lost): retry the batch later
+			for (const invoice of batch) {
+				await markFailed(invoice, error)
+			}
+			continue
+		}
 
-			if (response.message || response.name) {
+		for (const [index, invoice] of batch.entries()) {
+			const result = results?.[index]
+			if (result?.success) {
 				// Mark as synced
 				await db.invoice_queue.update(invoice.id, { synced: true })
 				successCount++
-				console.log(
-					`Invoice ${invoice.id} synced successfully as ${response.name || response.message}`,
-				)
-			}
-		} catch (error) {
-			console.error(`Error syncing invoice ${invoice.id}:`, error)
-
-			// Store error details
-			errors.push({
-				invoiceId: invoice.id,
-				customer: invoice.data.customer || "Walk-in Customer",
-				error: error,
-			})
-
-			// Increment retry count
-			await db.invoice_queue.update(invoice.id, {
-				retry_count: (invoice.retry_count || 0) + 1,
-			})
-
-			failedCount++
-
-			// If retry count exceeds threshold, mark as failed
-			if ((invoice.retry_count || 0) >= 3) {
-				await db.invoice_queue.update(invoice.id, {
-					sync_failed: true,
-					error: error.message,
-				})
+				console.log(`Invoice ${invoice.id} synced successfully as ${result.name}`)
+			} else {
+				await markFailed(invoice, new Error(result?.error || "No result returned for invoice"))
 			}
 		}
 	}
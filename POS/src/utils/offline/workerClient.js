@@ -9,6 +9,11 @@ import { offlineState } from './offlineState'
 
 const log = logger.create('OfflineWorker')
 
+// Per-message timeouts (ms) for operations that legitimately run long
+const MESSAGE_TIMEOUTS = {
+	IMPORT_CATALOG_EXPORT: 10 * 60 * 1000,
+}
+
 class OfflineWorkerClient {
 	constructor() {
 		this.worker = null
@@ -315,7 +320,7 @@ class OfflineWorkerClient {
 				return
 			}
 
-			// Timeout after 30 seconds
+			// Timeout after 30 seconds (longer for whole-catalog imports)
 			setTimeout(() => {
 				if (this.pendingMessages.has(id)) {
 					const messageInfo = this.pendingMessages.get(id)
@@ -330,7 +335,7 @@ class OfflineWorkerClient {
 						reject(new Error(`Worker message timeout: ${type} (retries: ${currentRetries})`))
 					}
 				}
-			}, 30000)
+			}, MESSAGE_TIMEOUTS[type] || 30000)
 		})
 	}
 
@@ -450,6 +455,18 @@ class OfflineWorkerClient {
 		return this.sendMessage("UPDATE_STOCK_QUANTITIES", { stockUpdates })
 	}
 
+	async applyItemsDelta(delta) {
+		return this.sendMessage("APPLY_ITEMS_DELTA", { delta })
+	}
+
+	async getItemsWatermark() {
+		return this.sendMessage("GET_ITEMS_WATERMARK")
+	}
+
+	async importCatalogExport(posProfile) {
+		return this.sendMessage("IMPORT_CATALOG_EXPORT", { posProfile })
+	}
+
 	async clearItemsCache() {
 		return this.sendMessage("CLEAR_ITEMS_CACHE")
 	}
@@ -406,6 +406,17 @@ async function saveOfflineInvoice(invoiceData) {
 			throw new Error("Cannot save empty invoice")
 		}
 
+		// Client-generated id of the sale; submit_invoice replays the original
+		// invoice for a known id, so sync retries cannot create duplicates
+		if (!invoiceData.posa_offline_id) {
+			invoiceData = {
+				...invoiceData,
+				posa_offline_id:
+					self.crypto?.randomUUID?.() ||
+					`${Date.now()}-${Math.random().toString(36).slice(2)}-${Math.random().toString(36).slice(2)}`,
+			}
+		}
+
 		const id = await db.table("invoice_queue").add({
 			data: invoiceData,
 			timestamp: Date.now(),
@@ -796,6 +807,7 @@ async function clearItemsCache() {
 			await db.table("items").clear()
 			await db.table("item_prices").clear()
 			await db.table("settings").put({ key: "items_last_sync", value: null })
+			await db.table("settings").put({ key: "items_watermark", value: null })
 		})
 
 		invalidateCache('items')
@@ -921,6 +933,168 @@ async function removeItemsByGroups(itemGroups) {
 	}
 }
 
+/**
+ * Apply a catalog delta from pos_next.api.items.get_items_changed_since
+ * Upserts changed items, removes tombstoned items (and their prices),
+ * refreshes stock-only rows and stores the new watermark for the next call.
+ * Consecutive deltas overlap (the server watermark trails commit time), so
+ * every step must stay idempotent: re-applying a row is harmless.
+ *
+ * @param {Object} delta - { watermark, items, tombstones, stock }
+ * @returns {Promise<Object>} Result with upserted/removed/stock counts
+ */
+async function applyItemsDelta(delta) {
+	const startTime = performance.now()
+
+	try {
+		const db = await initDB()
+		const { watermark, items = [], tombstones = [], stock = [] } = delta || {}
+
+		const cached = await cacheItemsFromServer(items)
+
+		const removedCodes = tombstones.map(t => t.item_code).filter(Boolean)
+		if (removedCodes.length > 0) {
+			await db.transaction('rw', 'items', 'item_prices', async () => {
+				for (const chunk of chunkArray(removedCodes, 500)) {
+					await db.table("items").bulkDelete(chunk)
+					await db.table("item_prices").where("item_code").anyOf(chunk).delete()
+				}
+			})
+			invalidateCache('items')
+			invalidateCache('search')
+		}
+
+		const stockResult = await updateStockQuantities(stock)
+
+		if (watermark) {
+			await db.table("settings").put({ key: "items_watermark", value: watermark })
+		}
+
+		const duration = Math.round(performance.now() - startTime)
+		recordMetric('applyItemsDelta', duration, false)
+
+		return {
+			success: true,
+			upserted: cached.count || 0,
+			removed: removedCodes.length,
+			stockUpdated: stockResult.updated || 0,
+			watermark,
+			duration,
+		}
+	} catch (error) {
+		recordMetric('applyItemsDelta', performance.now() - startTime, true)
+		log.error("Error applying items delta", error)
+		throw error
+	}
+}
+
+/**
+ * Provision the items cache from pos_next.api.items.export_catalog
+ * Streams the gzip NDJSON export (the browser inflates it), parses it line by
+ * line and writes every CONFIG.BATCH_SIZE items through cacheItemsFromServer,
+ * so the full catalog never has to be held in memory at once. The export's
+ * watermark is stored so delta sync can continue from it.
+ *
+ * @param {string} posProfile - POS Profile name
+ * @returns {Promise<Object>} Result with item count, watermark and timing
+ */
+async function importCatalogExport(posProfile) {
+	const startTime = performance.now()
+
+	try {
+		const headers = { 'Accept': 'application/x-ndjson' }
+		if (csrfToken) {
+			headers['X-Frappe-CSRF-Token'] = csrfToken
+		}
+
+		const url = `/api/method/pos_next.api.items.export_catalog?pos_profile=${encodeURIComponent(posProfile)}`
+		const response = await fetch(url, { headers })
+		if (!response.ok || !response.body) {
+			throw new Error(`HTTP ${response.status}: ${response.statusText}`)
+		}
+
+		const reader = response.body.getReader()
+		const decoder = new TextDecoder()
+		let buffered = ""
+		let batch = []
+		let meta = null
+		let expected = null
+		let count = 0
+
+		const flush = async () => {
+			if (batch.length > 0) {
+				const items = batch
+				batch = []
+				await cacheItemsFromServer(items)
+			}
+		}
+
+		const handleLine = async (line) => {
+			if (!line) return
+			const row = JSON.parse(line)
+			if (row.item) {
+				batch.push(row.item)
+				count++
+				if (batch.length >= CONFIG.BATCH_SIZE) {
+					await flush()
+				}
+			} else if (row.meta) {
+				meta = row.meta
+			} else if (row.end) {
+				expected = row.end.count
+			}
+		}
+
+		while (true) {
+			const { done, value } = await reader.read()
+			if (done) break
+
+			buffered += decoder.decode(value, { stream: true })
+			const lines = buffered.split("\n")
+			buffered = lines.pop()
+			for (const line of lines) {
+				await handleLine(line)
+			}
+		}
+		await handleLine(buffered + decoder.decode())
+		await flush()
+
+		if (expected === null || expected !== count) {
+			throw new Error(`Catalog export incomplete: received ${count} of ${expected ?? "unknown"} items`)
+		}
+
+		const db = await initDB()
+		if (meta?.watermark) {
+			await db.table("settings").put({ key: "items_watermark", value: meta.watermark })
+		}
+
+		const duration = Math.round(performance.now() - startTime)
+		recordMetric('importCatalogExport', duration, false)
+		log.success(`Imported ${count} items from catalog export in ${duration}ms`)
+
+		return { success: true, count, watermark: meta?.watermark || null, duration }
+	} catch (error) {
+		recordMetric('importCatalogExport', performance.now() - startTime, true)
+		log.error("Error importing catalog export", error)
+		throw error
+	}
+}
+
+/**
+ * Get the watermark of the last applied catalog delta
+ * @returns {Promise<string|null>} Watermark or null when a full load is needed
+ */
+async function getItemsWatermark() {
+	try {
+		const db = await initDB()
+		const setting = await db.table("settings").get("items_watermark")
+		return setting?.value || null
+	} catch (error) {
+		log.error("Error reading items watermark", error)
+		return null
+	}
+}
+
 // Cache payment methods from server
 async function cachePaymentMethodsFromServer(paymentMethods) {
 	try {
@@ -1331,6 +1505,18 @@ self.onmessage = async (event) => {
 				result = await cacheCustomersFromServer(payload.customers)
 				break
 
+			case "APPLY_ITEMS_DELTA":
+				result = await applyItemsDelta(payload.delta)
+				break
+
+			case "GET_ITEMS_WATERMARK":
+				result = await getItemsWatermark()
+				break
+
+			case "IMPORT_CATALOG_EXPORT":
+				result = await importCatalogExport(payload.posProfile)
+				break
+
 			case "CLEAR_ITEMS_CACHE":
 				result = await clearItemsCache()
 				break
@@ -0,0 +1,237 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Barcode Map
+Redis hash of barcode -> (item_code, uom) used to resolve scan bursts.
+
+The whole burst is resolved with a single HMGET instead of one Item Barcode
+lookup per scan. The map is built once in the background and then kept
+current from Item doc events (barcodes are Item child rows). Codes missing
+from the map are confirmed against the database before being reported as
+unknown, so a map that is still building or was evicted never hides an item.
+
+Doc events only note which barcodes an item change touched; once the change
+is committed those barcodes are re-read from the database and written to the
+map, so a rolled back save leaves nothing behind. A full rebuild fills a
+staging hash and renames it over the map; barcodes refreshed meanwhile are
+also collected in a dirty set and refreshed again after the rename, so the
+swap cannot bring back a removed or reassigned barcode.
+"""
+
+import frappe
+
+from pos_next.api.cache_utils import raw_key
+
+MAP_KEY = "pos_next:barcode_map"
+READY_KEY = "pos_next:barcode_map_ready"
+REBUILDING_KEY = "pos_next:barcode_map_rebuilding"
+DIRTY_KEY = "pos_next:barcode_map_dirty"
+# A rebuild that has not finished by then is presumed dead
+REBUILDING_TTL = 60 * 60
+REBUILD_CHUNK_SIZE = 5000
+
+# Unit separator between item_code and uom in the stored value
+_SEPARATOR = "\x1f"
+
+
+def _encode(item_code, uom):
+	return f"{item_code}{_SEPARATOR}{uom or ''}"
+
+
+def _decode(value):
+	item_code, _sep, uom = frappe.safe_decode(value).partition(_SEPARATOR)
+	return item_code, uom or None
+
+
+def resolve_barcodes(barcodes):
+	"""
+	Resolve barcodes to items.
+
+	Args:
+		barcodes (list): Scanned codes (duplicates allowed)
+
+	Returns:
+		dict: {barcode: (item_code, uom)} for known codes; unknown codes are omitted.
+			A code that is not a barcode but an item code resolves to (item_code, None).
+	"""
+	barcodes = [code for code in dict.fromkeys(barcodes) if code]
+	if not barcodes:
+		return {}
+
+	resolved = {}
+	if frappe.cache().get_value(READY_KEY):
+		values = frappe.cache().hmget(raw_key(MAP_KEY), barcodes)
+		for barcode, value in zip(barcodes, values):
+			if value:
+				resolved[barcode] = _decode(value)
+	else:
+		queue_rebuild()
+
+	missing = [code for code in barcodes if code not in resolved]
+	if missing:
+		for row in frappe.get_all(
+			"Item Barcode",
+			filters={"barcode": ["in", missing], "parenttype": "Item"},
+			fields=["barcode", "parent", "uom"],
+		):
+			resolved.setdefault(row.barcode, (row.parent, row.uom or None))
+
+		# Scanners are also used on item codes printed on shelf labels
+		missing = [code for code in missing if code not in resolved]
+		if missing:
+			for item_code in frappe.get_all("Item", filters={"name": ["in", missing]}, pluck="name"):
+				resolved[item_code] = (item_code, None)
+
+	return resolved
+
+
+def _set_barcodes(rows, key=MAP_KEY):
+	"""Write (barcode, item_code, uom) rows to the map in one round trip."""
+	mapping = {row.barcode: _encode(row.parent, row.uom) for row in rows if row.barcode}
+	if mapping:
+		pipe = frappe.cache().pipeline()
+		pipe.hset(raw_key(key), mapping=mapping)
+		pipe.execute()
+
+
+def refresh_barcodes(barcodes):
+	"""Write the committed state of the given barcodes to the map (set or remove)."""
+	barcodes = [code for code in dict.fromkeys(barcodes) if code]
+	if not barcodes:
+		return
+
+	rows = frappe.get_all(
+		"Item Barcode",
+		filters={"barcode": ["in", barcodes], "parenttype": "Item"},
+		fields=["barcode", "parent", "uom"],
+	)
+	found = {row.barcode for row in rows}
+
+	pipe = frappe.cache().pipeline()
+	if rows:
+		pipe.hset(raw_key(MAP_KEY), mapping={row.barcode: _encode(row.parent, row.uom) for row in rows})
+	removed = [code for code in barcodes if code not in found]
+	if removed:
+		pipe.hdel(raw_key(MAP_KEY), *removed)
+	if frappe.cache().get_value(REBUILDING_KEY):
+		# The rebuild's staging hash may hold older values; refreshed after its swap
+		pipe.sadd(raw_key(DIRTY_KEY), *barcodes)
+	pipe.execute()
+
+
+def _refresh_after_commit(barcodes):
+	barcodes = [code for code in barcodes if code]
+	if not barcodes:
+		return
+
+	def refresh():
+		try:
+			refresh_barcodes(barcodes)
+		except Exception:
+			frappe.log_error(frappe.get_traceback(), "Barcode Map Error")
+
+	frappe.db.after_commit.add(refresh)
+
+
+# ==========================================
+# Doc Events
+# ==========================================
+
+
+def on_item_update(doc, method=None):
+	"""Item on_update hook: refresh the item's current and removed barcodes once committed."""
+	try:
+		barcodes = [row.barcode for row in doc.get("barcodes", [])]
+		previous = doc.get_doc_before_save()
+		if previous:
+			barcodes.extend(row.barcode for row in previous.get("barcodes", []))
+		_refresh_after_commit(barcodes)
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Barcode Map Error")
+
+
+def on_item_rename(doc, method=None, old=None, new=None, merge=False):
+	"""Item after_rename hook: point the barcodes at the new item code once committed."""
+	try:
+		_refresh_after_commit([row.barcode for row in doc.get("barcodes", [])])
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Barcode Map Error")
+
+
+def on_item_trash(doc, method=None):
+	"""Item on_trash hook: forget the item's barcodes once committed."""
+	try:
+		_refresh_after_commit([row.barcode for row in doc.get("barcodes", [])])
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Barcode Map Error")
+
+
+# ==========================================
+# Full Rebuild
+# ==========================================
+
+
+def queue_rebuild():
+	frappe.enqueue(
+		"pos_next.api.barcode_map.rebuild_map",
+		queue="long",
+		job_id="pos_next_rebuild_barcode_map",
+		deduplicate=True,
+	)
+
+
+def rebuild_map():
+	"""Rebuild the whole map into a staging key, then swap it in atomically."""
+	cache = frappe.cache()
+	staging_key = f"{MAP_KEY}:staging"
+	cache.delete(raw_key(staging_key))
+	cache.delete(raw_key(DIRTY_KEY))
+	cache.set_value(REBUILDING_KEY, 1, expires_in_sec=REBUILDING_TTL)
+
+	try:
+		last_name = ""
+		written = False
+		while True:
+			rows = frappe.db.sql(
+				"""
+				SELECT name, barcode, parent, uom
+				FROM `tabItem Barcode`
+				WHERE name > %s AND parenttype = 'Item'
+				ORDER BY name
+				LIMIT %s
+				""",
+				(last_name, REBUILD_CHUNK_SIZE),
+				as_dict=1,
+			)
+			if not rows:
+				break
+
+			_set_barcodes(rows, key=staging_key)
+			last_name = rows[-1].name
+			written = True
+
+		if written:
+			cache.rename(raw_key(staging_key), raw_key(MAP_KEY))
+		else:
+			cache.delete(raw_key(MAP_KEY))
+	finally:
+		cache.delete_value(REBUILDING_KEY)
+
+	# Changes committed during the rebuild may be missing from (or older in) the
+	# staging hash; end the read snapshot and refresh them from the database
+	frappe.db.commit()
+	_refresh_dirty()
+
+	cache.set_value(READY_KEY, 1)
+
+
+def _refresh_dirty():
+	while True:
+		# Raw pipeline: RedisWrapper.spop takes no count and would prefix the key again
+		pipe = frappe.cache().pipeline()
+		pipe.spop(raw_key(DIRTY_KEY), REBUILD_CHUNK_SIZE)
+		barcodes = [frappe.safe_decode(code) for code in pipe.execute()[0] or []]
+		if not barcodes:
+			break
+		refresh_barcodes(barcodes)
@@ -15,6 +15,7 @@ Performance improvement: ~300-500ms faster initial load
 import frappe
 from frappe import _
 
+from pos_next.api import payment_modes, pos_config
 from pos_next.api.localization import canonicalize_locale
 
 
@@ -134,9 +135,8 @@ def get_pos_settings(pos_profile):
 		return get_default_pos_settings()
 
 	try:
-		pos_settings = frappe.db.get_value(
-			"POS Settings",
-			{"pos_profile": pos_profile, "enabled": 1},
+		pos_settings = pos_config.get_pos_settings(
+			pos_profile,
 			[
 				"name",
 				"enabled",
@@ -158,7 +158,7 @@ def get_pos_settings(pos_profile):
 				"allow_select_sales_order",
 				"create_only_sales_order"
 			],
-			as_dict=True
+			enabled_only=True,
 		)
 
 		if not pos_settings:
@@ -210,12 +210,7 @@ def get_payment_methods(pos_profile):
 
 		# Get payment type for each method
 		for method in payment_methods:
-			payment_type = frappe.db.get_value(
-				"Mode of Payment",
-				method["mode_of_payment"],
-				"type"
-			)
-			method["type"] = payment_type or "Cash"
+			method["type"] = payment_modes.get_payment_type(method["mode_of_payment"]) or "Cash"
 
 		return payment_methods
 	except Exception:
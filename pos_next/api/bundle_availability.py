@@ -0,0 +1,305 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Bundle Availability
+Materialized Product Bundle availability per (bundle, warehouse).
+
+Bundle availability is min(component available / required qty) over the
+bundle's components. Instead of recomputing it on every catalog or stock
+request, the result is stored in POS Bundle Availability and read with one
+indexed lookup.
+
+- A warehouse is seeded with every bundle by a background job the first
+  time it is read (computed live until then). Dirty pairs the refresh job
+  pops while a warehouse is seeding may postdate the seed's read; they are
+  deferred and marked dirty again once the warehouse is seeded.
+- Stock Ledger Entry on_submit marks (component, warehouse) pairs dirty once
+  committed and queues one deduplicated job that recomputes only the bundles
+  using those components, at the seeded warehouses containing those leaves.
+  The job drains the dirty set until it is empty; pairs marked while a
+  finishing job could no longer be re-queued are picked up by a scheduler
+  sweep.
+- Product Bundle changes refresh that bundle everywhere.
+- An hourly refresh repairs drift from changes that bypass the stock ledger
+  (e.g. reserved qty updates).
+"""
+
+import hashlib
+
+import frappe
+from frappe.utils import now
+
+from pos_next.api import warehouse_tree
+from pos_next.api.cache_utils import raw_key
+
+TABLE = "`tabPOS Bundle Availability`"
+SEEDED_KEY = "pos_next:bundle_availability_warehouses"
+SEEDING_KEY = "pos_next:bundle_availability_seeding"
+DIRTY_KEY = "pos_next:bundle_availability_dirty"
+DEFERRED_KEY = "pos_next:bundle_availability_deferred"
+REFRESH_JOB_ID = "pos_next_refresh_bundle_availability"
+CHUNK_SIZE = 500
+
+_SEPARATOR = "\x1f"
+
+
+def _row_name(bundle_code, warehouse):
+	"""Deterministic row name, so upserts need no lookup."""
+	return hashlib.sha1(f"{bundle_code}{_SEPARATOR}{warehouse}".encode()).hexdigest()[:20]
+
+
+def _seeded_warehouses():
+	return [frappe.safe_decode(wh) for wh in frappe.cache().smembers(SEEDED_KEY)]
+
+
+def _seeding_warehouses():
+	return {frappe.safe_decode(wh) for wh in frappe.cache().smembers(SEEDING_KEY)}
+
+
+def get_availability(bundle_codes, warehouses):
+	"""
+	Read bundle availability.
+
+	Seeded warehouses are answered from the materialized table with one indexed
+	query. A warehouse that is not seeded yet is computed live while a background
+	job seeds it.
+
+	Args:
+		bundle_codes (list): Item codes (non-bundles are simply not returned)
+		warehouses (list): Warehouse names as requested (group or leaf)
+
+	Returns:
+		list: Rows of {bundle_item, warehouse, available_qty}
+	"""
+	if not bundle_codes or not warehouses:
+		return []
+
+	seeded = [wh for wh in warehouses if frappe.cache().sismember(SEEDED_KEY, wh)]
+	rows = []
+	if seeded:
+		rows = frappe.db.sql(
+			f"""
+			SELECT bundle_item, warehouse, available_qty
+			FROM {TABLE}
+			WHERE warehouse IN %s AND bundle_item IN %s
+			""",
+			[seeded, list(bundle_codes)],
+			as_dict=1,
+		)
+
+	pending = [wh for wh in warehouses if wh not in seeded]
+	if pending:
+		from pos_next.api.items import _compute_bundle_availability_bulk
+
+		for warehouse in pending:
+			queue_seed(warehouse)
+			for bundle_code, qty in _compute_bundle_availability_bulk(bundle_codes, warehouse).items():
+				rows.append(frappe._dict(bundle_item=bundle_code, warehouse=warehouse, available_qty=qty))
+
+	return rows
+
+
+def queue_seed(warehouse):
+	frappe.enqueue(
+		"pos_next.api.bundle_availability.seed_warehouse",
+		queue="short",
+		job_id=f"pos_next_seed_bundle_availability:{warehouse}",
+		deduplicate=True,
+		warehouse=warehouse,
+	)
+
+
+def seed_warehouse(warehouse):
+	"""Background job: materialize every bundle at a warehouse."""
+	cache = frappe.cache()
+	cache.sadd(SEEDING_KEY, warehouse)
+	try:
+		# Read in a snapshot taken after the warehouse was marked seeding
+		frappe.db.commit()
+		refresh(frappe.get_all("Product Bundle", pluck="new_item_code"), [warehouse])
+		frappe.db.commit()
+		cache.sadd(SEEDED_KEY, warehouse)
+	finally:
+		cache.srem(SEEDING_KEY, warehouse)
+
+	_replay_deferred()
+
+
+def _replay_deferred():
+	"""Mark pairs deferred during a seed dirty again, now that the warehouse is seeded."""
+	dirty_key = raw_key(DIRTY_KEY)
+	deferred_key = raw_key(DEFERRED_KEY)
+	pipe = frappe.cache().pipeline()
+	pipe.sunionstore(dirty_key, [dirty_key, deferred_key])
+	pipe.delete(deferred_key)
+	pipe.execute()
+	queue_refresh()
+
+
+def refresh(bundle_codes, warehouses):
+	"""Recompute and store availability for the given bundles at the given warehouses."""
+	from pos_next.api.items import _compute_bundle_availability_bulk
+
+	bundle_codes = [code for code in dict.fromkeys(bundle_codes) if code]
+	for warehouse in warehouses:
+		for start in range(0, len(bundle_codes), CHUNK_SIZE):
+			chunk = bundle_codes[start : start + CHUNK_SIZE]
+			availability = _compute_bundle_availability_bulk(chunk, warehouse)
+			_store(warehouse, chunk, availability)
+
+
+def _store(warehouse, bundle_codes, availability):
+	"""Upsert computed rows; drop rows for codes that are no longer bundles."""
+	stale = [code for code in bundle_codes if code not in availability]
+	if stale:
+		frappe.db.sql(
+			f"DELETE FROM {TABLE} WHERE warehouse = %s AND bundle_item IN %s",
+			[warehouse, stale],
+		)
+
+	if not availability:
+		return
+
+	timestamp = now()
+	placeholders = []
+	values = []
+	for bundle_code, qty in availability.items():
+		placeholders.append("(%s, %s, %s, %s, %s, %s, 'Administrator', 'Administrator')")
+		values.extend([_row_name(bundle_code, warehouse), bundle_code, warehouse, qty, timestamp, timestamp])
+
+	frappe.db.sql(
+		f"""
+		INSERT INTO {TABLE}
+			(name, bundle_item, warehouse, available_qty, creation, modified, owner, modified_by)
+		VALUES {", ".join(placeholders)}
+		ON DUPLICATE KEY UPDATE
+			available_qty = VALUES(available_qty),
+			modified = VALUES(modified)
+		""",
+		values,
+	)
+
+
+# ==========================================
+# Doc Events
+# ==========================================
+
+
+def queue_refresh():
+	frappe.enqueue(
+		"pos_next.api.bundle_availability.process_dirty",
+		queue="short",
+		job_id=REFRESH_JOB_ID,
+		deduplicate=True,
+	)
+
+
+def on_stock_ledger_entry(doc, method=None):
+	"""Stock Ledger Entry on_submit hook: queue a refresh for the touched component."""
+	member = f"{doc.item_code}{_SEPARATOR}{doc.warehouse}"
+
+	def mark_dirty():
+		# After commit, so the job can never pop the pair before the new Bin is visible
+		try:
+			frappe.cache().sadd(DIRTY_KEY, member)
+			queue_refresh()
+		except Exception:
+			frappe.log_error(frappe.get_traceback(), "Bundle Availability Error")
+
+	frappe.db.after_commit.add(mark_dirty)
+
+
+def on_product_bundle_update(doc, method=None):
+	"""Product Bundle on_update hook: recompute the bundle at every seeded warehouse."""
+	try:
+		refresh([doc.new_item_code], _seeded_warehouses())
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Bundle Availability Error")
+
+
+def on_product_bundle_trash(doc, method=None):
+	"""Product Bundle on_trash hook: drop the bundle's rows."""
+	frappe.db.delete("POS Bundle Availability", {"bundle_item": doc.new_item_code})
+
+
+# ==========================================
+# Background Jobs
+# ==========================================
+
+
+def process_dirty():
+	"""Drain dirty (component, warehouse) pairs and refresh the affected bundles."""
+	while True:
+		pipe = frappe.cache().pipeline()
+		pipe.spop(raw_key(DIRTY_KEY), CHUNK_SIZE)
+		members = pipe.execute()[0]
+		if not members:
+			break
+
+		_defer_seeding(members)
+
+		components = set()
+		leaves = set()
+		for member in members:
+			item_code, _sep, warehouse = frappe.safe_decode(member).partition(_SEPARATOR)
+			components.add(item_code)
+			leaves.add(warehouse)
+
+		bundles = frappe.db.sql_list(
+			"""
+			SELECT DISTINCT pb.new_item_code
+			FROM `tabProduct Bundle` pb
+			INNER JOIN `tabProduct Bundle Item` pbi ON pbi.parent = pb.name
+			WHERE pbi.item_code IN %s
+			""",
+			[list(components)],
+		)
+		if not bundles:
+			continue
+
+		warehouses = [
+			warehouse
+			for warehouse in _seeded_warehouses()
+			if leaves.intersection(warehouse_tree.get_leaf_warehouses(warehouse))
+		]
+		refresh(bundles, warehouses)
+		frappe.db.commit()
+
+
+def _defer_seeding(members):
+	"""Keep popped pairs of warehouses being seeded until the seed has finished."""
+	seeding = _seeding_warehouses()
+	if not seeding:
+		return
+
+	seeding_leaves = set()
+	for warehouse in seeding:
+		seeding_leaves.update(warehouse_tree.get_leaf_warehouses(warehouse))
+
+	deferred = [
+		member for member in members if frappe.safe_decode(member).partition(_SEPARATOR)[2] in seeding_leaves
+	]
+	if not deferred:
+		return
+
+	frappe.cache().sadd(DEFERRED_KEY, *deferred)
+	# A seed that finished meanwhile may have replayed before these were added
+	if not seeding <= _seeding_warehouses():
+		_replay_deferred()
+
+
+def requeue_dirty():
+	"""Scheduler: queue the refresh job for pairs marked while the last job was finishing."""
+	if frappe.cache().scard(raw_key(DIRTY_KEY)):
+		queue_refresh()
+
+
+def refresh_all():
+	"""Hourly: recompute every bundle at every seeded warehouse."""
+	warehouses = _seeded_warehouses()
+	if not warehouses:
+		return
+
+	refresh(frappe.get_all("Product Bundle", pluck="new_item_code"), warehouses)
+	frappe.db.commit()
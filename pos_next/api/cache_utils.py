@@ -0,0 +1,101 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Cache Utils
+Redis helpers shared by the POS API caches.
+
+- ``raw_key`` prefixes a key for calls that bypass RedisWrapper's own
+  prefixing (pipelines, Lua scripts, counters and other raw commands)
+- generation / version counters retire cached data: readers embed the
+  counter in their keys or compare it with their own copy
+- ``invalidate_after_commit`` defers a counter bump to commit time
+- ``GenerationCache`` shares loaded values through Redis under a generation
+  counter and memoizes them on ``frappe.local`` for the rest of the request
+"""
+
+import frappe
+
+
+def raw_key(key):
+	"""Prefix a key the way RedisWrapper does, for raw client calls."""
+	return frappe.cache().make_key(key)
+
+
+def get_counter(key):
+	return int(frappe.cache().get(raw_key(key)) or 0)
+
+
+def bump_counter(key):
+	return frappe.cache().incr(raw_key(key))
+
+
+def invalidate_after_commit(invalidate):
+	"""
+	Run a cache invalidation once the current transaction commits.
+
+	Bumping a counter before commit would let another process re-cache the
+	pre-change values under the new generation or version.
+	"""
+	frappe.db.after_commit.add(invalidate)
+
+
+class GenerationCache:
+	"""
+	Loaded values shared through Redis under a generation counter.
+
+	Entries are stored at ``pos_next:<name>:<generation>:<key parts>``, so a
+	generation bump retires all of them at once. A request that changed the
+	underlying data loads values itself until it ends: its changes are not
+	committed yet and must not be shared.
+	"""
+
+	def __init__(self, name, ttl):
+		self.prefix = f"pos_next:{name}"
+		self.generation_key = f"pos_next:{name}_generation"
+		self.ttl = ttl
+		self._memo_attr = f"pos_next_{name}"
+		self._changed_attr = f"pos_next_{name}_changed"
+
+	def get_generation(self):
+		return get_counter(self.generation_key)
+
+	def get(self, key, loader):
+		"""
+		Return the value of a key, loading it on a miss.
+
+		Args:
+			key (tuple): Key parts (strings)
+			loader (callable): Returns the value; must not return None (read as a miss)
+		"""
+		memo = getattr(frappe.local, self._memo_attr, None)
+		if memo is None:
+			memo = {}
+			setattr(frappe.local, self._memo_attr, memo)
+
+		if key in memo:
+			return memo[key]
+
+		if getattr(frappe.local, self._changed_attr, False):
+			value = loader()
+		else:
+			cache_key = ":".join([self.prefix, str(self.get_generation()), *key])
+			value = frappe.cache().get_value(cache_key)
+			if value is None:
+				value = loader()
+				frappe.cache().set_value(cache_key, value, expires_in_sec=self.ttl)
+
+		memo[key] = value
+		return value
+
+	def invalidate(self):
+		"""Retire every entry, in Redis and in this request."""
+		setattr(frappe.local, self._memo_attr, {})
+		setattr(frappe.local, self._changed_attr, False)
+		bump_counter(self.generation_key)
+
+	def invalidate_after_commit(self):
+		"""Invalidate now for this request and again once the change is committed."""
+		setattr(frappe.local, self._memo_attr, {})
+		setattr(frappe.local, self._changed_attr, True)
+		invalidate_after_commit(self.invalidate)
@@ -0,0 +1,254 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Catalog Cache
+Shared Redis snapshots of enriched get_items browse pages.
+
+Every terminal on the same POS Profile asks for the same pages, so the
+enriched rows (prices, barcodes, UOMs, variant-derived prices) are stored once
+per profile, price list, item group and page window and reused by all tills.
+
+Two layers are kept:
+- page snapshots: everything except stock, invalidated precisely per item from
+  Item / Item Price doc events (Item Barcode and UOM Conversion Detail are
+  child rows, so they are saved - and invalidated - with their Item)
+- stock overlay: per-page stock maps with a short TTL, since Bin changes with
+  every sale
+
+Changes that can move items between pages (new, deleted or renamed items,
+name / group / company / sellable flags) bump a generation counter instead,
+which retires every page at once.
+
+Both kinds of invalidation also advance a version counter. A page is only
+stored if the version it was computed under is still current, so a page read
+before an invalidation cannot be cached after it. Doc events invalidate
+again once their transaction commits, for pages read in between.
+"""
+
+import hashlib
+import json
+
+import frappe
+
+from pos_next.api.cache_utils import bump_counter, get_counter, invalidate_after_commit, raw_key
+
+PAGE_TTL = 6 * 60 * 60
+STOCK_TTL = 15
+
+GENERATION_KEY = "pos_next:catalog_generation"
+VERSION_KEY = "pos_next:catalog_version"
+STATS_KEY = "pos_next:catalog_cache_stats"
+PAGE_KEY_PREFIX = "pos_next:catalog_page"
+ITEM_PAGES_PREFIX = "pos_next:catalog_item_pages"
+
+# Item fields that decide which page (if any) an item appears on
+COMPOSITION_FIELDS = (
+	"item_name",
+	"item_group",
+	"disabled",
+	"is_sales_item",
+	"variant_of",
+	"custom_company",
+)
+
+# Restrictions that make frappe.get_list results differ per user
+RESTRICTED_DOCTYPES = ("Item", "Item Group", "Brand", "Company")
+
+
+def get_version():
+	"""Return the invalidation version; pass it to set_page for pages computed after this call."""
+	return get_counter(VERSION_KEY)
+
+
+def bump_generation():
+	"""Retire every cached catalog page."""
+	bump_counter(VERSION_KEY)
+	bump_counter(GENERATION_KEY)
+
+
+def _count(field):
+	try:
+		frappe.cache().hincrby(raw_key(STATS_KEY), field, 1)
+	except Exception:
+		pass
+
+
+def _can_share_results():
+	"""Shared pages are only safe when the user sees the unrestricted catalog."""
+	if not frappe.has_permission("Item", "read"):
+		return False
+
+	from frappe.core.doctype.user_permission.user_permission import get_user_permissions
+
+	user_permissions = get_user_permissions(frappe.session.user) or {}
+	return not any(doctype in user_permissions for doctype in RESTRICTED_DOCTYPES)
+
+
+def get_page_key(pos_profile_doc, item_group, start, limit):
+	"""
+	Return the cache key for a browse page, or None when it must not be shared.
+
+	``start`` is the page position: an offset or a keyset cursor.
+
+	The profile's ``modified`` is part of the key so warehouse, price list or
+	item group changes on the profile are picked up without explicit invalidation.
+	"""
+	if not _can_share_results():
+		return None
+
+	signature = json.dumps(
+		[
+			pos_profile_doc.name,
+			str(pos_profile_doc.modified),
+			pos_profile_doc.selling_price_list,
+			item_group or "",
+			str(start or 0),
+			int(limit or 0),
+		]
+	)
+	digest = hashlib.sha1(signature.encode()).hexdigest()
+	return f"{PAGE_KEY_PREFIX}:{get_counter(GENERATION_KEY)}:{digest}"
+
+
+def get_page(cache_key):
+	"""Return a copy of the cached page rows (without stock), or None on a miss."""
+	if not cache_key:
+		return None
+
+	rows = frappe.cache().get_value(cache_key)
+	if rows is None:
+		_count("miss")
+		return None
+
+	_count("hit")
+	return [dict(row) for row in rows]
+
+
+def set_page(cache_key, items, version):
+	"""
+	Store a page and register it under each item it contains.
+
+	``version`` is ``get_version()`` taken before the page was computed; the
+	page is not kept when an invalidation happened since.
+	"""
+	if not cache_key:
+		return
+
+	if get_version() != version:
+		_count("stale")
+		return
+
+	cache = frappe.cache()
+	cache.set_value(cache_key, [dict(row) for row in items], expires_in_sec=PAGE_TTL)
+
+	for item in items:
+		index_key = f"{ITEM_PAGES_PREFIX}:{item['item_code']}"
+		cache.sadd(index_key, cache_key)
+		cache.expire(raw_key(index_key), PAGE_TTL)
+
+	# An invalidation that ran while the page was being registered may have
+	# missed it
+	if get_version() != version:
+		_count("stale")
+		cache.delete_value(cache_key)
+
+
+def get_stock(cache_key):
+	"""Return the cached (stock_map, bundle_availability_map) for a page, or None."""
+	if not cache_key:
+		return None
+
+	stock = frappe.cache().get_value(f"{cache_key}:stock")
+	_count("stock_hit" if stock is not None else "stock_miss")
+	return stock
+
+
+def set_stock(cache_key, stock):
+	if cache_key:
+		frappe.cache().set_value(f"{cache_key}:stock", stock, expires_in_sec=STOCK_TTL)
+
+
+def invalidate_items(item_codes):
+	"""Drop every cached page containing any of the given items."""
+	bump_counter(VERSION_KEY)
+	cache = frappe.cache()
+	for item_code in {code for code in item_codes if code}:
+		index_key = f"{ITEM_PAGES_PREFIX}:{item_code}"
+		page_keys = [frappe.safe_decode(key) for key in cache.smembers(index_key)]
+		if page_keys:
+			cache.delete_value(page_keys + [f"{key}:stock" for key in page_keys])
+		cache.delete_value(index_key)
+
+
+@frappe.whitelist()
+def get_catalog_cache_stats():
+	"""Return catalog cache hit / miss counters (System Manager only)."""
+	frappe.only_for("System Manager")
+
+	raw = frappe.cache().hgetall(raw_key(STATS_KEY)) or {}
+	stats = {frappe.safe_decode(k): int(v) for k, v in raw.items()}
+	hits = stats.get("hit", 0)
+	misses = stats.get("miss", 0)
+
+	return {
+		"hits": hits,
+		"misses": misses,
+		"hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0,
+		"stock_hits": stats.get("stock_hit", 0),
+		"stock_misses": stats.get("stock_miss", 0),
+		"stale_skips": stats.get("stale", 0),
+		"generation": get_counter(GENERATION_KEY),
+	}
+
+
+# ==========================================
+# Doc Events
+# ==========================================
+
+
+def _invalidate_now_and_after_commit(fn, *args):
+	"""Invalidate now and again once committed, when other requests see the change."""
+	fn(*args)
+
+	def after_commit():
+		try:
+			fn(*args)
+		except Exception:
+			frappe.log_error(frappe.get_traceback(), "Catalog Cache Error")
+
+	invalidate_after_commit(after_commit)
+
+
+def on_item_update(doc, method=None):
+	"""Item on_update hook: refresh the pages showing the item (or its template)."""
+	try:
+		if any(doc.has_value_changed(field) for field in COMPOSITION_FIELDS):
+			_invalidate_now_and_after_commit(bump_generation)
+		else:
+			_invalidate_now_and_after_commit(invalidate_items, [doc.name, doc.variant_of])
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Catalog Cache Error")
+
+
+def on_item_structure_change(doc, method=None, *args):
+	"""Item after_rename / on_trash hook: page membership shifts, retire all pages."""
+	try:
+		_invalidate_now_and_after_commit(bump_generation)
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Catalog Cache Error")
+
+
+def on_item_price_change(doc, method=None):
+	"""Item Price on_update / on_trash hook: refresh the item and its template."""
+	try:
+		item_codes = [doc.item_code]
+		previous = doc.get_doc_before_save()
+		if previous:
+			item_codes.append(previous.item_code)
+		item_codes.extend(
+			frappe.get_all("Item", filters={"name": ["in", item_codes]}, pluck="variant_of")
+		)
+		_invalidate_now_and_after_commit(invalidate_items, item_codes)
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Catalog Cache Error")
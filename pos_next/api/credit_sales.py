@@ -13,6 +13,8 @@ import frappe
 from frappe import _
 from frappe.utils import flt, nowdate, today, cint, get_datetime
 
+from pos_next.api.pos_config import get_pos_settings
+
 
 @frappe.whitelist()
 def get_customer_balance(customer, company=None):
@@ -119,12 +121,7 @@ def check_credit_sale_enabled(pos_profile):
 		return False
 
 	# Get POS Settings for the profile
-	pos_settings = frappe.db.get_value(
-		"POS Settings",
-		{"pos_profile": pos_profile},
-		"allow_credit_sale",
-		as_dict=False
-	)
+	pos_settings = get_pos_settings(pos_profile, "allow_credit_sale")
 
 	return bool(pos_settings)
 
@@ -279,6 +276,11 @@ def redeem_customer_credit(invoice_name, customer_credit_dict):
 	return created_journal_entries
 
 
+def redeem_customer_credit_task(sales_invoice, payload):
+	"""Post-submit task: redeem the credit a POS invoice was paid with."""
+	redeem_customer_credit(sales_invoice, (payload or {}).get("customer_credit_dict"))
+
+
 def _create_credit_allocation_journal_entry(invoice_doc, original_invoice_name, amount):
 	"""
 	Create Journal Entry to allocate credit from one invoice to another.
@@ -0,0 +1,339 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Invoice Submissions
+Asynchronous invoice submission with receipt tokens.
+
+With "Allow Submissions in Background Job" set in POS Settings, the cashier
+no longer waits for save, submit, GL and stock ledger posting, loyalty,
+coupon and credit redemption. ``submit_invoice_async`` runs the cheap checks
+(customer, items, stock), stores the payload as a POS Invoice Submission and
+returns its name as the receipt token. A background job per opening shift
+then submits the shift's queued invoices one at a time, in the order they
+were taken, and reports each outcome:
+
+- a ``pos_invoice_submission`` realtime event to the cashier
+- ``get_submission_status(token)`` for terminals that missed the event
+
+Transient errors (deadlocks, lock wait timeouts, lost connections) are
+retried with exponential backoff, holding back the shift's later invoices;
+after MAX_ATTEMPTS, or on any other error, the submission is Failed. The
+sale was already paid at the till, so ``requeue_submission(token)`` puts a
+Failed submission back in the queue once the cause is fixed.
+
+Every queued sale carries a posa_offline_id, so a retried request returns
+the existing token and a retried job replays the invoice it already made.
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint, cstr, flt, get_datetime, now_datetime
+
+from pos_next.api import queue_utils
+from pos_next.api.pos_config import get_pos_settings
+
+DOCTYPE = "POS Invoice Submission"
+EVENT = "pos_invoice_submission"
+JOB_ID_PREFIX = "pos_next_invoice_submissions"
+
+KEEP_COMPLETED_DAYS = 7
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+
+STATUS_QUEUED = "Queued"
+STATUS_PROCESSING = "Processing"
+STATUS_RETRYING = "Retrying"
+STATUS_COMPLETED = "Completed"
+STATUS_FAILED = "Failed"
+
+PENDING_STATUSES = (STATUS_QUEUED, STATUS_PROCESSING, STATUS_RETRYING)
+
+
+def is_enabled(pos_profile):
+	return bool(cint(get_pos_settings(pos_profile, "allow_submissions_in_background_job")))
+
+
+@frappe.whitelist()
+def submit_invoice_async(invoice=None, data=None):
+	"""
+	Queue an invoice for background submission and return a receipt token.
+
+	Takes the same parameters as ``submit_invoice``. Documents other than
+	Sales Invoice, invoices without an opening shift and profiles without
+	background submissions are submitted right away instead.
+
+	Returns:
+		dict: {
+			"token": POS Invoice Submission name (None when submitted right away),
+			"status": Queued / Processing / Completed / Failed,
+			"sales_invoice": invoice name once completed,
+			"result": the submit_invoice result once completed,
+			"error": error message when failed,
+		}
+	"""
+	from pos_next.api.invoices import _parse_submit_args, _submit_invoice
+
+	invoice, data = _parse_submit_args(invoice, data)
+	pos_profile = invoice.get("pos_profile")
+	pos_opening_shift = invoice.get("posa_pos_opening_shift")
+
+	if (
+		invoice.get("doctype", "Sales Invoice") != "Sales Invoice"
+		or not pos_opening_shift
+		or not is_enabled(pos_profile)
+	):
+		result = _submit_invoice(invoice, data)
+		return {
+			"token": None,
+			"status": STATUS_COMPLETED,
+			"sales_invoice": result.get("name"),
+			"result": result,
+			"error": None,
+		}
+
+	# The job relies on the offline id to never submit a sale twice
+	invoice["posa_offline_id"] = invoice.get("posa_offline_id") or frappe.generate_hash(length=20)
+	offline_id = invoice["posa_offline_id"]
+
+	existing = frappe.db.get_value(DOCTYPE, {"offline_id": offline_id}, "name")
+	if existing:
+		return _get_status(frappe.get_doc(DOCTYPE, existing))
+
+	_validate_invoice(invoice, data)
+
+	submission = frappe.get_doc(
+		{
+			"doctype": DOCTYPE,
+			"status": STATUS_QUEUED,
+			"pos_profile": pos_profile,
+			"pos_opening_shift": pos_opening_shift,
+			"customer": invoice.get("customer"),
+			"offline_id": offline_id,
+			"payload": json.dumps({"invoice": invoice, "data": data}, default=str),
+		}
+	)
+	try:
+		submission.insert(ignore_permissions=True)
+	except frappe.UniqueValidationError:
+		# A concurrent retry of the same sale queued it first
+		frappe.db.rollback()
+		return _get_status(frappe.get_doc(DOCTYPE, {"offline_id": offline_id}))
+
+	queue_shift(pos_opening_shift)
+	return _get_status(submission)
+
+
+@frappe.whitelist()
+def get_submission_status(token):
+	"""
+	Return the outcome of a queued invoice.
+
+	Args:
+		token (str): Receipt token returned by ``submit_invoice_async``
+
+	Returns:
+		dict: Same shape as ``submit_invoice_async``
+	"""
+	submission = frappe.get_doc(DOCTYPE, token)
+	if submission.owner != frappe.session.user:
+		submission.check_permission("read")
+
+	return _get_status(submission)
+
+
+@frappe.whitelist()
+def requeue_submission(token):
+	"""
+	Queue a Failed invoice for submission again.
+
+	Args:
+		token (str): Receipt token returned by ``submit_invoice_async``
+
+	Returns:
+		dict: Same shape as ``submit_invoice_async``
+	"""
+	submission = frappe.get_doc(DOCTYPE, token)
+	if submission.owner != frappe.session.user:
+		submission.check_permission("write")
+
+	if submission.status != STATUS_FAILED:
+		frappe.throw(_("Only failed submissions can be queued again"))
+
+	submission.db_set({"status": STATUS_QUEUED, "attempts": 0, "next_attempt": None, "error": None})
+	queue_shift(submission.pos_opening_shift)
+	return _get_status(submission)
+
+
+def _get_status(submission):
+	result = None
+	if submission.status == STATUS_COMPLETED and submission.sales_invoice:
+		from pos_next.api.invoices import _get_submit_result
+
+		result = _get_submit_result(frappe.get_doc("Sales Invoice", submission.sales_invoice))
+
+	return {
+		"token": submission.name,
+		"status": submission.status,
+		"sales_invoice": submission.sales_invoice,
+		"result": result,
+		"error": submission.error,
+	}
+
+
+def _validate_invoice(invoice, data):
+	"""Checks that would otherwise only fail in the background job."""
+	from pos_next.api.invoices import _collect_stock_errors, _should_block
+
+	if not invoice.get("customer"):
+		frappe.throw(_("Customer is required"))
+
+	items = [item for item in invoice.get("items") or [] if item.get("item_code")]
+	if not items:
+		frappe.throw(_("Cannot submit an invoice without items"))
+
+	# Once queued, the sale is final and an exhausted coupon is only logged
+	coupon_code = invoice.get("coupon_code") or data.get("coupon_code")
+	if coupon_code and not invoice.get("is_return") and frappe.db.table_exists("POS Coupon"):
+		from pos_next.pos_next.doctype.pos_coupon.pos_coupon import coupon_has_uses_left
+
+		if not coupon_has_uses_left(coupon_code):
+			frappe.throw(_("Sorry, coupon code {0} is disabled or has been fully redeemed").format(coupon_code))
+
+	pos_profile = invoice.get("pos_profile")
+	if not _should_block(pos_profile):
+		return
+
+	stock_items = set(
+		frappe.get_all(
+			"Item",
+			filters={"name": ["in", list({item.get("item_code") for item in items})], "is_stock_item": 1},
+			pluck="name",
+		)
+	)
+	errors = _collect_stock_errors(
+		[item for item in items if item.get("item_code") in stock_items and flt(item.get("qty")) > 0],
+		pos_profile,
+		data.get("reservation_id"),
+	)
+	if errors:
+		frappe.throw(frappe.as_json({"errors": errors}), frappe.ValidationError)
+
+
+def queue_shift(pos_opening_shift):
+	frappe.enqueue(
+		"pos_next.api.invoice_submissions.process_shift",
+		queue="short",
+		job_id=f"{JOB_ID_PREFIX}:{pos_opening_shift}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		pos_opening_shift=pos_opening_shift,
+	)
+
+
+def _publish(submission):
+	frappe.publish_realtime(EVENT, message=_get_status(submission), user=submission.owner)
+
+
+# ==========================================
+# Background Jobs
+# ==========================================
+
+
+def process_shift(pos_opening_shift):
+	"""Submit a shift's pending invoices one at a time, oldest first, stopping at one waiting for a retry."""
+	processed = set()
+	while True:
+		pending = frappe.db.get_value(
+			DOCTYPE,
+			{"pos_opening_shift": pos_opening_shift, "status": ["in", PENDING_STATUSES]},
+			["name", "status", "next_attempt"],
+			order_by="creation asc",
+			as_dict=True,
+		)
+		if not pending or pending.name in processed:
+			break
+		if pending.status == STATUS_RETRYING and get_datetime(pending.next_attempt) > now_datetime():
+			break
+
+		processed.add(pending.name)
+		process_submission(pending.name)
+
+
+def process_submission(name):
+	"""Submit one queued invoice and report the outcome to its cashier."""
+	from pos_next.api.invoices import _submit_invoice
+
+	submission = frappe.get_doc(DOCTYPE, name)
+	if submission.status not in PENDING_STATUSES:
+		return
+
+	frappe.set_user(submission.owner)
+	# Left Processing only when the worker dies; the next run retries it (replay-safe)
+	submission.db_set("status", STATUS_PROCESSING)
+	frappe.db.commit()
+
+	payload = json.loads(submission.payload)
+	try:
+		result = _submit_invoice(payload["invoice"], payload.get("data") or {}, cleanup_on_failure=False)
+		# Same transaction as the invoice: completed exactly when the invoice exists
+		submission.db_set({"status": STATUS_COMPLETED, "sales_invoice": result.get("name"), "error": None})
+		frappe.db.commit()
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.clear_messages()
+
+		attempts = cint(submission.attempts) + 1
+		error = cstr(e) or e.__class__.__name__
+		if _is_transient(e) and attempts < MAX_ATTEMPTS:
+			submission.db_set(
+				{
+					"status": STATUS_RETRYING,
+					"attempts": attempts,
+					"error": error,
+					"next_attempt": queue_utils.next_attempt_at(attempts, RETRY_BASE_SECONDS),
+				}
+			)
+		else:
+			submission.db_set(
+				{"status": STATUS_FAILED, "attempts": attempts, "error": error, "next_attempt": None}
+			)
+			frappe.log_error(
+				title="POS Invoice Submission Failed",
+				message=f"Offline ID: {submission.offline_id}\n{frappe.get_traceback()}",
+				reference_doctype=DOCTYPE,
+				reference_name=submission.name,
+			)
+		frappe.db.commit()
+
+	_publish(submission)
+
+
+def _is_transient(error):
+	"""Whether an error came from the database or a connection rather than the sale itself."""
+	return isinstance(
+		error,
+		(
+			frappe.QueryDeadlockError,
+			frappe.QueryTimeoutError,
+			frappe.db.OperationalError,
+			ConnectionError,
+			TimeoutError,
+		),
+	) or frappe.db.is_interface_error(error)
+
+
+def requeue_stale():
+	"""Scheduler: queue the jobs of shifts with due retries or pending invoices that are not being processed."""
+	for pos_opening_shift in queue_utils.get_groups_to_requeue(
+		DOCTYPE, "pos_opening_shift", STATUS_RETRYING, [STATUS_QUEUED, STATUS_PROCESSING]
+	):
+		queue_shift(pos_opening_shift)
+
+
+def delete_old_submissions():
+	"""Daily: delete submissions completed more than KEEP_COMPLETED_DAYS ago."""
+	queue_utils.delete_completed(DOCTYPE, STATUS_COMPLETED, KEEP_COMPLETED_DAYS)
@@ -9,6 +9,10 @@ from frappe import _
 from frappe.utils import flt, cint, nowdate, nowtime, get_datetime, cstr
 from erpnext.stock.doctype.batch.batch import get_batch_qty, get_batch_no
 from erpnext.accounts.doctype.sales_invoice.sales_invoice import get_bank_cash_account
+from pos_next.api import payment_modes, post_submit, stock_reservations, submit_metrics
+from pos_next.api.pos_config import get_pos_config, get_pos_settings
+from pos_next.api.sales_invoice_hooks import set_tax_inclusive
+from pos_next.api.utilities import decode_cursor, encode_cursor
 
 try:
     from erpnext.accounts.doctype.pricing_rule.pricing_rule import (
@@ -22,6 +26,13 @@ except Exception:  # pragma: no cover - ERPNext not installed in some environmen
     erpnext_get_applied_pricing_rules = None
 
 
+# Maximum invoices accepted by one submit_invoices_bulk call
+BULK_SUBMIT_LIMIT = 100
+
+# Savepoint the save/submit of an invoice runs under
+SUBMIT_SAVEPOINT = "pos_next_submit_invoice"
+
+
 # ==========================================
 # Helper Functions
 # ==========================================
@@ -30,52 +41,10 @@ except Exception:  # pragma: no cover - ERPNext not installed in some environmen
 def get_payment_account(mode_of_payment, company):
     """
     Get account for mode of payment.
-    Tries multiple fallback methods to find a suitable account.
+    Tries multiple fallback methods to find a suitable account
+    (see ``payment_modes.get_payment_account``, cached per (mode, company)).
     """
-    # Try 1: Mode of Payment Account table
-    account = frappe.db.get_value(
-        "Mode of Payment Account",
-        {"parent": mode_of_payment, "company": company},
-        "default_account",
-    )
-    if account:
-        return {"account": account}
-
-    # Try 2: POS Payment Method from POS Profile
-    account = frappe.db.sql(
-        """
-		SELECT ppm.default_account
-		FROM `tabPOS Payment Method` ppm
-		INNER JOIN `tabPOS Profile` pp ON ppm.parent = pp.name
-		WHERE ppm.mode_of_payment = %s
-		AND pp.company = %s
-		AND ppm.default_account IS NOT NULL
-		LIMIT 1
-	""",
-        (mode_of_payment, company),
-        as_dict=1,
-    )
-
-    if account and account[0].default_account:
-        return {"account": account[0].default_account}
-
-    # Try 3: Company default cash account (for cash payments)
-    if "cash" in mode_of_payment.lower():
-        account = frappe.get_value("Company", company, "default_cash_account")
-        if account:
-            return {"account": account}
-
-    # Try 4: Company default bank account
-    account = frappe.get_value("Company", company, "default_bank_account")
-    if account:
-        return {"account": account}
-
-    # Try 5: Any Cash/Bank account for the company
-    account = frappe.db.get_value(
-        "Account",
-        {"company": company, "account_type": ["in", ["Cash", "Bank"]], "is_group": 0},
-        "name",
-    )
+    account = payment_modes.get_payment_account(mode_of_payment, company)
     if account:
         return {"account": account}
 
@@ -93,44 +62,128 @@ def get_payment_account(mode_of_payment, company):
 # ==========================================
 
 
-def _get_available_stock(item):
-    """Return available stock qty for an item row."""
-    warehouse = item.get("warehouse")
-    batch_no = item.get("batch_no")
-    item_code = item.get("item_code")
+def _get_requested_stock_qty(item):
+    """Return the stock UOM quantity requested by an item row."""
+    return flt(
+        item.get("stock_qty")
+        or (flt(item.get("qty")) * flt(item.get("conversion_factor") or 1))
+    )
 
-    if not item_code or not warehouse:
-        return 0
 
-    if batch_no:
-        return get_batch_qty(batch_no, warehouse) or 0
+def _get_bin_stock_bulk(pairs):
+    """Return {(item_code, warehouse): actual_qty} for many pairs in one query."""
+    if not pairs:
+        return {}
 
-    # Get stock from Bin
-    bin_qty = frappe.db.get_value(
-        "Bin", {"item_code": item_code, "warehouse": warehouse}, "actual_qty"
+    rows = frappe.db.sql(
+        """
+        SELECT item_code, warehouse, actual_qty
+        FROM `tabBin`
+        WHERE item_code IN %(item_codes)s
+        AND warehouse IN %(warehouses)s
+        """,
+        {
+            "item_codes": tuple({item_code for item_code, _warehouse in pairs}),
+            "warehouses": tuple({warehouse for _item_code, warehouse in pairs}),
+        },
+        as_dict=1,
     )
-    return flt(bin_qty) or 0
+    return {(row.item_code, row.warehouse): flt(row.actual_qty) for row in rows}
 
 
-def _collect_stock_errors(items):
-    """Return list of items exceeding available stock."""
-    errors = []
+def _get_batch_stock_bulk(pairs):
+    """Return {(batch_no, warehouse): qty} like get_batch_qty, in one ledger query.
+
+    Quantities are summed from Serial and Batch Bundle entries plus legacy
+    Stock Ledger Entry batch_no rows.
+    """
+    if not pairs:
+        return {}
+
+    params = {
+        "batches": tuple({batch_no for batch_no, _warehouse in pairs}),
+        "warehouses": tuple({warehouse for _batch_no, warehouse in pairs}),
+    }
+
+    legacy_condition = ""
+    if frappe.db.has_column("Stock Ledger Entry", "serial_and_batch_bundle"):
+        legacy_condition = "AND IFNULL(serial_and_batch_bundle, '') = ''"
+
+    bundle_query = ""
+    if frappe.db.table_exists("Serial and Batch Entry"):
+        bundle_query = """
+            SELECT sbe.batch_no, sle.warehouse, sbe.qty
+            FROM `tabStock Ledger Entry` sle
+            INNER JOIN `tabSerial and Batch Entry` sbe ON sbe.parent = sle.serial_and_batch_bundle
+            WHERE sle.is_cancelled = 0
+            AND sbe.batch_no IN %(batches)s
+            AND sle.warehouse IN %(warehouses)s
+            UNION ALL
+        """
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT batch_no, warehouse, SUM(qty) AS qty
+        FROM (
+            {bundle_query}
+            SELECT batch_no, warehouse, actual_qty AS qty
+            FROM `tabStock Ledger Entry`
+            WHERE is_cancelled = 0
+            AND batch_no IN %(batches)s
+            AND warehouse IN %(warehouses)s
+            {legacy_condition}
+        ) batch_ledger
+        GROUP BY batch_no, warehouse
+        """,
+        params,
+        as_dict=1,
+    )
+    return {(row.batch_no, row.warehouse): flt(row.qty) for row in rows}
+
+
+def _collect_stock_errors(items, pos_profile=None, reservation_id=None):
+    """Return list of items exceeding available stock.
+
+    Requested stock_qty is summed per (item, warehouse, batch), so an item
+    split over several lines is checked against its availability once.
+    Availability comes from one Bin query and one batch ledger query. With
+    stock reservations enabled for the profile, quantities other carts have
+    reserved are not available (the caller's own cart is excluded).
+    """
+    requested = {}
     for d in items:
         if flt(d.get("qty")) < 0:
             continue
 
-        available = _get_available_stock(d)
-        requested = flt(
-            d.get("stock_qty")
-            or (flt(d.get("qty")) * flt(d.get("conversion_factor") or 1))
-        )
+        key = (d.get("item_code"), d.get("warehouse"), d.get("batch_no") or None)
+        requested[key] = requested.get(key, 0) + _get_requested_stock_qty(d)
+
+    valid_keys = [key for key in requested if key[0] and key[1]]
+    bin_pairs = {(item_code, warehouse) for item_code, warehouse, batch_no in valid_keys if not batch_no}
+    bin_stock = _get_bin_stock_bulk(bin_pairs)
+    if pos_profile and stock_reservations.is_enabled(pos_profile):
+        reserved = stock_reservations.get_reserved_by_others(bin_pairs, reservation_id)
+        for pair, qty in reserved.items():
+            bin_stock[pair] = bin_stock.get(pair, 0) - qty
+    batch_stock = _get_batch_stock_bulk(
+        {(batch_no, warehouse) for _item_code, warehouse, batch_no in valid_keys if batch_no}
+    )
+
+    errors = []
+    for (item_code, warehouse, batch_no), requested_qty in requested.items():
+        if not item_code or not warehouse:
+            available = 0
+        elif batch_no:
+            available = batch_stock.get((batch_no, warehouse), 0)
+        else:
+            available = bin_stock.get((item_code, warehouse), 0)
 
-        if requested > available:
+        if requested_qty > available:
             errors.append(
                 {
-                    "item_code": d.get("item_code"),
-                    "warehouse": d.get("warehouse"),
-                    "requested_qty": requested,
+                    "item_code": item_code,
+                    "warehouse": warehouse,
+                    "requested_qty": requested_qty,
                     "available_qty": available,
                 }
             )
@@ -140,40 +193,27 @@ def _collect_stock_errors(items):
 
 def _should_block(pos_profile):
     """Check if sale should be blocked for insufficient stock."""
+    config = get_pos_config(pos_profile)
+
     # First check global ERPNext Stock Settings
-    allow_negative = cint(
-        frappe.db.get_single_value("Stock Settings", "allow_negative_stock") or 0
-    )
-    if allow_negative:
+    if config.stock_allow_negative_stock:
         return False
 
     # Check POS Settings for the specific profile
     if pos_profile:
         # Check if POS Settings allows negative stock
-        pos_settings_allow_negative = cint(
-            frappe.db.get_value(
-                "POS Settings",
-                {"pos_profile": pos_profile},
-                "allow_negative_stock"
-            ) or 0
-        )
-        if pos_settings_allow_negative:
+        if cint((config.settings or {}).get("allow_negative_stock")):
             return False
 
-        # Try to get custom field (may not exist in vanilla ERPNext)
-        block_sale = cint(
-            frappe.db.get_value(
-                "POS Profile", pos_profile, "posa_block_sale_beyond_available_qty"
-            )
-            or 1
-        )
+        # Custom field (may not exist in vanilla ERPNext)
+        block_sale = cint(config.profile.get("posa_block_sale_beyond_available_qty") or 1)
         return bool(block_sale)
 
     # Default to blocking if no profile specified
     return True
 
 
-def _validate_stock_on_invoice(invoice_doc):
+def _validate_stock_on_invoice(invoice_doc, reservation_id=None):
     """Validate stock availability before submission."""
     if invoice_doc.doctype == "Sales Invoice" and not cint(
         getattr(invoice_doc, "update_stock", 0)
@@ -188,7 +228,9 @@ def _validate_stock_on_invoice(invoice_doc):
         items_to_check.extend([d.as_dict() for d in invoice_doc.packed_items])
 
     # Check for stock errors
-    errors = _collect_stock_errors(items_to_check)
+    errors = _collect_stock_errors(
+        items_to_check, invoice_doc.get("pos_profile"), reservation_id
+    )
 
     # Throw error if stock insufficient and blocking is enabled
     if errors and _should_block(invoice_doc.pos_profile):
@@ -233,7 +275,7 @@ def _auto_set_return_batches(invoice_doc):
 
 
 @frappe.whitelist()
-def validate_cart_items(items, pos_profile=None):
+def validate_cart_items(items, pos_profile=None, reservation_id=None):
     """Validate cart items for available stock.
 
     Returns a list of item dicts where requested quantity exceeds availability.
@@ -248,7 +290,7 @@ def validate_cart_items(items, pos_profile=None):
     if not _should_block(pos_profile):
         return []
 
-    errors = _collect_stock_errors(items)
+    errors = _collect_stock_errors(items, pos_profile, reservation_id)
     if not errors:
         return []
 
@@ -306,6 +348,10 @@ def validate_return_items(original_invoice_name, return_items, doctype="Sales In
 @frappe.whitelist()
 def update_invoice(data):
     """Create or update invoice draft (Step 1)."""
+    trace = submit_metrics.start_trace("update_invoice")
+    trace.enter("prepare")
+    invoice_doc = None
+    failed = False
     try:
         data = json.loads(data) if isinstance(data, str) else data
 
@@ -444,11 +490,7 @@ def update_invoice(data):
 
         if pos_profile:
             try:
-                pos_settings_value = frappe.db.get_value(
-                    "POS Settings",
-                    {"pos_profile": pos_profile},
-                    "disable_rounded_total"
-                )
+                pos_settings_value = get_pos_settings(pos_profile, "disable_rounded_total")
                 if pos_settings_value is not None:
                     disable_rounded = cint(pos_settings_value)
             except Exception as e:
@@ -460,6 +502,10 @@ def update_invoice(data):
         # Populate missing fields (company, currency, accounts, etc.)
         invoice_doc.set_missing_values()
 
+        # Mark the profile's taxes inclusive now, so this single totals pass
+        # (and the one in validate) use the right flags
+        set_tax_inclusive(invoice_doc)
+
         # Calculate totals and apply discounts (with rounding disabled)
         invoice_doc.calculate_taxes_and_totals()
         if invoice_doc.grand_total is None:
@@ -507,12 +553,17 @@ def update_invoice(data):
                 )
 
                 if not coupon_result.get("valid"):
-                    frappe.throw(_(coupon_result.get("msg", "Invalid coupon code")))
+                    offline_id = data.get("posa_offline_id")
+                    if not offline_id:
+                        frappe.throw(_(coupon_result.get("msg", "Invalid coupon code")))
+                    # The sale already happened at the till; it must still sync
+                    _log_coupon_over_redemption(coupon_code, offline_id, coupon_result.get("msg"))
 
                 # Store coupon code on invoice for tracking
                 invoice_doc.coupon_code = coupon_code
 
         # Save as draft
+        trace.enter("save")
         invoice_doc.flags.ignore_permissions = True
         frappe.flags.ignore_account_permission = True
         invoice_doc.docstatus = 0
@@ -520,202 +571,411 @@ def update_invoice(data):
 
         return invoice_doc.as_dict()
     except Exception as e:
+        failed = True
         frappe.log_error(frappe.get_traceback(), "Update Invoice Error")
         raise
+    finally:
+        trace.finish(reference=invoice_doc.name if invoice_doc else None, failed=failed)
 
 
-@frappe.whitelist()
-def submit_invoice(invoice=None, data=None):
-    """Submit the invoice (Step 2)."""
-    try:
+def _find_offline_invoice(offline_id):
+    """Return {name, docstatus} of the Sales Invoice recorded for a client offline id."""
+    return frappe.db.get_value(
+        "Sales Invoice",
+        {"posa_offline_id": offline_id},
+        ["name", "docstatus"],
+        as_dict=True,
+    )
 
-        # Handle different calling conventions
-        if invoice is None:
-            if data:
-                # Check if data is a JSON string containing both params
-                data_parsed = json.loads(data) if isinstance(data, str) else data
-
-                # frappe-ui might send all params nested in data
-                if isinstance(data_parsed, dict):
-                    if "invoice" in data_parsed:
-                        invoice = data_parsed.get("invoice")
-                        data = data_parsed.get("data", {})
-                    elif "name" in data_parsed or "doctype" in data_parsed:
-                        # Data itself might be the invoice
-                        invoice = data_parsed
-                        data = {}
-                    else:
-                        frappe.throw(
-                            _("Missing invoice parameter. Received data: {0}").format(
-                                json.dumps(data_parsed, default=str)
-                            )
-                        )
+
+def _get_submit_result(invoice_doc, replayed=False):
+    """Return the submit_invoice response for an invoice."""
+    result = {
+        "name": invoice_doc.name,
+        "status": invoice_doc.docstatus,
+        "grand_total": invoice_doc.grand_total,
+        "total": invoice_doc.total,
+        "net_total": invoice_doc.net_total,
+        "outstanding_amount": getattr(invoice_doc, "outstanding_amount", 0),
+        "paid_amount": getattr(invoice_doc, "paid_amount", 0),
+        "change_amount": getattr(invoice_doc, "change_amount", 0),
+    }
+    if replayed:
+        result["replayed"] = True
+    return result
+
+
+def _parse_submit_args(invoice=None, data=None):
+    """Return (invoice, data) dicts from the ways submit_invoice gets called."""
+    # Handle different calling conventions
+    if invoice is None:
+        if data:
+            # Check if data is a JSON string containing both params
+            data_parsed = json.loads(data) if isinstance(data, str) else data
+
+            # frappe-ui might send all params nested in data
+            if isinstance(data_parsed, dict):
+                if "invoice" in data_parsed:
+                    invoice = data_parsed.get("invoice")
+                    data = data_parsed.get("data", {})
+                elif "name" in data_parsed or "doctype" in data_parsed:
+                    # Data itself might be the invoice
+                    invoice = data_parsed
+                    data = {}
                 else:
-                    frappe.throw(_("Missing invoice parameter"))
+                    frappe.throw(
+                        _("Missing invoice parameter. Received data: {0}").format(
+                            json.dumps(data_parsed, default=str)
+                        )
+                    )
             else:
-                frappe.throw(_("Both invoice and data parameters are missing"))
+                frappe.throw(_("Missing invoice parameter"))
+        else:
+            frappe.throw(_("Both invoice and data parameters are missing"))
 
-        # Parse JSON strings if needed
-        if isinstance(data, str):
-            data = json.loads(data) if data and data != "{}" else {}
-        if isinstance(invoice, str):
-            invoice = json.loads(invoice)
+    # Parse JSON strings if needed
+    if isinstance(data, str):
+        data = json.loads(data) if data and data != "{}" else {}
+    if isinstance(invoice, str):
+        invoice = json.loads(invoice)
 
-        pos_profile = invoice.get("pos_profile")
-        doctype = invoice.get("doctype", "Sales Invoice")
+    return invoice, data or {}
 
-        invoice_name = invoice.get("name")
 
-        # Get or create invoice
-        if not invoice_name or not frappe.db.exists(doctype, invoice_name):
-            created = update_invoice(json.dumps(invoice))
-            invoice_name = created.get("name")
-            invoice_doc = frappe.get_doc(doctype, invoice_name)
-        else:
-            invoice_doc = frappe.get_doc(doctype, invoice_name)
-            invoice_doc.update(invoice)
+def _log_coupon_over_redemption(coupon_code, offline_id, reason):
+    """Record a coupon honoured at the till that was no longer valid when the sale reached the server."""
+    frappe.log_error(
+        title="POS Coupon Over-Redemption",
+        message=f"Coupon: {coupon_code}\nOffline ID: {offline_id}\nReason: {reason}",
+    )
+
+
+def _get_after_commit_mark():
+    """Return the position in the after-commit queue, for ``_rollback_submit``."""
+    return len(frappe.db.after_commit._functions)
+
+
+def _rollback_submit(after_commit_mark):
+    """Undo a failed submit back to SUBMIT_SAVEPOINT."""
+    try:
+        frappe.db.rollback(save_point=SUBMIT_SAVEPOINT)
+    except Exception:
+        # The database already rolled the whole transaction back (e.g. deadlock);
+        # a full rollback drops every after-commit callback as well
+        frappe.db.rollback()
+        return
+
+    # Work the failed submit queued for after commit (realtime stock events,
+    # reservation release, cache refreshes) must not run; earlier work stays
+    functions = frappe.db.after_commit._functions
+    while len(functions) > after_commit_mark:
+        functions.pop()
+
+
+def _discard_draft(invoice_doc):
+    """Delete the draft of a failed submit; a draft has no ledger entries to reverse."""
+    try:
+        if invoice_doc.name and frappe.db.exists(
+            invoice_doc.doctype, {"name": invoice_doc.name, "docstatus": 0}
+        ):
+            frappe.delete_doc(
+                invoice_doc.doctype,
+                invoice_doc.name,
+                force=True,
+                ignore_permissions=True,
+            )
+            frappe.db.commit()
+    except Exception:
+        # Silent fail on cleanup - don't hide original error
+        pass
+
+
+@frappe.whitelist()
+def submit_invoice(invoice=None, data=None):
+    """Submit the invoice (Step 2).
+
+    A Sales Invoice may carry ``posa_offline_id``, a client-generated id of
+    the sale. It is stored on the invoice (unique) in the same transaction,
+    so a retry of a submission that already went through returns the
+    original invoice instead of creating a second sale.
+    """
+    return _submit_invoice(invoice, data)
 
-        # Ensure update_stock is set for Sales Invoice
+
+def _submit_invoice(invoice=None, data=None, cleanup_on_failure=True):
+    """
+    Body of ``submit_invoice``.
+
+    Draft creation, save and submit run under a savepoint, so a failure is
+    undone without compensating (cancel) ledger postings and a draft created
+    by this call disappears with it; the failed stage is counted in
+    submit_metrics. A draft saved by an earlier request is deleted (and the
+    deletion committed) when saving or submitting it fails, unless
+    ``cleanup_on_failure`` is off and the caller rolls back instead. Every
+    stage is timed as a submit_metrics phase.
+    """
+    offline_id = None
+    failed = False
+    invoice_doc = None
+    trace = submit_metrics.start_trace("submit_invoice")
+    stage = trace.enter("prepare")
+    try:
+
+        invoice, data = _parse_submit_args(invoice, data)
+
+        pos_profile = invoice.get("pos_profile")
+        doctype = invoice.get("doctype", "Sales Invoice")
+
+        # Idempotency: replay the original result for an already processed sale
         if doctype == "Sales Invoice":
-            invoice_doc.update_stock = 1
+            offline_id = invoice.get("posa_offline_id")
+        if offline_id:
+            existing = _find_offline_invoice(offline_id)
+            if existing and existing.docstatus != 0:
+                return _get_submit_result(
+                    frappe.get_doc("Sales Invoice", existing.name), replayed=True
+                )
+            if existing:
+                # Continue with the draft an earlier attempt left behind
+                invoice["name"] = existing.name
 
-        # Copy accounting dimensions from POS Profile if not already set
-        if pos_profile and not invoice_doc.get("branch"):
-            try:
-                pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
-                if hasattr(pos_profile_doc, "branch") and pos_profile_doc.branch:
-                    invoice_doc.branch = pos_profile_doc.branch
-                    # Also set branch on all items for GL entries
-                    for item in invoice_doc.get("items", []):
-                        if not item.get("branch"):
-                            item.branch = pos_profile_doc.branch
-            except Exception:
-                pass  # Branch is optional, continue without it
+        invoice_name = invoice.get("name")
 
-        # Set accounts for all payment methods before saving
-        if doctype == "Sales Invoice" and hasattr(invoice_doc, "payments"):
-            for payment in invoice_doc.payments:
-                if payment.mode_of_payment:
-                    account_info = get_payment_account(
-                        payment.mode_of_payment, invoice_doc.company
-                    )
-                    payment.account = account_info["account"]
+        # Everything up to the coupon redemption is undone by rolling back to
+        # the savepoint, including a draft inserted by update_invoice below.
+        # After-commit work queued from here on is dropped with it; work queued
+        # earlier in the transaction (e.g. by previous invoices) is kept
+        frappe.db.savepoint(SUBMIT_SAVEPOINT)
+        after_commit_mark = _get_after_commit_mark()
+        draft_existed = bool(invoice_name and frappe.db.exists(doctype, invoice_name))
+        try:
+            # Get or create invoice
+            if not draft_existed:
+                created = update_invoice(json.dumps(invoice))
+                invoice_name = created.get("name")
+                invoice_doc = frappe.get_doc(doctype, invoice_name)
+            else:
+                invoice_doc = frappe.get_doc(doctype, invoice_name)
+                invoice_doc.update(invoice)
 
-        # Handle sales team (multiple sales persons)
-        sales_team_data = invoice.get("sales_team") or data.get("sales_team")
-        if sales_team_data:
-            # Clear existing sales team entries
-            invoice_doc.sales_team = []
-
-            # Add new sales team entries
-            for member in sales_team_data:
-                invoice_doc.append("sales_team", {
-                    "sales_person": member.get("sales_person"),
-                    "allocated_percentage": member.get("allocated_percentage", 0),
-                })
-
-        # Handle POS Coupon if coupon_code is provided
-        coupon_code = invoice.get("coupon_code") or data.get("coupon_code")
-        if coupon_code:
-            # Increment usage counter for POS Coupon
-            if frappe.db.table_exists("POS Coupon"):
+            # Ensure update_stock is set for Sales Invoice
+            if doctype == "Sales Invoice":
+                invoice_doc.update_stock = 1
+
+            # Copy accounting dimensions from POS Profile if not already set
+            if pos_profile and not invoice_doc.get("branch"):
                 try:
-                    from pos_next.pos_next.doctype.pos_coupon.pos_coupon import increment_coupon_usage
-                    increment_coupon_usage(coupon_code)
-                except Exception as e:
-                    frappe.log_error(
-                        title="Failed to increment coupon usage",
-                        message=f"Coupon: {coupon_code}, Error: {str(e)}"
-                    )
+                    pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
+                    if hasattr(pos_profile_doc, "branch") and pos_profile_doc.branch:
+                        invoice_doc.branch = pos_profile_doc.branch
+                        # Also set branch on all items for GL entries
+                        for item in invoice_doc.get("items", []):
+                            if not item.get("branch"):
+                                item.branch = pos_profile_doc.branch
+                except Exception:
+                    pass  # Branch is optional, continue without it
 
-        # Auto-set batch numbers for returns
-        _auto_set_return_batches(invoice_doc)
+            # Set accounts for all payment methods before saving
+            if doctype == "Sales Invoice" and hasattr(invoice_doc, "payments"):
+                for payment in invoice_doc.payments:
+                    if payment.mode_of_payment:
+                        account_info = get_payment_account(
+                            payment.mode_of_payment, invoice_doc.company
+                        )
+                        payment.account = account_info["account"]
+
+            # Handle sales team (multiple sales persons)
+            sales_team_data = invoice.get("sales_team") or data.get("sales_team")
+            if sales_team_data:
+                # Clear existing sales team entries
+                invoice_doc.sales_team = []
+
+                # Add new sales team entries
+                for member in sales_team_data:
+                    invoice_doc.append("sales_team", {
+                        "sales_person": member.get("sales_person"),
+                        "allocated_percentage": member.get("allocated_percentage", 0),
+                    })
+
+            # Auto-set batch numbers for returns
+            _auto_set_return_batches(invoice_doc)
+
+            # Check if POS Settings allows negative stock
+            pos_settings_allow_negative = False
+            if pos_profile:
+                pos_settings_allow_negative = cint(
+                    get_pos_settings(pos_profile, "allow_negative_stock") or 0
+                )
 
-        # Check if POS Settings allows negative stock
-        pos_settings_allow_negative = False
-        if pos_profile:
-            pos_settings_allow_negative = cint(
-                frappe.db.get_value(
-                    "POS Settings",
-                    {"pos_profile": pos_profile},
-                    "allow_negative_stock"
-                ) or 0
+            # Cart reservation made by the terminal (see stock_reservations)
+            reservation_id = data.get("reservation_id")
+
+            # Refuse an exhausted coupon before anything is saved. A sale with an
+            # offline id already happened at the till, so its coupon is never
+            # refused (an over-redemption is logged at redemption instead)
+            coupon_code = invoice.get("coupon_code") or data.get("coupon_code")
+            redeem_coupon = bool(
+                coupon_code and not invoice_doc.get("is_return") and frappe.db.table_exists("POS Coupon")
             )
+            if redeem_coupon and not offline_id:
+                from pos_next.pos_next.doctype.pos_coupon.pos_coupon import coupon_has_uses_left
 
-        # Validate stock availability only if negative stock is not allowed
-        if not pos_settings_allow_negative:
-            _validate_stock_on_invoice(invoice_doc)
+                if not coupon_has_uses_left(coupon_code):
+                    frappe.throw(
+                        _("Sorry, coupon code {0} is disabled or has been fully redeemed").format(coupon_code)
+                    )
 
-        # Save before submit
-        invoice_doc.flags.ignore_permissions = True
-        frappe.flags.ignore_account_permission = True
-        invoice_doc.save()
+            # Validate stock availability only if negative stock is not allowed
+            stage = trace.enter("stock_validation")
+            if not pos_settings_allow_negative:
+                _validate_stock_on_invoice(invoice_doc, reservation_id)
 
-        # Submit invoice with error handling
-        # Note: Negative stock handling is now done through the CustomSalesInvoice override
-        # which checks POS Settings in the update_stock_ledger method
-        try:
+            # Save before submit
+            stage = trace.enter("save")
+            invoice_doc.flags.ignore_permissions = True
+            frappe.flags.ignore_account_permission = True
+            invoice_doc.save()
+
+            # Note: Negative stock handling is now done through the CustomSalesInvoice override
+            # which checks POS Settings in the update_stock_ledger method
+            stage = trace.enter("submit")
             invoice_doc.submit()
+
+            # Redeem the POS Coupon in the invoice's transaction: the coupon row is
+            # locked only until commit, and a failure gives the use back
+            stage = trace.enter("coupon")
+            if redeem_coupon:
+                from pos_next.pos_next.doctype.pos_coupon.pos_coupon import increment_coupon_usage
+
+                if not increment_coupon_usage(coupon_code) and frappe.db.exists(
+                    "POS Coupon", {"coupon_code": coupon_code.upper()}
+                ):
+                    if not offline_id:
+                        # Lost the last use to a concurrent sale since the check above
+                        frappe.throw(
+                            _("Sorry, coupon code {0} is disabled or has been fully redeemed").format(coupon_code)
+                        )
+                    _log_coupon_over_redemption(
+                        coupon_code, offline_id, "Disabled or fully redeemed when the sale was submitted"
+                    )
         except Exception as submit_error:
-            # If submission fails, cleanup the invoice to prevent stock reservation issues
-            try:
-                # Reload to get current state
-                current_doc = frappe.get_doc("Sales Invoice", invoice_doc.name)
-
-                # If already submitted, must cancel before deleting
-                if current_doc.docstatus == 1:
-                    current_doc.flags.ignore_permissions = True
-                    current_doc.cancel()
-
-                # Now delete the cancelled/draft invoice
-                frappe.delete_doc(
-                    "Sales Invoice",
-                    invoice_doc.name,
-                    force=True,
-                    ignore_permissions=True,
-                )
-                frappe.db.commit()
-            except Exception:
-                # Silent fail on cleanup - don't hide original error
-                pass
+            _rollback_submit(after_commit_mark)
+            replay = offline_id and isinstance(submit_error, frappe.UniqueValidationError)
+            # A draft saved by an earlier request is outside the savepoint; like
+            # before, it is only deleted when saving or submitting it failed
+            if (
+                cleanup_on_failure
+                and draft_existed
+                and not replay
+                and stage in ("save", "submit", "coupon")
+            ):
+                _discard_draft(invoice_doc)
+            raise
 
-            # Re-raise the original submission error
-            raise submit_error
+        stage = trace.enter("post_submit")
 
-        # Handle credit redemption after successful submission
+        # The stock ledger now holds the cart's quantities
+        stock_reservations.release_after_commit(reservation_id)
+
+        # Credit redemption runs as a post-submit task (see post_submit), in
+        # order with the invoice's other side effects
         customer_credit_dict = data.get("customer_credit_dict") or invoice.get("customer_credit_dict")
         redeemed_customer_credit = data.get("redeemed_customer_credit") or invoice.get("redeemed_customer_credit")
 
         if redeemed_customer_credit and customer_credit_dict:
-            try:
-                from pos_next.api.credit_sales import redeem_customer_credit
-                redeem_customer_credit(invoice_doc.name, customer_credit_dict)
-            except Exception as credit_error:
-                frappe.log_error(
-                    title="Credit Redemption Error",
-                    message=f"Invoice: {invoice_doc.name}, Error: {str(credit_error)}\n{frappe.get_traceback()}"
-                )
-                # Don't fail the entire transaction, just log the error
-                frappe.msgprint(
-                    _("Invoice submitted successfully but credit redemption failed. Please contact administrator."),
-                    alert=True,
-                    indicator="orange"
-                )
+            stage = trace.enter("credit_redemption")
+            post_submit.enqueue_task(
+                invoice_doc.name,
+                post_submit.TASK_CREDIT_REDEMPTION,
+                {"customer_credit_dict": customer_credit_dict},
+            )
 
         # Return complete invoice details
-        return {
-            "name": invoice_doc.name,
-            "status": invoice_doc.docstatus,
-            "grand_total": invoice_doc.grand_total,
-            "total": invoice_doc.total,
-            "net_total": invoice_doc.net_total,
-            "outstanding_amount": getattr(invoice_doc, "outstanding_amount", 0),
-            "paid_amount": getattr(invoice_doc, "paid_amount", 0),
-            "change_amount": getattr(invoice_doc, "change_amount", 0),
-        }
+        return _get_submit_result(invoice_doc)
+    except frappe.UniqueValidationError:
+        # A concurrent retry of the same sale inserted the offline id first
+        if offline_id:
+            frappe.db.rollback()
+            existing = _find_offline_invoice(offline_id)
+            if existing and existing.docstatus != 0:
+                return _get_submit_result(
+                    frappe.get_doc("Sales Invoice", existing.name), replayed=True
+                )
+        failed = True
+        submit_metrics.record_failure(stage)
+        frappe.log_error(f"Stage: {stage}\n{frappe.get_traceback()}", "Submit Invoice Error")
+        raise
     except Exception as e:
-        frappe.log_error(frappe.get_traceback(), "Submit Invoice Error")
+        failed = True
+        submit_metrics.record_failure(stage)
+        frappe.log_error(f"Stage: {stage}\n{frappe.get_traceback()}", "Submit Invoice Error")
         raise
+    finally:
+        trace.finish(reference=invoice_doc.name if invoice_doc else offline_id, failed=failed)
+
+
+@frappe.whitelist()
+def submit_invoices_bulk(invoices):
+    """
+    Submit a batch of queued (offline) invoices in one request.
+
+    Each invoice is submitted exactly like ``submit_invoice`` and committed on
+    its own; a failing invoice is rolled back and reported without affecting
+    the rest of the batch. POS Settings, POS Profile and payment account
+    lookups are cached, so the batch resolves them once.
+
+    Args:
+        invoices (list|str): [{"invoice": {...}, "data": {...}}, ...] (a bare
+            invoice dict is accepted too), at most BULK_SUBMIT_LIMIT entries
+
+    Returns:
+        list: One entry per invoice, in order:
+            {"success": True, "offline_id": ..., **submit_invoice result} or
+            {"success": False, "offline_id": ..., "error": message}
+    """
+    if isinstance(invoices, str):
+        invoices = json.loads(invoices)
+
+    if not isinstance(invoices, list):
+        frappe.throw(_("Invoices must be a list"))
+
+    if len(invoices) > BULK_SUBMIT_LIMIT:
+        frappe.throw(
+            _("Cannot submit more than {0} invoices at once").format(BULK_SUBMIT_LIMIT)
+        )
+
+    results = []
+    for entry in invoices:
+        if isinstance(entry, str):
+            entry = json.loads(entry)
+
+        if isinstance(entry, dict) and "invoice" in entry:
+            invoice = entry.get("invoice")
+            data = entry.get("data") or {}
+        else:
+            invoice = entry
+            data = {}
+
+        if isinstance(invoice, str):
+            invoice = json.loads(invoice)
+        offline_id = invoice.get("posa_offline_id") if isinstance(invoice, dict) else None
+
+        try:
+            result = _submit_invoice(invoice, data, cleanup_on_failure=False)
+            # One transaction per invoice: Bin rows are not locked for the whole batch
+            frappe.db.commit()
+            results.append({"success": True, "offline_id": offline_id, **result})
+        except Exception as e:
+            # A full rollback also drops the invoice's pending after-commit work
+            frappe.db.rollback()
+            frappe.clear_messages()
+            results.append({
+                "success": False,
+                "offline_id": offline_id,
+                "error": cstr(e) or e.__class__.__name__,
+            })
+
+    return results
 
 
 # ==========================================
@@ -751,13 +1011,16 @@ def get_invoice(invoice_name):
 
 
 @frappe.whitelist()
-def get_invoices(pos_profile, limit=100):
+def get_invoices(pos_profile, limit=100, cursor=None):
 	"""
 	Get list of invoices for a POS Profile.
 
 	Args:
 		pos_profile: POS Profile name
 		limit: Maximum number of invoices to return (default 100)
+		cursor: Optional keyset cursor ("" for the first page). When given,
+			pages follow (posting_date, posting_time, name) descending and the
+			response becomes {"invoices": [...], "next_cursor": str | None}
 
 	Returns:
 		List of invoices with details
@@ -774,8 +1037,28 @@ def get_invoices(pos_profile, limit=100):
 	if not has_access and not frappe.has_permission("Sales Invoice", "read"):
 		frappe.throw(_("You don't have access to this POS Profile"))
 
+	params = {
+		"pos_profile": pos_profile,
+		"limit": cint(limit)
+	}
+
+	# Keyset condition: strictly older than the last row of the previous page
+	cursor_condition = ""
+	after = decode_cursor(cursor, 3) if cursor is not None else None
+	if after:
+		cursor_condition = """
+			AND (
+				posting_date < %(last_date)s
+				OR (posting_date = %(last_date)s AND (
+					posting_time < %(last_time)s
+					OR (posting_time = %(last_time)s AND name < %(last_name)s)
+				))
+			)
+		"""
+		params.update(last_date=after[0], last_time=after[1], last_name=after[2])
+
 	# Query for invoices
-	invoices = frappe.db.sql("""
+	invoices = frappe.db.sql(f"""
 		SELECT
 			name,
 			customer,
@@ -795,14 +1078,13 @@ def get_invoices(pos_profile, limit=100):
 			pos_profile = %(pos_profile)s
 			AND docstatus = 1
 			AND is_pos = 1
+			{cursor_condition}
 		ORDER BY
 			posting_date DESC,
-			posting_time DESC
+			posting_time DESC,
+			name DESC
 		LIMIT %(limit)s
-	""", {
-		"pos_profile": pos_profile,
-		"limit": limit
-	}, as_dict=True)
+	""", params, as_dict=True)
 
 	# Load items for each invoice for filtering purposes
 	for invoice in invoices:
@@ -824,7 +1106,15 @@ def get_invoices(pos_profile, limit=100):
 		}, as_dict=True)
 		invoice.items = items
 
-	return invoices
+	if cursor is None:
+		return invoices
+
+	next_cursor = None
+	if invoices and len(invoices) == cint(limit):
+		last = invoices[-1]
+		next_cursor = encode_cursor([last.posting_date, last.posting_time, last.name])
+
+	return {"invoices": invoices, "next_cursor": next_cursor}
 
 
 # ==========================================
@@ -0,0 +1,302 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Item Search Index
+Maintains the POS Item Search Token side table used by item search.
+
+Each item is broken into normalized tokens (lowercase, accents stripped,
+split on non-alphanumerics) taken from its code, name, description and
+barcodes. Searches then resolve every query word with an indexed prefix
+lookup (``token LIKE 'word%'``) instead of scanning tabItem with
+``CONCAT(...) LIKE '%word%'``, so latency stays flat as the catalog grows.
+
+Codes and barcodes are also indexed by their suffixes, so a fragment from
+the middle or the tail of a code is a prefix of some token. Fragments from
+the middle of a name or description word are not indexed; callers fall
+back to the substring scan when the index finds nothing.
+"""
+
+import re
+import unicodedata
+
+import frappe
+from frappe import _
+from frappe.utils import cint, strip_html
+
+TOKEN_DOCTYPE = "POS Item Search Token"
+TOKEN_TABLE = "`tabPOS Item Search Token`"
+
+# Data fields are varchar(140)
+MAX_TOKEN_LENGTH = 140
+# Long descriptions only contribute their first distinct words
+MAX_DESCRIPTION_TOKENS = 100
+# Suffixes shorter than this are too unselective to be worth a row
+MIN_SUFFIX_LENGTH = 3
+REBUILD_CHUNK_SIZE = 500
+
+INDEX_READY_CACHE_KEY = "pos_next:item_search_index_ready"
+# Global default set to INDEX_VERSION once a full rebuild has finished;
+# partial indexes miss items
+INDEX_READY_KEY = "pos_next_item_search_index_ready"
+# Bumped whenever tokenization changes, so existing indexes are rebuilt
+INDEX_VERSION = 2
+
+_SPLIT_PATTERN = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_text(text):
+	"""Lowercase text and strip accents so 'Café' and 'cafe' match."""
+	text = unicodedata.normalize("NFKD", str(text or ""))
+	return "".join(c for c in text if not unicodedata.combining(c)).lower().strip()
+
+
+def tokenize(text, keep_whole=False):
+	"""
+	Split text into normalized, de-duplicated tokens.
+
+	Args:
+		text (str): Text to tokenize
+		keep_whole (bool): Also emit the whole normalized value as a token
+			(used for codes and barcodes such as "ABC-001")
+
+	Returns:
+		list: Tokens in first-seen order
+	"""
+	normalized = normalize_text(text)
+	if not normalized:
+		return []
+
+	tokens = [t for t in _SPLIT_PATTERN.split(normalized) if t]
+	if keep_whole:
+		tokens.insert(0, normalized)
+
+	return [t[:MAX_TOKEN_LENGTH] for t in dict.fromkeys(tokens)]
+
+
+def code_suffixes(code):
+	"""Return the suffixes of a normalized code or barcode (longest first, without the code itself)."""
+	normalized = normalize_text(code)[:MAX_TOKEN_LENGTH]
+	return [
+		normalized[i:]
+		for i in range(1, len(normalized) - MIN_SUFFIX_LENGTH + 1)
+		# Queries are split on non-alphanumerics, so they never start a word with one
+		if normalized[i].isalnum()
+	]
+
+
+def _build_item_tokens(item, barcodes):
+	"""Return (token, source) rows for an item and its barcodes."""
+	rows = {}
+
+	for token in tokenize(item.name, keep_whole=True) + code_suffixes(item.name):
+		rows.setdefault(token, "Item Code")
+
+	for token in tokenize(item.item_name):
+		rows.setdefault(token, "Item Name")
+
+	description_tokens = tokenize(strip_html(item.description or ""))
+	for token in description_tokens[:MAX_DESCRIPTION_TOKENS]:
+		rows.setdefault(token, "Description")
+
+	for barcode in barcodes:
+		for token in tokenize(barcode, keep_whole=True) + code_suffixes(barcode):
+			rows.setdefault(token, "Barcode")
+
+	return list(rows.items())
+
+
+def index_items(item_codes):
+	"""
+	(Re)build search tokens for the given items.
+
+	Uses one query for item fields, one for barcodes, one delete and one
+	bulk insert regardless of how many items are passed.
+	"""
+	item_codes = [code for code in dict.fromkeys(item_codes or []) if code]
+	if not item_codes:
+		return
+
+	items = frappe.db.sql(
+		"""
+		SELECT name, item_name, description
+		FROM `tabItem`
+		WHERE name IN %s
+		""",
+		[item_codes],
+		as_dict=1,
+	)
+
+	barcode_map = {}
+	for row in frappe.db.sql(
+		"""
+		SELECT parent, barcode
+		FROM `tabItem Barcode`
+		WHERE parent IN %s AND parenttype = 'Item'
+		""",
+		[item_codes],
+		as_dict=1,
+	):
+		barcode_map.setdefault(row.parent, []).append(row.barcode)
+
+	frappe.db.sql(f"DELETE FROM {TOKEN_TABLE} WHERE item_code IN %s", [item_codes])
+
+	now = frappe.utils.now()
+	values = []
+	for item in items:
+		for token, source in _build_item_tokens(item, barcode_map.get(item.name, [])):
+			values.append(
+				(
+					frappe.generate_hash(length=12),
+					item.name,
+					token,
+					source,
+					now,
+					now,
+					"Administrator",
+					"Administrator",
+				)
+			)
+
+	if values:
+		frappe.db.bulk_insert(
+			TOKEN_DOCTYPE,
+			fields=["name", "item_code", "token", "source", "creation", "modified", "owner", "modified_by"],
+			values=values,
+		)
+
+
+def is_index_ready():
+	"""
+	Return True once a full rebuild of the current INDEX_VERSION has finished.
+
+	The rebuild commits chunk by chunk, so token rows exist long before every
+	item is indexed; until the rebuild sets the ready flag, searches use the
+	substring fallback.
+	"""
+	if cint(frappe.cache().get_value(INDEX_READY_CACHE_KEY)) == INDEX_VERSION:
+		return True
+
+	ready = cint(frappe.db.get_global(INDEX_READY_KEY)) == INDEX_VERSION
+	if ready:
+		frappe.cache().set_value(INDEX_READY_CACHE_KEY, INDEX_VERSION)
+	return ready
+
+
+def _mark_index_ready():
+	frappe.db.set_global(INDEX_READY_KEY, INDEX_VERSION)
+	frappe.db.commit()
+	frappe.cache().set_value(INDEX_READY_CACHE_KEY, INDEX_VERSION)
+
+
+def get_search_condition(search_term, item_column="name"):
+	"""
+	Build a SQL condition matching items whose tokens start with every query word.
+
+	Words match the start of a code, barcode, name or description word, and
+	any part of a code or barcode. When it matches nothing, callers retry
+	with the substring scan so mid-word fragments still find items.
+
+	Args:
+		search_term (str): Raw search text
+		item_column (str): Column holding the item code in the outer query
+
+	Returns:
+		tuple: (condition, params) or (None, []) when the term has no tokens
+	"""
+	tokens = tokenize(search_term)
+	if not tokens:
+		return None, []
+
+	conditions = []
+	params = []
+	for token in tokens:
+		conditions.append(
+			f"{item_column} IN (SELECT item_code FROM {TOKEN_TABLE} WHERE token LIKE %s)"
+		)
+		params.append(_escape_like(token) + "%")
+
+	return "(" + " AND ".join(conditions) + ")", params
+
+
+def _escape_like(value):
+	"""Escape LIKE wildcards so '_' inside a token is matched literally."""
+	return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# ==========================================
+# Doc Events
+# ==========================================
+
+
+def on_item_update(doc, method=None, *args):
+	"""Item on_update / after_rename hook: reindex the item (barcodes are child rows)."""
+	try:
+		index_items([doc.name])
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Item Search Index Error")
+
+
+def on_item_trash(doc, method=None):
+	"""Item on_trash hook: drop the item's tokens."""
+	frappe.db.delete(TOKEN_DOCTYPE, {"item_code": doc.name})
+
+
+# ==========================================
+# Full Rebuild
+# ==========================================
+
+
+@frappe.whitelist()
+def rebuild_item_search_index():
+	"""Queue a full rebuild of the item search index (System Manager only)."""
+	frappe.only_for("System Manager")
+	frappe.enqueue(
+		"pos_next.api.item_search.rebuild_index",
+		queue="long",
+		job_id="pos_next_rebuild_item_search_index",
+		deduplicate=True,
+	)
+	return {"queued": True, "message": _("Item search index rebuild queued")}
+
+
+def rebuild_index():
+	"""Rebuild tokens for every item, walking tabItem in keyset order."""
+	last_name = ""
+	while True:
+		item_codes = frappe.db.sql_list(
+			"""
+			SELECT name FROM `tabItem`
+			WHERE name > %s
+			ORDER BY name
+			LIMIT %s
+			""",
+			(last_name, REBUILD_CHUNK_SIZE),
+		)
+		if not item_codes:
+			break
+
+		index_items(item_codes)
+		frappe.db.commit()
+		last_name = item_codes[-1]
+
+	# Items saved during the rebuild were indexed by their own hooks
+	_mark_index_ready()
+
+
+def ensure_index():
+	"""after_migrate hook: queue the initial build until one has finished."""
+	if not frappe.db.table_exists(TOKEN_DOCTYPE) or is_index_ready():
+		return
+
+	if not frappe.db.sql("SELECT 1 FROM `tabItem` LIMIT 1"):
+		# Nothing to index; items created from now on are indexed by their hooks
+		_mark_index_ready()
+		return
+
+	frappe.enqueue(
+		"pos_next.api.item_search.rebuild_index",
+		queue="long",
+		job_id="pos_next_rebuild_item_search_index",
+		deduplicate=True,
+	)
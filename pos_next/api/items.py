@@ -1,8 +1,11 @@
 # Copyright (c) 2024, POS MZ and contributors
 # For license information, please see license.txt
 
+import copy
+import gzip
 import json
 import re
+import tempfile
 from collections import defaultdict
 
 import frappe
@@ -10,7 +13,12 @@ from erpnext.stock.doctype.batch.batch import get_batch_qty
 from erpnext.stock.get_item_details import get_item_details as erpnext_get_item_details
 from frappe import _, as_json
 from frappe.query_builder import DocType, functions as fn
-from frappe.utils import flt, nowdate
+from frappe.utils import add_to_date, cint, flt, get_datetime, now_datetime, nowdate
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+from pos_next.api import barcode_map, bundle_availability, catalog_cache, item_search, warehouse_tree
+from pos_next.api.utilities import _parse_list_parameter, decode_cursor, encode_cursor
 
 ITEM_RESULT_FIELDS = [
 	"name as item_code",
@@ -30,16 +38,21 @@ ITEM_RESULT_FIELDS = [
 
 ITEM_RESULT_COLUMNS = ",\n\t".join(ITEM_RESULT_FIELDS)
 
+EXPORT_CHUNK_SIZE = 500
+# Compressed export bytes kept in memory before spilling to a temp file
+EXPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# Watermarks are issued this far in the past: ``modified`` is stamped at save,
+# not at commit, so a row saved before a watermark can become visible after it
+WATERMARK_OVERLAP_SECONDS = 5 * 60
+
 
 def get_stock_availability(item_code, warehouse):
 	"""Return total available quantity for an item in the given warehouse."""
 	if not warehouse:
 		return 0.0
 
-	warehouses = [warehouse]
-	if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-		# Include all child warehouses when a group warehouse is set
-		warehouses = frappe.db.get_descendants("Warehouse", warehouse) or []
+	# Include all child warehouses when a group warehouse is set
+	warehouses = warehouse_tree.get_leaf_warehouses(warehouse)
 
 	rows = frappe.get_all(
 		"Bin",
@@ -214,24 +227,7 @@ def get_item_detail(item, doc=None, warehouse=None, price_list=None, company=Non
 
 	# Handle multi-currency
 	if company:
-		company_currency = frappe.db.get_value("Company", company, "default_currency")
-		price_list_currency = company_currency
-		if price_list:
-			price_list_currency = (
-				frappe.db.get_value("Price List", price_list, "currency") or company_currency
-			)
-
-		exchange_rate = 1
-		if price_list_currency != company_currency:
-			from erpnext.setup.utils import get_exchange_rate
-
-			try:
-				exchange_rate = get_exchange_rate(price_list_currency, company_currency, today)
-			except Exception:
-				frappe.log_error(
-					f"Missing exchange rate from {price_list_currency} to {company_currency}",
-					"POS MZ",
-				)
+		price_list_currency, exchange_rate = _get_price_list_currency(company, price_list)
 
 		item["price_list_currency"] = price_list_currency
 		item["plc_conversion_rate"] = exchange_rate
@@ -305,6 +301,36 @@ def get_item_detail(item, doc=None, warehouse=None, price_list=None, company=Non
 	return res
 
 
+def _get_price_list_currency(company, price_list):
+	"""
+	Resolve the price list currency and its exchange rate to the company currency.
+
+	Returns:
+		tuple: (price_list_currency, exchange_rate) - rate falls back to 1 when
+			no exchange rate is configured (the miss is logged)
+	"""
+	company_currency = frappe.db.get_value("Company", company, "default_currency")
+	price_list_currency = company_currency
+	if price_list:
+		price_list_currency = (
+			frappe.db.get_value("Price List", price_list, "currency") or company_currency
+		)
+
+	exchange_rate = 1
+	if price_list_currency != company_currency:
+		from erpnext.setup.utils import get_exchange_rate
+
+		try:
+			exchange_rate = get_exchange_rate(price_list_currency, company_currency, nowdate())
+		except Exception:
+			frappe.log_error(
+				f"Missing exchange rate from {price_list_currency} to {company_currency}",
+				"POS MZ",
+			)
+
+	return price_list_currency, exchange_rate
+
+
 @frappe.whitelist()
 def search_by_barcode(barcode, pos_profile):
 	"""Search item by barcode"""
@@ -384,6 +410,59 @@ def search_by_barcode(barcode, pos_profile):
 		frappe.throw(_("Error searching by barcode: {0}").format(str(e)))
 
 
+@frappe.whitelist()
+def search_by_barcodes(barcodes, pos_profile):
+	"""
+	Resolve a burst of scanned barcodes in one call.
+
+	Barcodes are looked up in the Redis barcode map (one HMGET for the whole
+	burst) and details for all resolved items are loaded through
+	get_item_details_bulk, so the cost no longer grows per scan.
+
+	Args:
+		barcodes (list|str): Scanned codes or JSON string; duplicates are kept
+			so repeated scans of one code add up
+		pos_profile (str): POS Profile name
+
+	Returns:
+		dict: {
+			"items": [...],      # get_item_details_bulk rows in scan order, each with "barcode"
+			"not_found": [...],  # codes that match no barcode or item code
+		}
+	"""
+	try:
+		barcodes = [str(code).strip() for code in _parse_list_parameter(barcodes, "barcodes") if code]
+		if not pos_profile:
+			frappe.throw(_("POS Profile is required"))
+
+		resolved = barcode_map.resolve_barcodes(barcodes)
+
+		lines = []
+		scanned = []
+		not_found = []
+		for barcode in barcodes:
+			if barcode not in resolved:
+				if barcode not in not_found:
+					not_found.append(barcode)
+				continue
+
+			item_code, uom = resolved[barcode]
+			line = {"item_code": item_code, "qty": 1}
+			if uom:
+				line["uom"] = uom
+			lines.append(line)
+			scanned.append(barcode)
+
+		items = get_item_details_bulk(lines, pos_profile) if lines else []
+		for barcode, details in zip(scanned, items):
+			details["barcode"] = barcode
+
+		return {"items": items, "not_found": not_found}
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Search by Barcodes Error")
+		frappe.throw(_("Error searching by barcodes: {0}").format(str(e)))
+
+
 @frappe.whitelist()
 def get_item_stock(item_code, warehouse):
 	"""Get real-time stock for item"""
@@ -601,6 +680,196 @@ def get_item_variants(template_item, pos_profile):
 		frappe.throw(_("Error fetching item variants: {0}").format(str(e)))
 
 
+@frappe.whitelist()
+def get_item_variant_matrix(templates, pos_profile):
+	"""
+	Get variant matrices for many template items in a fixed number of queries.
+
+	Each template's variants are laid out on its attributes: attribute values
+	are the axes and every existing variant is one cell, so the variant dialog
+	can look a selection up directly and the offline worker can cache whole
+	matrices. Query count does not depend on the number of templates:
+	variants, attributes, attribute value order, prices, UOMs and stock.
+
+	Args:
+		templates (list|str): Template item codes or JSON string
+		pos_profile (str): POS Profile name
+
+	Returns:
+		dict: {template_code: {
+			"attributes": ["Colour", "Size"],                  # axis order
+			"values": {"Colour": ["Red", "Blue"], "Size": [...]},
+			"cells": {"0:1": {item_code, item_name, image, stock_uom, rate,
+			                  actual_qty, uom_prices, item_uoms, ...}},
+		}}
+		Cell keys are the ":"-joined value indexes in attribute order. Templates
+		without sellable variants map to an empty matrix.
+	"""
+	try:
+		templates = [code for code in dict.fromkeys(_parse_list_parameter(templates, "templates")) if code]
+		pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
+		matrices = {
+			template: {"attributes": [], "values": {}, "cells": {}} for template in templates
+		}
+		if not templates:
+			return matrices
+
+		# Query 1: sellable variants of every template
+		variant_filters = {"variant_of": ["in", templates], "disabled": 0, "is_sales_item": 1}
+		if pos_profile_doc.company:
+			variant_filters["ifnull(custom_company, '')"] = ["in", [pos_profile_doc.company, ""]]
+
+		variants = frappe.get_all(
+			"Item",
+			filters=variant_filters,
+			fields=[
+				"name as item_code",
+				"variant_of",
+				"item_name",
+				"stock_uom",
+				"image",
+				"is_stock_item",
+				"has_batch_no",
+				"has_serial_no",
+				"item_group",
+				"brand",
+			],
+			order_by="name",
+		)
+		variant_codes = [v["item_code"] for v in variants]
+
+		# Query 2: attribute rows of templates (axis order) and variants (cell position)
+		attribute_rows = frappe.get_all(
+			"Item Variant Attribute",
+			filters={"parent": ["in", templates + variant_codes], "parenttype": "Item"},
+			fields=["parent", "attribute", "attribute_value", "numeric_values"],
+			order_by="parent, idx",
+		)
+		template_attributes = defaultdict(list)
+		numeric_attributes = set()
+		variant_attributes = defaultdict(dict)
+		template_set = set(templates)
+		for row in attribute_rows:
+			if row.parent in template_set:
+				template_attributes[row.parent].append(row.attribute)
+				if row.numeric_values:
+					numeric_attributes.add(row.attribute)
+			else:
+				variant_attributes[row.parent][row.attribute] = row.attribute_value
+
+		# Query 3: configured value order of (non-numeric) attributes
+		value_order = defaultdict(dict)
+		attribute_names = list({a for names in template_attributes.values() for a in names})
+		if attribute_names:
+			for row in frappe.get_all(
+				"Item Attribute Value",
+				filters={"parent": ["in", attribute_names], "parenttype": "Item Attribute"},
+				fields=["parent", "attribute_value"],
+				order_by="parent, idx",
+			):
+				value_order[row.parent].setdefault(row.attribute_value, len(value_order[row.parent]))
+
+		# Queries 4-6: prices, UOMs and stock for all variants at once
+		uom_prices_map = defaultdict(dict)
+		uom_map = defaultdict(list)
+		stock_map = {}
+		if variant_codes:
+			for price in frappe.db.sql(
+				"""
+				SELECT item_code, uom, price_list_rate
+				FROM `tabItem Price`
+				WHERE item_code IN %s AND price_list = %s
+				ORDER BY item_code, uom
+				""",
+				[variant_codes, pos_profile_doc.selling_price_list],
+				as_dict=1,
+			):
+				uom_prices_map[price.item_code][price.uom] = price.price_list_rate
+
+			for uom in frappe.db.sql(
+				"""
+				SELECT parent, uom, conversion_factor
+				FROM `tabUOM Conversion Detail`
+				WHERE parent IN %s
+				ORDER BY parent, idx
+				""",
+				[variant_codes],
+				as_dict=1,
+			):
+				uom_map[uom.parent].append({"uom": uom.uom, "conversion_factor": uom.conversion_factor})
+
+			if pos_profile_doc.warehouse:
+				stock_map = {
+					row.item_code: flt(row.actual_qty)
+					for row in frappe.db.sql(
+						"""
+						SELECT item_code, SUM(actual_qty) AS actual_qty
+						FROM `tabBin`
+						WHERE item_code IN %s AND warehouse IN %s
+						GROUP BY item_code
+						""",
+						[variant_codes, warehouse_tree.get_leaf_warehouses(pos_profile_doc.warehouse)],
+						as_dict=1,
+					)
+				}
+
+		# Axes: attribute values actually used by variants, in configured order
+		for template in templates:
+			attributes = template_attributes.get(template, [])
+			used = {attribute: [] for attribute in attributes}
+			for variant in variants:
+				if variant["variant_of"] != template:
+					continue
+				for attribute in attributes:
+					value = variant_attributes[variant["item_code"]].get(attribute)
+					if value is not None and value not in used[attribute]:
+						used[attribute].append(value)
+
+			for attribute, values in used.items():
+				if attribute in numeric_attributes:
+					values.sort(key=flt)
+				else:
+					order = value_order.get(attribute, {})
+					values.sort(key=lambda v: order.get(v, len(order)))
+
+			matrices[template]["attributes"] = attributes
+			matrices[template]["values"] = used
+
+		# Cells
+		for variant in variants:
+			template = variant["variant_of"]
+			matrix = matrices[template]
+			attrs = variant_attributes.get(variant["item_code"], {})
+			try:
+				key = ":".join(
+					str(matrix["values"][attribute].index(attrs[attribute]))
+					for attribute in matrix["attributes"]
+				)
+			except (KeyError, ValueError):
+				# Variant is missing one of its template's attributes
+				continue
+
+			item_code = variant["item_code"]
+			prices = uom_prices_map.get(item_code, {})
+			rate = prices.get(variant["stock_uom"])
+			if not rate and prices:
+				rate = next(iter(prices.values()), None)
+
+			cell = dict(variant)
+			cell.pop("variant_of")
+			cell["rate"] = rate or 0
+			cell["actual_qty"] = stock_map.get(item_code, 0)
+			cell["warehouse"] = pos_profile_doc.warehouse
+			cell["uom_prices"] = prices
+			cell["item_uoms"] = [u for u in uom_map.get(item_code, []) if u["uom"] != variant["stock_uom"]]
+			matrix["cells"][key] = cell
+
+		return matrices
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Get Item Variant Matrix Error")
+		frappe.throw(_("Error fetching item variant matrix: {0}").format(str(e)))
+
+
 def _build_item_base_conditions(pos_profile_doc, item_group=None):
 	"""Build reusable SQL conditions for POS item search."""
 	conditions = [
@@ -621,10 +890,14 @@ def _build_item_base_conditions(pos_profile_doc, item_group=None):
 	return conditions, params
 
 
-def _calculate_bundle_availability_bulk(bundle_codes, warehouse):
+def _compute_bundle_availability_bulk(bundle_codes, warehouse):
 	"""
 	Calculate Product Bundle availability in bulk with component-based calculation.
 
+	This is the live computation behind the materialized POS Bundle Availability
+	table (see api/bundle_availability.py); request paths read the table through
+	_calculate_bundle_availability_bulk instead.
+
 	This function determines how many complete bundles can be assembled based on
 	available component stock. It uses available_qty (actual - reserved) to prevent
 	overselling and supports group warehouses for hierarchical stock tracking.
@@ -671,7 +944,7 @@ def _calculate_bundle_availability_bulk(bundle_codes, warehouse):
 
 	Example Usage:
 		>>> bundles = ["LAPTOP-COMBO", "DESKTOP-BUNDLE"]
-		>>> availability = _calculate_bundle_availability_bulk(bundles, "Stores - WH")
+		>>> availability = _compute_bundle_availability_bulk(bundles, "Stores - WH")
 		>>> print(availability)
 		{"LAPTOP-COMBO": 30, "DESKTOP-BUNDLE": 15}
 
@@ -742,11 +1015,7 @@ def _calculate_bundle_availability_bulk(bundle_codes, warehouse):
 	# Example:
 	#   Input: "Main Store" (group warehouse)
 	#   Output: ["Main Store - A", "Main Store - B", "Main Store - C"]
-	warehouses = [warehouse]
-	if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-		child_warehouses = frappe.db.get_descendants("Warehouse", warehouse)
-		# Fallback to original warehouse if no children found
-		warehouses = child_warehouses or [warehouse]
+	warehouses = warehouse_tree.get_leaf_warehouses(warehouse)
 
 	# ===========================================================================
 	# STEP 4: Fetch Stock Availability for All Components (Bulk Query)
@@ -818,14 +1087,38 @@ def _calculate_bundle_availability_bulk(bundle_codes, warehouse):
 	return bundle_availability
 
 
+def _calculate_bundle_availability_bulk(bundle_codes, warehouse):
+	"""
+	Return Product Bundle availability at a warehouse from the materialized table.
+
+	Args:
+		bundle_codes (list): Item codes to check (non-bundles are ignored)
+		warehouse (str): Warehouse name (supports group warehouses)
+
+	Returns:
+		dict: Mapping of bundle_code -> available_quantity, including bundles
+			  that currently have 0 available (membership marks an item as a bundle)
+	"""
+	if not bundle_codes or not warehouse:
+		return {}
+
+	return {
+		row.bundle_item: int(row.available_qty)
+		for row in bundle_availability.get_availability(bundle_codes, [warehouse])
+	}
+
+
 def _get_bundle_warehouse_availability_bulk(bundle_codes, warehouses):
 	"""
 	Calculate Product Bundle availability across multiple warehouses efficiently.
-	
+
+	Reads the materialized POS Bundle Availability rows for every warehouse in
+	a single lookup.
+
 	Args:
 		bundle_codes (list): List of bundle item codes
 		warehouses (list): List of warehouse dicts with 'name' key
-		
+
 	Returns:
 		dict: Nested mapping of bundle_code -> warehouse_name -> available_qty
 			  Example: {
@@ -835,118 +1128,297 @@ def _get_bundle_warehouse_availability_bulk(bundle_codes, warehouses):
 	"""
 	if not bundle_codes or not warehouses:
 		return {}
-	
+
 	warehouse_names = [w["name"] if isinstance(w, dict) else w for w in warehouses]
-	
-	# ===========================================================================
-	# Fetch Bundle Component Definitions (once for all bundles)
-	# ===========================================================================
-	pb = DocType("Product Bundle")
-	pbi = DocType("Product Bundle Item")
-	
-	bundle_components = (
-		frappe.qb.from_(pb)
-		.inner_join(pbi).on(pbi.parent == pb.name)
-		.select(
-			pb.new_item_code.as_("bundle_code"),
-			pbi.item_code.as_("component_code"),
-			pbi.qty.as_("required_qty")
+
+	result = defaultdict(dict)
+	for row in bundle_availability.get_availability(bundle_codes, warehouse_names):
+		# Only include warehouses where the bundle is available
+		if int(row.available_qty) > 0:
+			result[row.bundle_item][row.warehouse] = int(row.available_qty)
+
+	return dict(result)
+
+
+def _get_catalog_stock(items, pos_profile_doc):
+	"""
+	Load stock for a page of catalog items at the POS Profile warehouse.
+
+	Kept apart from the price/UOM enrichment because stock is far more
+	volatile; cached catalog pages overlay it separately.
+
+	Returns:
+		tuple: (stock_map, bundle_availability_map) keyed by item_code
+	"""
+	item_codes = [item["item_code"] for item in items]
+
+	# Batch query stock for all items at once (performance optimization)
+	stock_map = {}
+	if item_codes and pos_profile_doc.warehouse:
+		stock_items = [item["item_code"] for item in items if item.get("is_stock_item")]
+		if stock_items:
+			stocks = frappe.db.sql(
+				"""
+				SELECT item_code, actual_qty
+				FROM `tabBin`
+				WHERE item_code IN %s AND warehouse = %s
+				""",
+				[stock_items, pos_profile_doc.warehouse],
+				as_dict=1,
+			)
+			stock_map = {s["item_code"]: s["actual_qty"] for s in stocks}
+
+	# ===================================================================
+	# PRODUCT BUNDLE AVAILABILITY: Calculate bundle stock (bulk optimized)
+	# ===================================================================
+	# Product Bundles are "virtual" items assembled from component items.
+	# Unlike regular stock items, bundles don't have direct stock entries.
+	# Instead, availability is calculated from component stock levels.
+	#
+	# Example:
+	#   Bundle: "Office Starter Kit"
+	#   Components:
+	#     - Desk (need 1, have 10) → can make 10 bundles
+	#     - Chair (need 2, have 15) → can make 7 bundles ← LIMITING
+	#     - Lamp (need 1, have 20) → can make 20 bundles
+	#   Result: Bundle availability = 7 (limited by chairs)
+	#
+	# Performance: Single bulk calculation for ALL bundles (not per-item)
+	# This is done BEFORE the item enrichment loop for efficiency.
+	bundle_availability_map = {}
+	if item_codes and pos_profile_doc.warehouse:
+		# Bulk calculate availability for all items (bundles auto-detected)
+		bundle_availability_map = _calculate_bundle_availability_bulk(
+			item_codes,
+			pos_profile_doc.warehouse
 		)
-		.where(pb.new_item_code.isin(bundle_codes))
-		.run(as_dict=True)
-	)
-	
-	if not bundle_components:
-		return {}
+	elif item_codes and not pos_profile_doc.warehouse:
+		# Warning: Bundles require warehouse for component stock lookup
+		# Without warehouse, bundles will show as unavailable (qty = 0)
+		has_bundles = frappe.db.exists("Product Bundle", {"new_item_code": ["in", item_codes]})
+		if has_bundles:
+			frappe.log_error(
+				"POS Profile missing warehouse - Product Bundles will show as unavailable",
+				"Bundle Availability Warning"
+			)
 
-	component_codes = list(set(c["component_code"] for c in bundle_components))
-	warehouse_resolution_map = {}
-	all_resolved_warehouses = set()
-	
-	for wh_name in warehouse_names:
-		resolved = [wh_name]
-		if frappe.db.get_value("Warehouse", wh_name, "is_group"):
-			children = frappe.db.get_descendants("Warehouse", wh_name)
-			if children:
-				resolved = children
-		warehouse_resolution_map[wh_name] = resolved
-		all_resolved_warehouses.update(resolved)
-	
-	# ===========================================================================
-	# Fetch Component Stock Across All Warehouses (single bulk query)
-	# ===========================================================================
-	bin = DocType("Bin")
-	
-	component_stock_data = (
-		frappe.qb.from_(bin)
-		.select(
-			bin.item_code,
-			bin.warehouse,
-			fn.Coalesce(fn.Sum(bin.actual_qty - bin.reserved_qty), 0).as_("available_qty")
+	return stock_map, bundle_availability_map
+
+
+def _apply_catalog_stock(items, stock_map, bundle_availability_map):
+	"""Set actual_qty (and is_bundle) on catalog items from preloaded stock maps."""
+	for item in items:
+		# ===================================================================
+		# STOCK QUANTITY ASSIGNMENT: Stock Items vs Product Bundles
+		# ===================================================================
+		# Stock items: Use actual_qty from Bin table (direct stock tracking)
+		# Product Bundles: Use calculated availability from component stock
+		#
+		# Decision Logic:
+		#   IF item.is_stock_item == 1:
+		#     actual_qty = stock from Bin table (or 0 if not in stock)
+		#   ELSE:
+		#     actual_qty = bundle availability (or 0 if not a bundle)
+		#
+		# Example 1 - Stock Item (Laptop):
+		#   is_stock_item = 1
+		#   actual_qty = 50 (from Bin table)
+		#
+		# Example 2 - Product Bundle (Office Kit):
+		#   is_stock_item = 0 (bundles are not stock items)
+		#   actual_qty = 7 (calculated from components)
+		#
+		# Example 3 - Service Item (Consulting):
+		#   is_stock_item = 0
+		#   actual_qty = 0 (not a bundle, no stock tracking)
+		item["actual_qty"] = (
+			stock_map.get(item["item_code"], 0)
+			if item.get("is_stock_item")
+			else bundle_availability_map.get(item["item_code"], 0)
 		)
-		.where(bin.item_code.isin(component_codes))
-		.where(bin.warehouse.isin(list(all_resolved_warehouses)))
-		.groupby(bin.item_code, bin.warehouse)
-		.run(as_dict=True)
-	)
-	
-	# Build lookup: (item_code, warehouse) -> available_qty
-	# For group warehouses, sum stock from all child warehouses
-	component_stock_map = defaultdict(lambda: defaultdict(float))
-	for row in component_stock_data:
-		component_stock_map[row["item_code"]][row["warehouse"]] = flt(row["available_qty"])
-	
-	# ===========================================================================
-	# Calculate Bundle Availability Per Warehouse
-	# ===========================================================================
-	# For each bundle and each warehouse, calculate availability
-	# Availability = min(floor(component_available / component_required)) across all components
-	result = defaultdict(dict)
-	
-	# Group components by bundle (build once, reuse for all warehouses)
-	bundles_map = defaultdict(list)
-	for comp in bundle_components:
-		bundles_map[comp["bundle_code"]].append(comp)
-	
-	# Calculate availability for each bundle in each warehouse
-	for wh_name in warehouse_names:
-		resolved_whs = warehouse_resolution_map[wh_name]
-		
-		for bundle_code, components in bundles_map.items():
-			min_possible = None
-			
-			for comp in components:
-				component_code = comp["component_code"]
-				required_qty = flt(comp["required_qty"])
-				
-				if required_qty <= 0:
-					continue
-				
-				# Sum stock across all resolved warehouses (for group warehouse support)
-				total_available = sum(
-					component_stock_map[component_code].get(wh, 0)
-					for wh in resolved_whs
-				)
-				
-				# Calculate how many bundles this component can supply
-				possible = int(total_available / required_qty) if required_qty > 0 else 0
-				
-				# Track minimum (most constrained component)
-				if min_possible is None:
-					min_possible = possible
+
+		# ===================================================================
+		# BUNDLE MARKER: Flag items that are Product Bundles
+		# ===================================================================
+		# Add is_bundle=True flag for frontend to identify bundle items.
+		# This allows UI to show bundle-specific indicators and handle
+		# bundle logic differently (e.g., show component details on click).
+		#
+		# Bundle Detection: If item_code exists in bundle_availability_map,
+		# it means a Product Bundle definition exists for this item.
+		if item["item_code"] in bundle_availability_map:
+			item["is_bundle"] = True
+
+
+def _enrich_items(items, pos_profile_doc, include_stock=True):
+	"""
+	Enrich raw Item rows with the data the POS catalog needs.
+
+	Adds price (stock UOM preferred, min variant price for templates), stock or
+	bundle availability, barcode, alternative UOMs and UOM-specific prices using
+	bulk queries for the whole page. Items are modified in place.
+
+	Args:
+		items (list): Item dicts with at least item_code, stock_uom, is_stock_item
+					  and has_variants
+		pos_profile_doc: POS Profile document (warehouse, selling_price_list)
+
+	Returns:
+		list: The same items list, enriched
+	"""
+	# Prepare maps for enrichment
+	item_codes = [item["item_code"] for item in items]
+	barcode_map = {}
+	conversion_map = defaultdict(dict)  # parent -> {uom: factor}
+	uom_map = {}  # parent -> [ {uom, conversion_factor}, ... ]
+	uom_prices_map = {}  # item_code -> {uom: price_list_rate}
+
+	# Barcodes
+	if item_codes:
+		barcodes = frappe.db.sql(
+			"""
+			SELECT parent, barcode
+			FROM `tabItem Barcode`
+			WHERE parent IN %s
+			GROUP BY parent
+			""",
+			[item_codes],
+			as_dict=1,
+		)
+		barcode_map = {b["parent"]: b["barcode"] for b in barcodes}
+
+	# UOM conversions (both list & map for quick lookup)
+	if item_codes:
+		conversions = frappe.get_all(
+			"UOM Conversion Detail",
+			filters={"parent": ["in", item_codes]},
+			fields=["parent", "uom", "conversion_factor"],
+		)
+		for row in conversions:
+			# build list
+			uom_map.setdefault(row.parent, []).append(
+				{"uom": row.uom, "conversion_factor": row.conversion_factor}
+			)
+			# build fast lookup
+			if row.uom:
+				conversion_map[row.parent][row.uom] = row.conversion_factor
+
+	# UOM-specific prices - batch query ALL prices for all items
+	if item_codes:
+		prices = frappe.db.sql(
+			"""
+			SELECT item_code, uom, price_list_rate
+			FROM `tabItem Price`
+			WHERE item_code IN %s AND price_list = %s
+			ORDER BY item_code, uom
+			""",
+			[item_codes, pos_profile_doc.selling_price_list],
+			as_dict=1,
+		)
+		for price in prices:
+			uom_prices_map.setdefault(price["item_code"], {})[price["uom"]] = price["price_list_rate"]
+
+	# Enrich items with price, barcode, and UOM data
+	for item in items:
+		stock_uom = item.get("stock_uom")
+
+		# Use pre-loaded price map instead of per-item queries
+		price_row = None
+		item_prices = uom_prices_map.get(item["item_code"], {})
+
+		# 1) Try price explicitly for stock UOM (preferred)
+		if stock_uom and stock_uom in item_prices:
+			price_row = {"price_list_rate": item_prices[stock_uom], "uom": stock_uom}
+
+		# 2) If not found, try any price for the item (and capture its UOM)
+		elif item_prices:
+			# Get first available price
+			first_uom = next(iter(item_prices.keys()))
+			price_row = {"price_list_rate": item_prices[first_uom], "uom": first_uom}
+
+		# 3) If still not found and it's a template, derive min variant price
+		derived_price = None
+		if not price_row and item.get("has_variants"):
+			variant_prices = frappe.db.sql(
+				"""
+				SELECT MIN(ip.price_list_rate) as min_price
+				FROM `tabItem Price` ip
+				INNER JOIN `tabItem` i ON i.name = ip.item_code
+				WHERE i.variant_of = %s
+				AND ip.price_list = %s
+				AND i.disabled = 0
+				""",
+				[item["item_code"], pos_profile_doc.selling_price_list],
+				as_dict=1,
+			)
+			derived_price = (
+				variant_prices[0]["min_price"]
+				if variant_prices and variant_prices[0].get("min_price")
+				else None
+			)
+
+		# Finalize display price & display UOM
+		display_rate = 0.0
+		display_uom = stock_uom
+
+		if price_row:
+			raw_rate = flt(price_row.get("price_list_rate") or 0)
+			price_uom = price_row.get("uom") or stock_uom
+			if price_uom and stock_uom and price_uom != stock_uom:
+				# convert to per-stock-UOM if possible
+				cf = flt(conversion_map[item["item_code"]].get(price_uom) or 0)
+				if cf:
+					display_rate = raw_rate / cf
+					display_uom = stock_uom
 				else:
-					min_possible = min(min_possible, possible)
-			
-			# Only include if bundle is available (min_possible > 0)
-			if min_possible is not None and min_possible > 0:
-				result[bundle_code][wh_name] = min_possible
-	
-	return dict(result)
+					# no conversion available: show as is (price UOM)
+					display_rate = raw_rate
+					display_uom = price_uom
+			else:
+				display_rate = raw_rate
+				display_uom = stock_uom
+		elif derived_price is not None:
+			display_rate = flt(derived_price)
+			display_uom = stock_uom
+
+		item["rate"] = display_rate
+		item["price_list_rate"] = display_rate
+		item["uom"] = display_uom
+		item["price_uom"] = display_uom
+		item["conversion_factor"] = 1
+		item["price_list_rate_price_uom"] = display_rate
+
+		# Add warehouse to item (needed for stock validation)
+		item["warehouse"] = pos_profile_doc.warehouse
+
+		# Barcode
+		item["barcode"] = barcode_map.get(item["item_code"], "")
+
+		# Item UOMs (exclude stock UOM to avoid duplicates)
+		all_uoms = uom_map.get(item["item_code"], []) or []
+		item["item_uoms"] = [u for u in all_uoms if u.get("uom") != stock_uom]
+
+		# UOM-specific prices map for frontend selector
+		item["uom_prices"] = uom_prices_map.get(item["item_code"], {})
+
+	# Stock is loaded last and separately so cached pages can refresh it alone
+	if include_stock:
+		stock_map, bundle_availability_map = _get_catalog_stock(items, pos_profile_doc)
+		_apply_catalog_stock(items, stock_map, bundle_availability_map)
+
+	return items
 
 
 @frappe.whitelist()
-def get_items(pos_profile, search_term=None, item_group=None, start=0, limit=20):
-	"""Get items for POS with stock, price, and tax details"""
+def get_items(pos_profile, search_term=None, item_group=None, start=0, limit=20, cursor=None):
+	"""
+	Get items for POS with stock, price, and tax details
+
+	Pass ``cursor`` ("" for the first page) to page the catalog by
+	(item_name, name) instead of OFFSET. The response is then
+	{"items": [...], "next_cursor": str | None}; search results are ranked by
+	relevance and always come back with next_cursor = None.
+	"""
 	try:
 		pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
 
@@ -980,17 +1452,22 @@ def get_items(pos_profile, search_term=None, item_group=None, start=0, limit=20)
 			# Fuzzy search: match if search term appears anywhere in item fields
 			conditions, params = _build_item_base_conditions(pos_profile_doc, item_group)
 
-			# Word-order independent: all words must appear somewhere
+			# Word-order independent: all words must appear somewhere.
+			# Prefer the token index (indexed prefix lookups per word); fall back
+			# to the CONCAT LIKE scan until the index has been built, or when it
+			# finds nothing.
 			search_text = "CONCAT(COALESCE(name, ''), ' ', COALESCE(item_name, ''), ' ', COALESCE(description, ''))"
 			word_conditions = " AND ".join([f"{search_text} LIKE %s"] * len(search_words))
-			conditions.append(f"({word_conditions})")
-			params.extend([f"%{word}%" for word in search_words])
+			scan_condition = f"({word_conditions})"
+			scan_params = [f"%{word}%" for word in search_words]
+
+			index_condition, index_params = (None, [])
+			if item_search.is_index_ready():
+				index_condition, index_params = item_search.get_search_condition(search_term)
 
 			# Use parameterized queries - no need to escape, SQL handles it
 			prefix_pattern = f"{search_term}%"
 
-			where_clause = " AND ".join(conditions)
-
 			# Simple relevance scoring with case-insensitive comparison
 			relevance = f"""
 				CASE
@@ -1003,272 +1480,399 @@ def get_items(pos_profile, search_term=None, item_group=None, start=0, limit=20)
 			"""
 			score_params = [search_term, search_term, prefix_pattern, prefix_pattern]
 
-			query = f"""
-				SELECT {ITEM_RESULT_COLUMNS}
-				FROM `tabItem`
-				WHERE {where_clause}
-				ORDER BY {relevance} DESC, item_name ASC
-				LIMIT %s OFFSET %s
-			"""
+			def search(search_condition, search_params):
+				query = f"""
+					SELECT {ITEM_RESULT_COLUMNS}
+					FROM `tabItem`
+					WHERE {' AND '.join(conditions + [search_condition])}
+					ORDER BY {relevance} DESC, item_name ASC
+					LIMIT %s OFFSET %s
+				"""
+				return frappe.db.sql(
+					query, tuple(params + search_params + score_params + [limit, start]), as_dict=1
+				)
 
-			params.extend(score_params)
-			params.extend([limit, start])
-			items = frappe.db.sql(query, tuple(params), as_dict=1)
+			items = []
+			if index_condition:
+				items = search(index_condition, index_params)
+
+			# The index does not cover fragments from the middle of a word: when
+			# it matches nothing for the term (not just on this page), scan
+			if not items and (
+				not index_condition
+				or not start
+				or not frappe.db.sql(
+					f"SELECT 1 FROM `tabItem` WHERE {' AND '.join(conditions + [index_condition])} LIMIT 1",
+					tuple(params + index_params),
+				)
+			):
+				items = search(scan_condition, scan_params)
 		else:
-			# No search term - return all items with base filters
-			items = frappe.get_list(
-				"Item",
-				filters=filters,
-				fields=[
-					"name as item_code",
-					"item_name",
-					"description",
-					"stock_uom",
-					"image",
-					"is_stock_item",
-					"has_batch_no",
-					"has_serial_no",
-					"item_group",
-					"brand",
-					"has_variants",
-					"custom_company",
-					"disabled",
-				],
-				start=start,
-				page_length=limit,
-				order_by="item_name asc",
-			)
+			# No search term - browse pages are shared between terminals through
+			# the catalog cache; only the stock overlay is refreshed per request
+			after = decode_cursor(cursor, 2) if cursor is not None else None
+			page = start if cursor is None else f"cursor:{cursor}"
+			cache_key = catalog_cache.get_page_key(pos_profile_doc, item_group, page, limit)
+			items = catalog_cache.get_page(cache_key)
+			if items is None:
+				version = catalog_cache.get_version()
+				items = _list_catalog_items(filters, start, limit, after)
+				items = _enrich_items(items, pos_profile_doc, include_stock=False)
+				catalog_cache.set_page(cache_key, items, version)
+
+			items = _overlay_catalog_stock(items, pos_profile_doc, cache_key)
+			if cursor is None:
+				return items
+
+			next_cursor = None
+			if items and len(items) == cint(limit):
+				next_cursor = encode_cursor([items[-1]["item_name"], items[-1]["item_code"]])
+			return {"items": items, "next_cursor": next_cursor}
+
+		items = _enrich_items(items, pos_profile_doc)
+		if cursor is not None:
+			# Relevance-ranked search results are not cursor-paginated
+			return {"items": items, "next_cursor": None}
+		return items
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Get Items Error")
+		frappe.throw(_("Error fetching items: {0}").format(str(e)))
 
-		# Prepare maps for enrichment
-		item_codes = [item["item_code"] for item in items]
-		barcode_map = {}
-		conversion_map = defaultdict(dict)  # parent -> {uom: factor}
-		uom_map = {}  # parent -> [ {uom, conversion_factor}, ... ]
-		uom_prices_map = {}  # item_code -> {uom: price_list_rate}
 
-		# Barcodes
-		if item_codes:
-			barcodes = frappe.db.sql(
+def _list_catalog_items(filters, start, limit, after=None):
+	"""
+	Read a browse page of items ordered by (item_name, name).
+
+	With ``after`` - the [item_name, name] of the previous page's last row - the
+	page is read by keyset instead of OFFSET: first the remaining rows sharing
+	that item_name, then the rows with a greater item_name. Each page costs the
+	same and inserts/renames between pages cannot skip or repeat rows.
+	"""
+	limit = cint(limit)
+	list_args = {"fields": ITEM_RESULT_FIELDS, "order_by": "item_name asc, name asc"}
+
+	if after is None:
+		return frappe.get_list("Item", filters=filters, start=start, page_length=limit, **list_args)
+
+	last_item_name, last_name = after
+	items = frappe.get_list(
+		"Item",
+		filters={**filters, "item_name": last_item_name, "name": [">", last_name]},
+		page_length=limit,
+		**list_args,
+	)
+	if len(items) < limit:
+		items += frappe.get_list(
+			"Item",
+			filters={**filters, "item_name": [">", last_item_name]},
+			page_length=limit - len(items),
+			**list_args,
+		)
+	return items
+
+
+def _overlay_catalog_stock(items, pos_profile_doc, cache_key):
+	"""Apply stock to catalog page rows from the short-lived stock layer."""
+	stock = catalog_cache.get_stock(cache_key)
+	if stock is None:
+		stock = _get_catalog_stock(items, pos_profile_doc)
+		catalog_cache.set_stock(cache_key, stock)
+
+	stock_map, bundle_availability_map = stock
+	_apply_catalog_stock(items, stock_map, bundle_availability_map)
+	return items
+
+
+def _get_profile_item_groups(pos_profile):
+	"""Return the item groups configured on a POS Profile (empty list = all groups)."""
+	return frappe.get_all(
+		"POS Item Group",
+		filters={"parent": pos_profile, "parenttype": "POS Profile"},
+		pluck="item_group",
+	)
+
+
+@frappe.whitelist()
+def get_items_changed_since(pos_profile, watermark=None):
+	"""
+	Return the catalog delta for a POS Profile since a server-issued watermark.
+
+	Terminals keep the returned ``watermark`` and send it back on the next call,
+	so only rows touched in between are transferred instead of paging the whole
+	catalog through get_items.
+
+	Changes are detected from the ``modified`` column (indexed on every table) of:
+	- Item, Item Barcode and UOM Conversion Detail (item payload changed)
+	- Item Price for the profile's selling price list (price changed; a variant
+	  price change also refreshes its template's derived price)
+	- Bin for the profile warehouse (stock only, returned in ``stock``)
+
+	Tombstones are returned for items that were deleted, disabled, are no longer
+	sellable, belong to another company, became variants or moved out of the
+	profile's item groups.
+
+	The watermark trails the current time by WATERMARK_OVERLAP_SECONDS, so a
+	transaction that stamped rows before it but committed later is still
+	caught. Consecutive deltas therefore overlap: rows carry their current
+	state and clients apply them idempotently (upsert / delete by item code).
+
+	Args:
+		pos_profile (str): POS Profile name
+		watermark (str, optional): Watermark from the previous call. When omitted
+			the client must do a full load; only a fresh watermark is returned.
+
+	Returns:
+		dict: {
+			"watermark": str,             # pass back on the next call
+			"full_sync_required": bool,   # True when no watermark was given
+			"items": [...],               # same shape as get_items rows
+			"tombstones": [{"item_code": str, "reason": str}],
+			"stock": [...],               # same shape as get_stock_quantities rows
+		}
+	"""
+	try:
+		pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
+
+		# Taken before reading; rows committed while this request runs are
+		# covered by the next call
+		new_watermark = _new_watermark()
+		result = {
+			"watermark": new_watermark,
+			"full_sync_required": not watermark,
+			"items": [],
+			"tombstones": [],
+			"stock": [],
+		}
+
+		if not watermark:
+			return result
+
+		since = get_datetime(watermark)
+		price_list = pos_profile_doc.selling_price_list
+
+		# =====================================================================
+		# STEP 1: Collect item codes whose catalog payload changed
+		# =====================================================================
+		changed_codes = set(
+			frappe.db.sql_list(
 				"""
-				SELECT parent, barcode
-				FROM `tabItem Barcode`
-				WHERE parent IN %s
-				GROUP BY parent
+				SELECT name FROM `tabItem` WHERE modified > %(since)s
+				UNION
+				SELECT parent FROM `tabItem Barcode`
+				WHERE modified > %(since)s AND parenttype = 'Item'
+				UNION
+				SELECT parent FROM `tabUOM Conversion Detail`
+				WHERE modified > %(since)s AND parenttype = 'Item'
+				UNION
+				SELECT ip.item_code FROM `tabItem Price` ip
+				WHERE ip.modified > %(since)s AND ip.price_list = %(price_list)s
+				UNION
+				SELECT i.variant_of FROM `tabItem Price` ip
+				INNER JOIN `tabItem` i ON i.name = ip.item_code
+				WHERE ip.modified > %(since)s AND ip.price_list = %(price_list)s
+					AND IFNULL(i.variant_of, '') != ''
 				""",
-				[item_codes],
-				as_dict=1,
+				{"since": since, "price_list": price_list},
 			)
-			barcode_map = {b["parent"]: b["barcode"] for b in barcodes}
-
-		# UOM conversions (both list & map for quick lookup)
-		if item_codes:
-			conversions = frappe.get_all(
-				"UOM Conversion Detail",
-				filters={"parent": ["in", item_codes]},
-				fields=["parent", "uom", "conversion_factor"],
-			)
-			for row in conversions:
-				# build list
-				uom_map.setdefault(row.parent, []).append(
-					{"uom": row.uom, "conversion_factor": row.conversion_factor}
-				)
-				# build fast lookup
-				if row.uom:
-					conversion_map[row.parent][row.uom] = row.conversion_factor
+		)
 
-		# UOM-specific prices - batch query ALL prices for all items
-		if item_codes:
-			prices = frappe.db.sql(
-				"""
-				SELECT item_code, uom, price_list_rate
-				FROM `tabItem Price`
-				WHERE item_code IN %s AND price_list = %s
-				ORDER BY item_code, uom
+		# Deleted prices leave no row behind; recover the item from the deletion log
+		for data in frappe.get_all(
+			"Deleted Document",
+			filters={"deleted_doctype": "Item Price", "creation": [">", since]},
+			pluck="data",
+		):
+			price = json.loads(data or "{}")
+			if price.get("price_list") == price_list and price.get("item_code"):
+				changed_codes.add(price["item_code"])
+
+		# =====================================================================
+		# STEP 2: Split changed items into live rows and tombstones
+		# =====================================================================
+		profile_groups = set(_get_profile_item_groups(pos_profile))
+		live_items = []
+
+		if changed_codes:
+			rows = frappe.db.sql(
+				f"""
+				SELECT {ITEM_RESULT_COLUMNS}, is_sales_item, variant_of
+				FROM `tabItem`
+				WHERE name IN %(codes)s
+				ORDER BY item_name ASC
 				""",
-				[item_codes, pos_profile_doc.selling_price_list],
+				{"codes": list(changed_codes)},
 				as_dict=1,
 			)
-			for price in prices:
-				uom_prices_map.setdefault(price["item_code"], {})[price["uom"]] = price["price_list_rate"]
 
-		# Batch query stock for all items at once (performance optimization)
-		stock_map = {}
-		if item_codes and pos_profile_doc.warehouse:
-			stock_items = [item["item_code"] for item in items if item.get("is_stock_item")]
-			if stock_items:
-				stocks = frappe.db.sql(
-					"""
-					SELECT item_code, actual_qty
-					FROM `tabBin`
-					WHERE item_code IN %s AND warehouse = %s
-					""",
-					[stock_items, pos_profile_doc.warehouse],
-					as_dict=1,
-				)
-				stock_map = {s["item_code"]: s["actual_qty"] for s in stocks}
+			for row in rows:
+				reason = None
+				if row.disabled:
+					reason = "disabled"
+				elif not row.is_sales_item:
+					reason = "not_sales_item"
+				elif row.variant_of:
+					reason = "variant"
+				elif pos_profile_doc.company and (row.custom_company or "") not in (
+					pos_profile_doc.company,
+					"",
+				):
+					reason = "company"
+				elif profile_groups and row.item_group not in profile_groups:
+					reason = "item_group"
+
+				if reason:
+					result["tombstones"].append({"item_code": row.item_code, "reason": reason})
+					continue
 
-		# ===================================================================
-		# PRODUCT BUNDLE AVAILABILITY: Calculate bundle stock (bulk optimized)
-		# ===================================================================
-		# Product Bundles are "virtual" items assembled from component items.
-		# Unlike regular stock items, bundles don't have direct stock entries.
-		# Instead, availability is calculated from component stock levels.
-		#
-		# Example:
-		#   Bundle: "Office Starter Kit"
-		#   Components:
-		#     - Desk (need 1, have 10) → can make 10 bundles
-		#     - Chair (need 2, have 15) → can make 7 bundles ← LIMITING
-		#     - Lamp (need 1, have 20) → can make 20 bundles
-		#   Result: Bundle availability = 7 (limited by chairs)
-		#
-		# Performance: Single bulk calculation for ALL bundles (not per-item)
-		# This is done BEFORE the item enrichment loop for efficiency.
-		bundle_availability_map = {}
-		if item_codes and pos_profile_doc.warehouse:
-			# Bulk calculate availability for all items (bundles auto-detected)
-			bundle_availability_map = _calculate_bundle_availability_bulk(
-				item_codes,
-				pos_profile_doc.warehouse
-			)
-		elif item_codes and not pos_profile_doc.warehouse:
-			# Warning: Bundles require warehouse for component stock lookup
-			# Without warehouse, bundles will show as unavailable (qty = 0)
-			has_bundles = frappe.db.exists("Product Bundle", {"new_item_code": ["in", item_codes]})
-			if has_bundles:
-				frappe.log_error(
-					"POS Profile missing warehouse - Product Bundles will show as unavailable",
-					"Bundle Availability Warning"
-				)
+				row.pop("is_sales_item", None)
+				row.pop("variant_of", None)
+				live_items.append(row)
 
-		# Enrich items with price, stock, barcode, and UOM data
-		for item in items:
-			stock_uom = item.get("stock_uom")
+		# Items deleted since the watermark no longer exist in tabItem
+		deleted_codes = frappe.get_all(
+			"Deleted Document",
+			filters={"deleted_doctype": "Item", "creation": [">", since]},
+			pluck="deleted_name",
+		)
+		for item_code in dict.fromkeys(deleted_codes):
+			if not frappe.db.exists("Item", item_code):
+				result["tombstones"].append({"item_code": item_code, "reason": "deleted"})
 
-			# Use pre-loaded price map instead of per-item queries
-			price_row = None
-			item_prices = uom_prices_map.get(item["item_code"], {})
+		result["items"] = _enrich_items(live_items, pos_profile_doc)
 
-			# 1) Try price explicitly for stock UOM (preferred)
-			if stock_uom and stock_uom in item_prices:
-				price_row = {"price_list_rate": item_prices[stock_uom], "uom": stock_uom}
+		# =====================================================================
+		# STEP 3: Stock-only changes for the profile warehouse
+		# =====================================================================
+		if pos_profile_doc.warehouse:
+			warehouses = warehouse_tree.get_leaf_warehouses(pos_profile_doc.warehouse)
 
-			# 2) If not found, try any price for the item (and capture its UOM)
-			elif item_prices:
-				# Get first available price
-				first_uom = next(iter(item_prices.keys()))
-				price_row = {"price_list_rate": item_prices[first_uom], "uom": first_uom}
+			stock_codes = frappe.db.sql_list(
+				"""
+				SELECT DISTINCT item_code
+				FROM `tabBin`
+				WHERE modified > %s AND warehouse IN %s
+				""",
+				[since, warehouses],
+			)
 
-			# 3) If still not found and it's a template, derive min variant price
-			derived_price = None
-			if not price_row and item.get("has_variants"):
-				variant_prices = frappe.db.sql(
+			# Bundles are not stock items: refresh those built from changed components
+			if stock_codes:
+				stock_codes += frappe.db.sql_list(
 					"""
-					SELECT MIN(ip.price_list_rate) as min_price
-					FROM `tabItem Price` ip
-					INNER JOIN `tabItem` i ON i.name = ip.item_code
-					WHERE i.variant_of = %s
-					AND ip.price_list = %s
-					AND i.disabled = 0
+					SELECT DISTINCT pb.new_item_code
+					FROM `tabProduct Bundle` pb
+					INNER JOIN `tabProduct Bundle Item` pbi ON pbi.parent = pb.name
+					WHERE pbi.item_code IN %s
 					""",
-					[item["item_code"], pos_profile_doc.selling_price_list],
-					as_dict=1,
+					[stock_codes],
 				)
-				derived_price = (
-					variant_prices[0]["min_price"]
-					if variant_prices and variant_prices[0].get("min_price")
-					else None
+
+			# Only report stock for items that are part of this profile's catalog
+			if stock_codes:
+				conditions, params = _build_item_base_conditions(pos_profile_doc)
+				conditions.append("name IN %s")
+				params.append(list(set(stock_codes)))
+				stock_codes = frappe.db.sql_list(
+					f"SELECT name FROM `tabItem` WHERE {' AND '.join(conditions)}",
+					tuple(params),
 				)
 
-			# Finalize display price & display UOM
-			display_rate = 0.0
-			display_uom = stock_uom
+			# Items already returned in full carry fresh stock
+			sent_codes = {item["item_code"] for item in result["items"]}
+			stock_codes = [code for code in dict.fromkeys(stock_codes) if code not in sent_codes]
+			if stock_codes:
+				result["stock"] = get_stock_quantities(stock_codes, pos_profile_doc.warehouse)
 
-			if price_row:
-				raw_rate = flt(price_row.get("price_list_rate") or 0)
-				price_uom = price_row.get("uom") or stock_uom
-				if price_uom and stock_uom and price_uom != stock_uom:
-					# convert to per-stock-UOM if possible
-					cf = flt(conversion_map[item["item_code"]].get(price_uom) or 0)
-					if cf:
-						display_rate = raw_rate / cf
-						display_uom = stock_uom
-					else:
-						# no conversion available: show as is (price UOM)
-						display_rate = raw_rate
-						display_uom = price_uom
-				else:
-					display_rate = raw_rate
-					display_uom = stock_uom
-			elif derived_price is not None:
-				display_rate = flt(derived_price)
-				display_uom = stock_uom
+		return result
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Get Items Changed Since Error")
+		frappe.throw(_("Error fetching catalog changes: {0}").format(str(e)))
 
-			item["rate"] = display_rate
-			item["price_list_rate"] = display_rate
-			item["uom"] = display_uom
-			item["price_uom"] = display_uom
-			item["conversion_factor"] = 1
-			item["price_list_rate_price_uom"] = display_rate
-
-			# ===================================================================
-			# STOCK QUANTITY ASSIGNMENT: Stock Items vs Product Bundles
-			# ===================================================================
-			# Stock items: Use actual_qty from Bin table (direct stock tracking)
-			# Product Bundles: Use calculated availability from component stock
-			#
-			# Decision Logic:
-			#   IF item.is_stock_item == 1:
-			#     actual_qty = stock from Bin table (or 0 if not in stock)
-			#   ELSE:
-			#     actual_qty = bundle availability (or 0 if not a bundle)
-			#
-			# Example 1 - Stock Item (Laptop):
-			#   is_stock_item = 1
-			#   actual_qty = 50 (from Bin table)
-			#
-			# Example 2 - Product Bundle (Office Kit):
-			#   is_stock_item = 0 (bundles are not stock items)
-			#   actual_qty = 7 (calculated from components)
-			#
-			# Example 3 - Service Item (Consulting):
-			#   is_stock_item = 0
-			#   actual_qty = 0 (not a bundle, no stock tracking)
-			item["actual_qty"] = (
-				stock_map.get(item["item_code"], 0)
-				if item.get("is_stock_item")
-				else bundle_availability_map.get(item["item_code"], 0)
-			)
 
-			# ===================================================================
-			# BUNDLE MARKER: Flag items that are Product Bundles
-			# ===================================================================
-			# Add is_bundle=True flag for frontend to identify bundle items.
-			# This allows UI to show bundle-specific indicators and handle
-			# bundle logic differently (e.g., show component details on click).
-			#
-			# Bundle Detection: If item_code exists in bundle_availability_map,
-			# it means a Product Bundle definition exists for this item.
-			if item["item_code"] in bundle_availability_map:
-				item["is_bundle"] = True
+def _new_watermark():
+	"""Return a get_items_changed_since watermark for the current moment, minus the overlap."""
+	watermark = add_to_date(now_datetime(), seconds=-WATERMARK_OVERLAP_SECONDS)
+	return watermark.strftime("%Y-%m-%d %H:%M:%S.%f")
 
-			# Add warehouse to item (needed for stock validation)
-			item["warehouse"] = pos_profile_doc.warehouse
 
-			# Barcode
-			item["barcode"] = barcode_map.get(item["item_code"], "")
+@frappe.whitelist()
+def export_catalog(pos_profile):
+	"""
+	Export a POS Profile's whole catalog as one gzip-compressed NDJSON response.
 
-			# Item UOMs (exclude stock UOM to avoid duplicates)
-			all_uoms = uom_map.get(item["item_code"], []) or []
-			item["item_uoms"] = [u for u in all_uoms if u.get("uom") != stock_uom]
+	Used to provision new or wiped terminals in a single request instead of
+	paging get_items. Rows are produced by a generator in keyset chunks of
+	EXPORT_CHUNK_SIZE and compressed into a spooled temporary file (spilled to
+	disk past EXPORT_SPOOL_MAX_SIZE), so the catalog is never held in memory
+	as a whole; the file is then streamed to the client.
 
-			# UOM-specific prices map for frontend selector
-			item["uom_prices"] = uom_prices_map.get(item["item_code"], {})
+	Lines (one JSON object each):
+		{"meta": {"pos_profile", "price_list", "warehouse", "watermark"}}
+		{"item": {...}}    # same shape as get_items rows
+		{"end": {"count": int}}
 
-		return items
-	except Exception as e:
-		frappe.log_error(frappe.get_traceback(), "Get Items Error")
-		frappe.throw(_("Error fetching items: {0}").format(str(e)))
+	``watermark`` can be passed straight to get_items_changed_since afterwards.
+	"""
+	pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
+
+	spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+	with gzip.GzipFile(fileobj=spool, mode="wb", compresslevel=6) as stream:
+		for row in _iter_catalog_export(pos_profile_doc):
+			stream.write(as_json(row, indent=None).encode() + b"\n")
+	spool.seek(0)
+
+	response = Response(
+		wrap_file(frappe.local.request.environ, spool),
+		mimetype="application/x-ndjson",
+		direct_passthrough=True,
+	)
+	response.headers["Content-Encoding"] = "gzip"
+	response.headers["Cache-Control"] = "no-store"
+	return response
+
+
+def _iter_catalog_export(pos_profile_doc):
+	"""Yield export lines for export_catalog, enriching one chunk of items at a time."""
+	# Taken before reading so changes made during the export are re-sent by the next delta
+	yield {
+		"meta": {
+			"pos_profile": pos_profile_doc.name,
+			"price_list": pos_profile_doc.selling_price_list,
+			"warehouse": pos_profile_doc.warehouse,
+			"watermark": _new_watermark(),
+		}
+	}
+
+	conditions, params = _build_item_base_conditions(pos_profile_doc)
+	item_groups = _get_profile_item_groups(pos_profile_doc.name)
+	if item_groups:
+		conditions.append("item_group IN %s")
+		params.append(item_groups)
+	where_clause = " AND ".join(conditions)
+
+	count = 0
+	last_name = ""
+	while True:
+		items = frappe.db.sql(
+			f"""
+			SELECT {ITEM_RESULT_COLUMNS}
+			FROM `tabItem`
+			WHERE {where_clause} AND name > %s
+			ORDER BY name
+			LIMIT %s
+			""",
+			(*params, last_name, EXPORT_CHUNK_SIZE),
+			as_dict=1,
+		)
+		if not items:
+			break
+
+		last_name = items[-1]["item_code"]
+		for item in _enrich_items(items, pos_profile_doc):
+			count += 1
+			yield {"item": item}
+
+	yield {"end": {"count": count}}
 
 
 @frappe.whitelist()
@@ -1321,6 +1925,255 @@ def get_item_details(item_code, pos_profile, customer=None, qty=1, uom=None):
 		frappe.throw(_("Error fetching item details: {0}").format(str(e)))
 
 
+@frappe.whitelist()
+def get_item_details_bulk(items, pos_profile, customer=None):
+	"""
+	Get item details for many cart lines in one call.
+
+	Returns the same dict per line as get_item_details, but each dimension
+	(item master fields, UOMs, stock, batches, serials, currencies) is loaded
+	with one set-based query across all lines instead of 5-10 queries per line.
+	ERPNext's get_item_details (the pricing engine) still runs once per distinct
+	(item_code, qty, uom) combination.
+
+	Args:
+		items (list|str): Cart lines [{"item_code", "qty", "uom"}] or JSON string
+		pos_profile (str): POS Profile name
+		customer (str, optional): Customer applied to pricing rules
+
+	Returns:
+		list: One details dict per input line, in input order. Lines that cannot
+			be sold come back as {"item_code": ..., "error": message}
+	"""
+	try:
+		items = _parse_list_parameter(items, "items")
+		if not pos_profile:
+			frappe.throw(_("POS Profile is required"))
+
+		pos_profile_doc = frappe.get_cached_doc("POS Profile", pos_profile)
+		warehouse = pos_profile_doc.warehouse
+		price_list = pos_profile_doc.selling_price_list
+		company = pos_profile_doc.company
+
+		item_codes = list(dict.fromkeys(line.get("item_code") for line in items if line.get("item_code")))
+		if not item_codes:
+			return []
+
+		# Item master fields for every line: 1 query
+		item_map = {
+			row.name: row
+			for row in frappe.get_all(
+				"Item",
+				filters={"name": ["in", item_codes]},
+				fields=[
+					"name",
+					"is_sales_item",
+					"is_stock_item",
+					"has_batch_no",
+					"has_serial_no",
+					"max_discount",
+					"item_group",
+					"brand",
+					"stock_uom",
+				],
+			)
+		}
+
+		# UOM conversions: 1 query
+		uom_map = defaultdict(list)
+		for row in frappe.get_all(
+			"UOM Conversion Detail",
+			filters={"parent": ["in", item_codes], "parenttype": "Item"},
+			fields=["parent", "uom", "conversion_factor"],
+			order_by="idx",
+		):
+			uom_map[row.parent].append({"uom": row.uom, "conversion_factor": row.conversion_factor})
+
+		# Include all child warehouses when a group warehouse is set
+		warehouses = warehouse_tree.get_leaf_warehouses(warehouse)
+
+		def codes_with(flag):
+			return [code for code in item_codes if item_map.get(code) and item_map[code].get(flag)]
+
+		# Stock: 1 query
+		stock_map = {}
+		stock_codes = codes_with("is_stock_item")
+		if warehouses and stock_codes:
+			stock_map = {
+				row.item_code: flt(row.actual_qty)
+				for row in frappe.get_all(
+					"Bin",
+					filters={"item_code": ["in", stock_codes], "warehouse": ["in", warehouses]},
+					fields=["item_code", "sum(actual_qty) as actual_qty"],
+					group_by="item_code",
+				)
+			}
+
+		# Batches: quantities + Batch metadata in 2-3 queries
+		batch_map = {}
+		batch_codes = codes_with("has_batch_no")
+		if warehouses and batch_codes:
+			batch_map = _get_available_batches_bulk(batch_codes, warehouses)
+
+		# Serial numbers: 1 query
+		serial_map = defaultdict(list)
+		serial_codes = codes_with("has_serial_no")
+		if warehouse and serial_codes:
+			for row in frappe.get_all(
+				"Serial No",
+				filters={"item_code": ["in", serial_codes], "status": "Active", "warehouse": warehouse},
+				fields=["item_code", "name as serial_no"],
+			):
+				serial_map[row.item_code].append({"serial_no": row.serial_no})
+
+		# Currency context is shared by every line
+		pricing_context = {"doctype": "Sales Invoice", "company": company, "customer": customer}
+		if company:
+			price_list_currency, exchange_rate = _get_price_list_currency(company, price_list)
+			pricing_context.update(
+				{
+					"price_list_currency": price_list_currency,
+					"plc_conversion_rate": exchange_rate,
+					"conversion_rate": exchange_rate,
+				}
+			)
+		doc = frappe._dict(pricing_context)
+
+		pricing_results = {}
+		results = []
+		for line in items:
+			item_code = line.get("item_code")
+			item_row = item_map.get(item_code)
+			if not item_row or not item_row.is_sales_item:
+				results.append(
+					{"item_code": item_code, "error": _("Item {0} is not allowed for sales").format(item_code)}
+				)
+				continue
+
+			qty = line.get("qty") or 1
+			pricing_key = (item_code, flt(qty), line.get("uom"))
+			if pricing_key not in pricing_results:
+				args = frappe._dict(
+					{
+						**pricing_context,
+						"item_code": item_code,
+						"qty": qty,
+						"uom": line.get("uom"),
+						"selling_price_list": price_list,
+					}
+				)
+				pricing_results[pricing_key] = erpnext_get_item_details(args, doc)
+
+			# Lines sharing a pricing key must not share nested rows (pricing rules, ...)
+			res = frappe._dict(copy.deepcopy(pricing_results[pricing_key]))
+
+			if item_row.is_stock_item and warehouse:
+				res["actual_qty"] = stock_map.get(item_code, 0.0)
+
+			res["max_discount"] = item_row.max_discount
+			res["batch_no_data"] = batch_map.get(item_code, [])
+			res["serial_no_data"] = serial_map.get(item_code, [])
+			res["item_group"] = item_row.item_group
+			res["brand"] = item_row.brand
+
+			uoms = [dict(uom) for uom in uom_map.get(item_code, [])]
+			if item_row.stock_uom and not any(u["uom"] == item_row.stock_uom for u in uoms):
+				uoms.append({"uom": item_row.stock_uom, "conversion_factor": 1.0})
+			res["item_uoms"] = uoms
+
+			results.append(res)
+
+		return results
+	except Exception as e:
+		frappe.log_error(frappe.get_traceback(), "Get Item Details Bulk Error")
+		frappe.throw(_("Error fetching item details: {0}").format(str(e)))
+
+
+def _get_available_batches_bulk(item_codes, warehouses):
+	"""
+	Return sellable batches for many items at once, like get_batch_qty per item.
+
+	Quantities are summed from the stock ledger: Serial and Batch Bundle
+	entries plus legacy SLE.batch_no rows. Only batches with qty > 0 that are
+	enabled and not expired are kept, ordered first-to-expire first.
+
+	Returns:
+		dict: {item_code: [{"batch_no", "batch_qty", "expiry_date", "manufacturing_date"}]}
+	"""
+	params = {"item_codes": item_codes, "warehouses": warehouses}
+	qty_map = defaultdict(float)
+
+	if frappe.db.table_exists("Serial and Batch Entry"):
+		for row in frappe.db.sql(
+			"""
+			SELECT sle.item_code, sbe.batch_no, SUM(sbe.qty) AS qty
+			FROM `tabStock Ledger Entry` sle
+			INNER JOIN `tabSerial and Batch Entry` sbe ON sbe.parent = sle.serial_and_batch_bundle
+			WHERE sle.is_cancelled = 0
+				AND sle.item_code IN %(item_codes)s
+				AND sle.warehouse IN %(warehouses)s
+				AND IFNULL(sbe.batch_no, '') != ''
+			GROUP BY sle.item_code, sbe.batch_no
+			""",
+			params,
+			as_dict=1,
+		):
+			qty_map[(row.item_code, row.batch_no)] += flt(row.qty)
+
+	legacy_condition = ""
+	if frappe.db.has_column("Stock Ledger Entry", "serial_and_batch_bundle"):
+		legacy_condition = "AND IFNULL(serial_and_batch_bundle, '') = ''"
+
+	for row in frappe.db.sql(
+		f"""
+		SELECT item_code, batch_no, SUM(actual_qty) AS qty
+		FROM `tabStock Ledger Entry`
+		WHERE is_cancelled = 0
+			AND item_code IN %(item_codes)s
+			AND warehouse IN %(warehouses)s
+			AND IFNULL(batch_no, '') != ''
+			{legacy_condition}
+		GROUP BY item_code, batch_no
+		""",
+		params,
+		as_dict=1,
+	):
+		qty_map[(row.item_code, row.batch_no)] += flt(row.qty)
+
+	in_stock = {key: qty for key, qty in qty_map.items() if qty > 0}
+	if not in_stock:
+		return {}
+
+	today = nowdate()
+	batch_meta = {
+		row.name: row
+		for row in frappe.get_all(
+			"Batch",
+			filters={"name": ["in", list({key[1] for key in in_stock})], "disabled": 0},
+			fields=["name", "expiry_date", "manufacturing_date"],
+		)
+	}
+
+	result = defaultdict(list)
+	for (item_code, batch_no), qty in in_stock.items():
+		batch = batch_meta.get(batch_no)
+		if not batch or (batch.expiry_date and str(batch.expiry_date) <= today):
+			continue
+		result[item_code].append(
+			{
+				"batch_no": batch_no,
+				"batch_qty": qty,
+				"expiry_date": batch.expiry_date,
+				"manufacturing_date": batch.manufacturing_date,
+			}
+		)
+
+	for batches in result.values():
+		batches.sort(key=lambda b: (b["expiry_date"] is None, str(b["expiry_date"] or "")))
+
+	return dict(result)
+
+
 @frappe.whitelist()
 def get_item_groups(pos_profile):
 	"""Get item groups for filtering"""
@@ -1394,11 +2247,7 @@ def get_stock_quantities(item_codes, warehouse):
 			return []
 
 		# Support group warehouses by expanding to leaf warehouses
-		warehouses = [warehouse]
-		if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-			child_warehouses = frappe.db.get_descendants("Warehouse", warehouse) or []
-			# Fallback to original warehouse if no children are returned
-			warehouses = child_warehouses or [warehouse]
+		warehouses = warehouse_tree.get_leaf_warehouses(warehouse)
 
 		if not warehouses:
 			return []
@@ -1699,9 +2548,7 @@ def get_product_bundle_availability(item_code, warehouse):
 			return {"available_qty": 0, "components": []}
 
 		# Get warehouses (support group warehouses)
-		warehouses = [warehouse]
-		if frappe.db.get_value("Warehouse", warehouse, "is_group"):
-			warehouses = frappe.db.get_descendants("Warehouse", warehouse) or [warehouse]
+		warehouses = warehouse_tree.get_leaf_warehouses(warehouse)
 
 		# Get component stock (use available = actual - reserved)
 		component_codes = [c["item_code"] for c in components]
@@ -0,0 +1,175 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Payment Modes
+Cached Mode of Payment registry: type, wallet flag and, per company, the
+account payments of that mode post to.
+
+Submitting an invoice used to resolve each payment row's account with up to
+five queries and look up ``is_wallet_payment`` again for validation, pending
+wallet amounts and every GL entry. The registry loads all modes with one
+query and each (mode, company) account once, shares them through Redis and
+memoizes them on ``frappe.local`` for the rest of the request.
+
+Mode of Payment, Company and POS Profile changes (the account fallbacks read
+all three) bump a generation counter after commit, retiring every cached
+entry.
+"""
+
+import frappe
+from frappe.utils import cint
+
+from pos_next.api.cache_utils import GenerationCache
+
+CACHE_TTL = 6 * 60 * 60
+
+# Cached in place of "no account", which get_value cannot tell from a miss
+_NO_ACCOUNT = ""
+
+_cache = GenerationCache("payment_modes", CACHE_TTL)
+
+
+def _load_modes():
+	fields = ["name", "type"]
+	if frappe.db.has_column("Mode of Payment", "is_wallet_payment"):
+		fields.append("is_wallet_payment")
+
+	return {
+		row.name: {"type": row.type, "is_wallet_payment": cint(row.get("is_wallet_payment"))}
+		for row in frappe.get_all("Mode of Payment", fields=fields)
+	}
+
+
+def _load_account(mode_of_payment, company):
+	# Try 1: Mode of Payment Account table
+	account = frappe.db.get_value(
+		"Mode of Payment Account",
+		{"parent": mode_of_payment, "company": company},
+		"default_account",
+	)
+	if account:
+		return account
+
+	# Try 2: POS Payment Method from POS Profile
+	account = frappe.db.sql(
+		"""
+		SELECT ppm.default_account
+		FROM `tabPOS Payment Method` ppm
+		INNER JOIN `tabPOS Profile` pp ON ppm.parent = pp.name
+		WHERE ppm.mode_of_payment = %s
+		AND pp.company = %s
+		AND ppm.default_account IS NOT NULL
+		LIMIT 1
+		""",
+		(mode_of_payment, company),
+		as_dict=1,
+	)
+	if account and account[0].default_account:
+		return account[0].default_account
+
+	# Try 3: Company default cash account (for cash payments)
+	if "cash" in mode_of_payment.lower():
+		account = frappe.get_value("Company", company, "default_cash_account")
+		if account:
+			return account
+
+	# Try 4: Company default bank account
+	account = frappe.get_value("Company", company, "default_bank_account")
+	if account:
+		return account
+
+	# Try 5: Any Cash/Bank account for the company
+	account = frappe.db.get_value(
+		"Account",
+		{"company": company, "account_type": ["in", ["Cash", "Bank"]], "is_group": 0},
+		"name",
+	)
+	return account or _NO_ACCOUNT
+
+
+def _get_modes():
+	return _cache.get(("modes",), _load_modes)
+
+
+def get_mode_of_payment(mode_of_payment, company=None):
+	"""
+	Return a Mode of Payment's registry entry.
+
+	Args:
+		mode_of_payment (str): Mode of Payment name
+		company (str): Resolve the mode's account for this company
+
+	Returns:
+		frappe._dict: {mode_of_payment, type, is_wallet_payment (0/1), company,
+			account (None without a company or a usable account)}, or None for
+			an unknown mode. Treat it as read-only.
+	"""
+	mode = _get_modes().get(mode_of_payment) if mode_of_payment else None
+	if mode is None:
+		return None
+
+	return frappe._dict(
+		mode_of_payment=mode_of_payment,
+		type=mode["type"],
+		is_wallet_payment=mode["is_wallet_payment"],
+		company=company,
+		account=get_payment_account(mode_of_payment, company) if company else None,
+	)
+
+
+def get_payment_account(mode_of_payment, company):
+	"""
+	Return the account payments of a mode post to for a company, or None.
+
+	Tries the Mode of Payment Account table, POS Payment Method defaults of
+	the company's POS Profiles, the company's default cash (for cash modes)
+	and bank accounts, then any Cash/Bank account of the company.
+	"""
+	if not mode_of_payment or not company:
+		return None
+
+	account = _cache.get(
+		("account", mode_of_payment, company), lambda: _load_account(mode_of_payment, company)
+	)
+	return account or None
+
+
+def get_payment_type(mode_of_payment):
+	"""Return the Mode of Payment type (Cash, Bank, ...), or None for an unknown mode."""
+	mode = _get_modes().get(mode_of_payment) if mode_of_payment else None
+	return mode["type"] if mode else None
+
+
+def is_wallet_payment(mode_of_payment):
+	"""Return whether a Mode of Payment is a wallet payment."""
+	mode = _get_modes().get(mode_of_payment) if mode_of_payment else None
+	return bool(mode and mode["is_wallet_payment"])
+
+
+def get_wallet_payment_modes():
+	"""Return the names of all wallet payment modes."""
+	return [name for name, mode in _get_modes().items() if mode["is_wallet_payment"]]
+
+
+def invalidate():
+	"""Retire every cached entry."""
+	_cache.invalidate()
+
+
+def invalidate_after_commit():
+	"""Invalidate for this request now and for everyone once the change is committed."""
+	_cache.invalidate_after_commit()
+
+
+# ==========================================
+# Doc Events
+# ==========================================
+
+
+def on_payment_config_change(doc, method=None, *args):
+	"""Mode of Payment / Company / POS Profile on_update (and on_trash, after_rename) hook."""
+	try:
+		invalidate_after_commit()
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Payment Modes Cache Error")
@@ -0,0 +1,125 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+POS Config
+Resolved configuration of a POS Profile: its POS Settings row, POS Profile
+custom fields and the single settings POS behaviour depends on.
+
+One invoice submit used to read POS Settings by pos_profile in several
+places (submit, stock blocking, tax inclusive, loyalty, wallet) and Stock
+Settings uncached. The configuration is now loaded once, shared through
+Redis and memoized on ``frappe.local`` for the rest of the request.
+
+POS Settings and POS Profile saves and Stock Settings updates bump a
+generation counter (after commit), retiring every cached configuration.
+POS Settings can toggle Stock Settings itself, so precise per-profile
+invalidation would not be enough.
+"""
+
+import frappe
+from frappe.utils import cint
+
+from pos_next.api.cache_utils import GenerationCache
+
+CACHE_TTL = 6 * 60 * 60
+
+# POS Profile custom fields (may not exist on every site)
+PROFILE_FIELDS = ("posa_block_sale_beyond_available_qty",)
+
+# Framework columns that are not settings
+_STANDARD_FIELDS = ("owner", "creation", "modified", "modified_by", "docstatus", "idx")
+
+_cache = GenerationCache("pos_config", CACHE_TTL)
+
+
+def _load(pos_profile):
+	settings = None
+	profile_values = {}
+	if pos_profile:
+		settings = frappe.db.get_value("POS Settings", {"pos_profile": pos_profile}, "*", as_dict=True)
+		if settings:
+			for fieldname in _STANDARD_FIELDS:
+				settings.pop(fieldname, None)
+
+		fields = [field for field in PROFILE_FIELDS if frappe.db.has_column("POS Profile", field)]
+		if fields:
+			profile_values = frappe.db.get_value("POS Profile", pos_profile, fields, as_dict=True) or {}
+
+	return frappe._dict({
+		"pos_profile": pos_profile or None,
+		"settings": dict(settings) if settings else None,
+		"profile": {field: profile_values.get(field) for field in PROFILE_FIELDS},
+		"stock_allow_negative_stock": cint(
+			frappe.db.get_single_value("Stock Settings", "allow_negative_stock")
+		),
+	})
+
+
+def get_pos_config(pos_profile):
+	"""
+	Return the resolved configuration of a POS Profile.
+
+	Args:
+		pos_profile (str): POS Profile name
+
+	Returns:
+		frappe._dict: {
+			"pos_profile": name,
+			"settings": POS Settings values as a dict, or None without a POS Settings row,
+			"profile": {custom field: value} (None where the field does not exist),
+			"stock_allow_negative_stock": Stock Settings allow_negative_stock (0/1),
+		}
+		Treat it as read-only; it is shared for the rest of the request.
+	"""
+	pos_profile = pos_profile or ""
+	return _cache.get((pos_profile,), lambda: _load(pos_profile))
+
+
+def get_pos_settings(pos_profile, fields, enabled_only=False):
+	"""
+	Read POS Settings values of a profile, like
+	``frappe.db.get_value("POS Settings", {"pos_profile": ...}, fields, as_dict=True)``.
+
+	Args:
+		pos_profile (str): POS Profile name
+		fields (str|list): One fieldname (returns the value) or a list (returns a dict)
+		enabled_only (bool): Treat disabled POS Settings as missing
+
+	Returns:
+		The value / frappe._dict of values, or None without (enabled) POS Settings
+	"""
+	if not pos_profile:
+		return None
+
+	settings = get_pos_config(pos_profile).settings
+	if not settings or (enabled_only and not cint(settings.get("enabled"))):
+		return None
+
+	if isinstance(fields, str):
+		return settings.get(fields)
+
+	return frappe._dict({field: settings.get(field) for field in fields})
+
+
+def invalidate():
+	"""Retire every cached configuration."""
+	_cache.invalidate()
+
+
+def invalidate_after_commit():
+	"""Invalidate for this request now and for everyone once the change is committed."""
+	_cache.invalidate_after_commit()
+
+
+# ==========================================
+# Doc Events
+# ==========================================
+
+
+def on_config_change(doc, method=None, *args):
+	"""POS Profile / Stock Settings on_update (and on_trash, after_rename) hook."""
+	try:
+		invalidate_after_commit()
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "POS Config Cache Error")
@@ -5,6 +5,7 @@
 from __future__ import unicode_literals
 import frappe
 from frappe import _
+from pos_next.api import payment_modes, pos_config
 from pos_next.api.utilities import check_user_company
 from pos_next.api.utilities import _parse_list_parameter
 
@@ -69,9 +70,8 @@ def get_pos_settings(pos_profile):
 
 	try:
 		# Get POS Settings linked to this POS Profile
-		pos_settings = frappe.db.get_value(
-			"POS Settings",
-			{"pos_profile": pos_profile, "enabled": 1},
+		pos_settings = pos_config.get_pos_settings(
+			pos_profile,
 			[
 				"tax_inclusive",
 				"allow_user_to_edit_additional_discount",
@@ -90,7 +90,7 @@ def get_pos_settings(pos_profile):
 				"allow_select_sales_order",
 				"create_only_sales_order"
 			],
-			as_dict=True
+			enabled_only=True,
 		)
 
 		# Return settings or defaults if not found
@@ -138,12 +138,7 @@ def get_payment_methods(pos_profile):
 
 		# Get payment type for each method
 		for method in payment_methods:
-			payment_type = frappe.db.get_value(
-				"Mode of Payment",
-				method["mode_of_payment"],
-				"type"
-			)
-			method["type"] = payment_type or "Cash"
+			method["type"] = payment_modes.get_payment_type(method["mode_of_payment"]) or "Cash"
 
 		return payment_methods
 	except Exception as e:
@@ -0,0 +1,191 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Post Submit
+Durable background pipeline for the side effects of submitted POS invoices.
+
+Loyalty-to-wallet conversion and customer credit redemption used to run on
+the cashier's request right after ``submit()``. They are now queued as POS
+Post Submit Task rows, inserted in the invoice's own transaction, so a task
+exists exactly when its invoice was committed.
+
+- one job per invoice (deduplicated job id) runs the invoice's tasks in the
+  order they were queued, each in its own transaction with its status
+- a failing task is retried with exponential backoff; later tasks of the
+  invoice wait for it
+- after MAX_ATTEMPTS it is marked Dead and logged (dead letter), and the
+  invoice's remaining tasks continue
+- a scheduler sweep re-queues due retries and tasks whose job was lost
+- ``get_post_submit_status(sales_invoice)`` reports the tasks for support
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cstr, get_datetime, now_datetime
+
+from pos_next.api import queue_utils
+
+DOCTYPE = "POS Post Submit Task"
+JOB_ID_PREFIX = "pos_next_post_submit"
+
+TASK_LOYALTY_TO_WALLET = "loyalty_to_wallet"
+TASK_CREDIT_REDEMPTION = "credit_redemption"
+
+# Task name -> handler(sales_invoice, payload)
+TASK_HANDLERS = {
+	TASK_LOYALTY_TO_WALLET: "pos_next.api.wallet.convert_loyalty_to_wallet",
+	TASK_CREDIT_REDEMPTION: "pos_next.api.credit_sales.redeem_customer_credit_task",
+}
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 60
+KEEP_COMPLETED_DAYS = 30
+
+STATUS_QUEUED = "Queued"
+STATUS_RETRYING = "Retrying"
+STATUS_COMPLETED = "Completed"
+STATUS_DEAD = "Dead"
+
+
+def enqueue_task(sales_invoice, task, payload=None):
+	"""
+	Queue a post-submit task of an invoice, inside the caller's transaction.
+
+	Args:
+		sales_invoice (str): Sales Invoice name
+		task (str): One of TASK_HANDLERS
+		payload (dict): Handler arguments (JSON serializable)
+	"""
+	if task not in TASK_HANDLERS:
+		frappe.throw(_("Unknown post-submit task {0}").format(task))
+
+	frappe.get_doc(
+		{
+			"doctype": DOCTYPE,
+			"sales_invoice": sales_invoice,
+			"task": task,
+			"status": STATUS_QUEUED,
+			"payload": json.dumps(payload, default=str) if payload is not None else None,
+		}
+	).insert(ignore_permissions=True)
+	queue_invoice(sales_invoice)
+
+
+def queue_invoice(sales_invoice):
+	frappe.enqueue(
+		"pos_next.api.post_submit.process_invoice",
+		queue="short",
+		job_id=f"{JOB_ID_PREFIX}:{sales_invoice}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		sales_invoice=sales_invoice,
+	)
+
+
+@frappe.whitelist()
+def get_post_submit_status(sales_invoice):
+	"""
+	Return the post-submit tasks of an invoice.
+
+	Args:
+		sales_invoice (str): Sales Invoice name
+
+	Returns:
+		list: [{name, task, status, attempts, next_attempt, error, creation,
+			modified}] in the order they run
+	"""
+	frappe.has_permission("Sales Invoice", "read", sales_invoice, throw=True)
+
+	return frappe.get_all(
+		DOCTYPE,
+		filters={"sales_invoice": sales_invoice},
+		fields=["name", "task", "status", "attempts", "next_attempt", "error", "creation", "modified"],
+		order_by="creation asc",
+	)
+
+
+def _get_pending(sales_invoice):
+	return frappe.get_all(
+		DOCTYPE,
+		filters={"sales_invoice": sales_invoice, "status": ["in", [STATUS_QUEUED, STATUS_RETRYING]]},
+		fields=["name", "status", "next_attempt"],
+		order_by="creation asc",
+	)
+
+
+# ==========================================
+# Background Jobs
+# ==========================================
+
+
+def process_invoice(sales_invoice):
+	"""Run an invoice's pending tasks in order, stopping at one waiting for a retry."""
+	for pending in _get_pending(sales_invoice):
+		if pending.status == STATUS_RETRYING and get_datetime(pending.next_attempt) > now_datetime():
+			break
+
+		if not run_task(pending.name):
+			# Later tasks wait until this one succeeds or is dead
+			task = frappe.db.get_value(DOCTYPE, pending.name, "status")
+			if task == STATUS_RETRYING:
+				break
+
+
+def run_task(name):
+	"""
+	Run one task; its effects and its Completed status commit together.
+
+	Returns:
+		bool: True when the task completed
+	"""
+	task = frappe.get_doc(DOCTYPE, name)
+	if task.status not in (STATUS_QUEUED, STATUS_RETRYING):
+		return task.status == STATUS_COMPLETED
+
+	payload = json.loads(task.payload) if task.payload else None
+	try:
+		frappe.get_attr(TASK_HANDLERS[task.task])(task.sales_invoice, payload)
+		task.db_set({"status": STATUS_COMPLETED, "error": None, "next_attempt": None})
+		frappe.db.commit()
+		return True
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.clear_messages()
+
+		attempts = (task.attempts or 0) + 1
+		error = cstr(e) or e.__class__.__name__
+		if attempts >= MAX_ATTEMPTS:
+			task.db_set({"status": STATUS_DEAD, "attempts": attempts, "error": error, "next_attempt": None})
+			frappe.log_error(
+				title="POS Post Submit Task Dead",
+				message=f"Task: {task.task}, Invoice: {task.sales_invoice}\n{frappe.get_traceback()}",
+				reference_doctype=DOCTYPE,
+				reference_name=task.name,
+			)
+		else:
+			task.db_set(
+				{
+					"status": STATUS_RETRYING,
+					"attempts": attempts,
+					"error": error,
+					"next_attempt": queue_utils.next_attempt_at(attempts, RETRY_BASE_SECONDS),
+				}
+			)
+		frappe.db.commit()
+		return False
+
+
+def requeue_due():
+	"""Scheduler: queue jobs for due retries and for queued tasks whose job was lost."""
+	for sales_invoice in queue_utils.get_groups_to_requeue(
+		DOCTYPE, "sales_invoice", STATUS_RETRYING, [STATUS_QUEUED]
+	):
+		queue_invoice(sales_invoice)
+
+
+def delete_old_tasks():
+	"""Daily: delete tasks completed more than KEEP_COMPLETED_DAYS ago."""
+	queue_utils.delete_completed(DOCTYPE, STATUS_COMPLETED, KEEP_COMPLETED_DAYS)
@@ -0,0 +1,69 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Queue Utils
+Helpers shared by the durable job tables of the POS API (POS Invoice
+Submission, POS Post Submit Task).
+
+Rows of those tables are processed by deduplicated background jobs: a failed
+row is retried with exponential backoff, a scheduler sweep queues the job
+again for due retries and for rows whose job was lost, and completed rows are
+kept for status lookups for a while before being deleted.
+"""
+
+import frappe
+from frappe.utils import add_to_date, now_datetime
+
+# A waiting row not touched for this long has lost its job (dead worker,
+# flushed queue) and gets it queued again
+STALE_AFTER_SECONDS = 120
+
+
+def next_attempt_at(attempts, base_seconds):
+	"""Return when a row that failed ``attempts`` times is tried again."""
+	return add_to_date(now_datetime(), seconds=base_seconds * 2 ** (attempts - 1))
+
+
+def get_groups_to_requeue(doctype, group_field, retrying_status, waiting_statuses):
+	"""
+	Return the ``group_field`` values whose job must be queued again.
+
+	Args:
+		doctype (str): Job table
+		group_field (str): Field naming what one job processes (invoice, shift)
+		retrying_status (str): Status of rows waiting for ``next_attempt``
+		waiting_statuses (list): Statuses of rows a live job would pick up
+
+	Returns:
+		set: Groups with a due retry or with rows stale for STALE_AFTER_SECONDS
+	"""
+	now = now_datetime()
+	due = frappe.get_all(
+		doctype,
+		filters={"status": retrying_status, "next_attempt": ["<=", now]},
+		pluck=group_field,
+		distinct=True,
+	)
+	stale = frappe.get_all(
+		doctype,
+		filters={
+			"status": ["in", waiting_statuses],
+			"modified": ["<", add_to_date(now, seconds=-STALE_AFTER_SECONDS)],
+		},
+		pluck=group_field,
+		distinct=True,
+	)
+	return set(due) | set(stale)
+
+
+def delete_completed(doctype, completed_status, keep_days):
+	"""Delete rows completed more than ``keep_days`` ago, once status lookups are unlikely."""
+	frappe.db.delete(
+		doctype,
+		{
+			"status": completed_status,
+			"modified": ["<", add_to_date(now_datetime(), days=-keep_days)],
+		},
+	)
+	frappe.db.commit()
@@ -10,11 +10,27 @@ import frappe
 from frappe import _
 from frappe.utils import cint
 
+from pos_next.api.pos_config import get_pos_settings
+from pos_next.api.submit_metrics import measured
+
+
+def before_validate(doc, method=None):
+	"""
+	Before Validate hook for Sales Invoice.
+	Mark taxes inclusive per POS Settings before the controller's validate
+	calculates totals, so those totals already use the right flags.
+
+	Args:
+		doc: Sales Invoice document
+		method: Hook method name (unused)
+	"""
+	set_tax_inclusive(doc)
+
 
 def validate(doc, method=None):
 	"""
 	Validate hook for Sales Invoice.
-	Apply tax inclusive settings based on POS Profile configuration.
+	Apply tax inclusive settings to taxes added during validate.
 	Auto-assign loyalty program to customer if enabled.
 
 	Args:
@@ -25,50 +41,53 @@ def validate(doc, method=None):
 	auto_assign_loyalty_program_on_invoice(doc)
 
 
-def apply_tax_inclusive(doc):
+def set_tax_inclusive(doc):
 	"""
-	Mark taxes as inclusive based on POS Profile setting.
+	Mark taxes as inclusive based on POS Profile setting, without recalculating.
 
-	This function reads the tax_inclusive setting from POS Settings
+	This function reads the tax_inclusive setting from the cached POS Settings
 	and applies it to all taxes in the invoice (except Actual charge type).
+	Call it where the taxes are built, before totals are calculated.
 
 	Args:
 		doc: Sales Invoice document
+
+	Returns:
+		bool: True when a tax row changed
 	"""
-	if not doc.pos_profile:
-		return
+	if not doc.pos_profile or not doc.get("taxes"):
+		return False
 
 	try:
 		# Get POS Settings for this profile
-		pos_settings = frappe.db.get_value(
-			"POS Settings",
-			{"pos_profile": doc.pos_profile},
-			["tax_inclusive"],
-			as_dict=True
-		)
-		tax_inclusive = pos_settings.get("tax_inclusive", 0) if pos_settings else 0
+		tax_inclusive = cint(get_pos_settings(doc.pos_profile, "tax_inclusive"))
 	except Exception:
 		tax_inclusive = 0
 
 	has_changes = False
 	for tax in doc.get("taxes", []):
 		# Skip Actual charge type - these can't be inclusive
-		if tax.charge_type == "Actual":
-			if tax.included_in_print_rate:
-				tax.included_in_print_rate = 0
-				has_changes = True
-			continue
-
-		# Apply tax inclusive setting
-		if tax_inclusive and not tax.included_in_print_rate:
-			tax.included_in_print_rate = 1
-			has_changes = True
-		elif not tax_inclusive and tax.included_in_print_rate:
-			tax.included_in_print_rate = 0
+		included = 0 if tax.charge_type == "Actual" else tax_inclusive
+		if cint(tax.included_in_print_rate) != included:
+			tax.included_in_print_rate = included
 			has_changes = True
 
-	# Recalculate if we made changes
-	if has_changes:
+	return has_changes
+
+
+@measured("apply_tax_inclusive")
+def apply_tax_inclusive(doc):
+	"""
+	Mark taxes as inclusive and recalculate totals if any flag changed.
+
+	Invoices built by update_invoice and saved through before_validate
+	already carry the flags, so this only recalculates for taxes set during
+	validate itself (e.g. a tax template fetched by set_missing_values).
+
+	Args:
+		doc: Sales Invoice document
+	"""
+	if set_tax_inclusive(doc):
 		doc.calculate_taxes_and_totals()
 
 
@@ -91,11 +110,8 @@ def auto_assign_loyalty_program_on_invoice(doc):
 		return
 
 	# Get POS Settings
-	pos_settings = frappe.db.get_value(
-		"POS Settings",
-		{"pos_profile": doc.pos_profile},
-		["enable_loyalty_program", "default_loyalty_program"],
-		as_dict=True
+	pos_settings = get_pos_settings(
+		doc.pos_profile, ["enable_loyalty_program", "default_loyalty_program"]
 	)
 
 	if not pos_settings:
@@ -0,0 +1,106 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Stock Events
+Per-warehouse, sequence-numbered log of published stock events.
+
+Every event published to a warehouse room is stamped with the next value of
+that warehouse's counter and kept in a bounded Redis sorted set (scored by
+sequence). A terminal that missed events while its socket was down replays
+them with ``get_stock_events_since``. When the events it needs have been
+trimmed from the log, it is told to resync stock instead.
+"""
+
+import json
+
+import frappe
+from frappe.utils import cint
+
+from pos_next.api.cache_utils import raw_key
+
+SEQUENCE_KEY_PREFIX = "pos_next:stock_event_seq"
+LOG_KEY_PREFIX = "pos_next:stock_event_log"
+LOG_SIZE = 1000
+LOG_TTL = 24 * 60 * 60
+
+
+def _sequence_key(warehouse):
+	return raw_key(f"{SEQUENCE_KEY_PREFIX}:{warehouse}")
+
+
+def _log_key(warehouse):
+	return raw_key(f"{LOG_KEY_PREFIX}:{warehouse}")
+
+
+def record_event(warehouse, event, message):
+	"""
+	Stamp an event with the warehouse's next sequence number and log it.
+
+	Args:
+		warehouse (str): Warehouse whose room the event is published to
+		event (str): Realtime event name
+		message (dict): Event payload (``seq`` is added to it)
+
+	Returns:
+		int: The event's sequence number
+	"""
+	cache = frappe.cache()
+	seq = cache.incr(_sequence_key(warehouse))
+	message["seq"] = seq
+
+	log_key = _log_key(warehouse)
+	pipe = cache.pipeline()
+	pipe.zadd(log_key, {json.dumps({"seq": seq, "event": event, "message": message}, default=str): seq})
+	pipe.zremrangebyrank(log_key, 0, -LOG_SIZE - 1)
+	pipe.expire(log_key, LOG_TTL)
+	pipe.execute()
+
+	return seq
+
+
+@frappe.whitelist()
+def get_stock_events_since(warehouse, seq=None):
+	"""
+	Replay the stock events a terminal missed.
+
+	Args:
+		warehouse (str): Warehouse name
+		seq (int): Last sequence number the terminal applied. Omit to only
+			learn the current sequence (e.g. when first subscribing).
+
+	Returns:
+		dict: {
+			"seq": current sequence number,
+			"events": [{seq, event, message}, ...] after ``seq``, oldest first,
+			"resync": True when the missed events are no longer in the log (or
+				the counter was reset) and the terminal must reload stock,
+		}
+	"""
+	cache = frappe.cache()
+	current = cint(cache.get(_sequence_key(warehouse)))
+	result = {"seq": current, "events": [], "resync": False}
+
+	if seq is None or seq == "":
+		return result
+
+	seq = cint(seq)
+	if seq == current:
+		return result
+
+	if seq > current:
+		# Counter was reset (e.g. Redis flushed); the terminal's position is meaningless
+		result["resync"] = True
+		return result
+
+	log_key = _log_key(warehouse)
+	oldest = cache.zrange(log_key, 0, 0, withscores=True)
+	if not oldest or int(oldest[0][1]) > seq + 1:
+		result["resync"] = True
+		return result
+
+	result["events"] = [
+		json.loads(frappe.safe_decode(entry))
+		for entry in cache.zrangebyscore(log_key, f"({seq}", current)
+	]
+	return result
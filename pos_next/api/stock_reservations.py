@@ -0,0 +1,270 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Stock Reservations
+Short-lived Redis reservations of cart quantities, shared by all terminals.
+
+Without reservations, several tills can each pass stock validation for the
+last units of an item and all but one then fail at submit, after the
+invoice was saved. When "Enable Stock Reservations" is set in POS Settings,
+each terminal syncs its cart (reservation_id = one cart) and the cart's
+quantity per (item, warehouse) is reserved:
+
+- per (item, warehouse): a hash {reservation_id: qty} and a sorted set
+  {reservation_id: expires_at}
+- reserving runs as one Lua script: drop expired entries, sum the other
+  carts' quantities, and only reserve when Bin qty minus those still covers
+  the request, so two tills can never both take the last unit
+- stock validation checks Bin qty minus the other carts' live reservations,
+  with no row locks on tabBin
+- a submitted invoice releases its cart's reservation after commit (the
+  stock ledger now holds the quantity); abandoned carts simply expire
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, now_datetime
+
+from pos_next.api.cache_utils import raw_key
+from pos_next.api.pos_config import get_pos_settings
+
+KEY_PREFIX = "pos_next:stock_reservation"
+CART_KEY_PREFIX = "pos_next:stock_reservation_cart"
+DEFAULT_TTL = 300
+
+_SEPARATOR = "\x1f"
+
+# KEYS: qty hash, expiry zset
+# ARGV: reservation_id, qty, available, now, expires_at, key_ttl
+# Returns {reserved (0/1), qty still free after this cart (string)}
+_RESERVE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[4])
+for _, id in ipairs(expired) do
+	redis.call('HDEL', KEYS[1], id)
+	redis.call('ZREM', KEYS[2], id)
+end
+
+local others = 0
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+	if entries[i] ~= ARGV[1] then
+		others = others + tonumber(entries[i + 1])
+	end
+end
+
+local qty = tonumber(ARGV[2])
+local free = tonumber(ARGV[3]) - others
+if qty <= 0 then
+	redis.call('HDEL', KEYS[1], ARGV[1])
+	redis.call('ZREM', KEYS[2], ARGV[1])
+	return {1, tostring(free)}
+end
+
+if qty > free then
+	return {0, tostring(free)}
+end
+
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[5], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+redis.call('EXPIRE', KEYS[2], ARGV[6])
+return {1, tostring(free - qty)}
+"""
+
+# KEYS: qty hash, expiry zset
+# ARGV: reservation_id to exclude, now
+# Returns the live reserved qty of every other cart (string)
+_RESERVED_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[2])
+for _, id in ipairs(expired) do
+	redis.call('HDEL', KEYS[1], id)
+	redis.call('ZREM', KEYS[2], id)
+end
+
+local total = 0
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+	if entries[i] ~= ARGV[1] then
+		total = total + tonumber(entries[i + 1])
+	end
+end
+return tostring(total)
+"""
+
+
+def _pair_keys(item_code, warehouse):
+	base = raw_key(f"{KEY_PREFIX}:{item_code}{_SEPARATOR}{warehouse}")
+	return [f"{base}:qty", f"{base}:expiry"]
+
+
+def _cart_key(reservation_id):
+	return raw_key(f"{CART_KEY_PREFIX}:{reservation_id}")
+
+
+def _get_cart_pairs(cart_key):
+	"""Return the (item_code, warehouse) pairs a cart holds."""
+	# cart_key is already prefixed: RedisWrapper.smembers would prefix it again
+	pipe = frappe.cache().pipeline()
+	pipe.smembers(cart_key)
+	return {tuple(frappe.safe_decode(member).split(_SEPARATOR, 1)) for member in pipe.execute()[0]}
+
+
+def _now():
+	return now_datetime().timestamp()
+
+
+def is_enabled(pos_profile):
+	return bool(cint(get_pos_settings(pos_profile, "enable_stock_reservations")))
+
+
+def _get_ttl(pos_profile):
+	return cint(get_pos_settings(pos_profile, "stock_reservation_ttl")) or DEFAULT_TTL
+
+
+def get_reserved_by_others(pairs, reservation_id=None):
+	"""
+	Return live reserved quantities of other carts.
+
+	Args:
+		pairs (iterable): (item_code, warehouse) tuples
+		reservation_id (str): The caller's cart, excluded from the totals
+
+	Returns:
+		dict: {(item_code, warehouse): reserved qty}
+	"""
+	pairs = list(pairs)
+	if not pairs:
+		return {}
+
+	cache = frappe.cache()
+	script = cache.register_script(_RESERVED_SCRIPT)
+	pipe = cache.pipeline()
+	now = _now()
+	for item_code, warehouse in pairs:
+		script(keys=_pair_keys(item_code, warehouse), args=[reservation_id or "", now], client=pipe)
+
+	return {
+		pair: flt(frappe.safe_decode(total))
+		for pair, total in zip(pairs, pipe.execute())
+	}
+
+
+@frappe.whitelist()
+def sync_cart_reservation(reservation_id, pos_profile, items):
+	"""
+	Reserve a cart's quantities, replacing the cart's previous reservation.
+
+	Args:
+		reservation_id (str): Cart identifier generated by the terminal
+		pos_profile (str): POS Profile name
+		items (list|str): Cart lines [{item_code, warehouse, stock_qty}] (lines of
+			the same item and warehouse are summed)
+
+	Returns:
+		dict: {
+			"enabled": whether reservations are on for the profile,
+			"shortages": [{item_code, warehouse, requested_qty, available_qty}]
+				for lines other carts leave too little stock for (their
+				previous reservation is kept),
+		}
+	"""
+	if not reservation_id:
+		frappe.throw(_("Reservation ID is required"))
+
+	if not is_enabled(pos_profile):
+		return {"enabled": False, "shortages": []}
+
+	if isinstance(items, str):
+		items = json.loads(items)
+
+	requested = {}
+	for item in items or []:
+		item_code = item.get("item_code")
+		warehouse = item.get("warehouse")
+		if item_code and warehouse:
+			key = (item_code, warehouse)
+			requested[key] = requested.get(key, 0) + flt(item.get("stock_qty"))
+
+	cache = frappe.cache()
+	cart_key = _cart_key(reservation_id)
+	previous = _get_cart_pairs(cart_key)
+	for pair in previous - set(requested):
+		requested[pair] = 0
+
+	from pos_next.api.invoices import _get_bin_stock_bulk
+
+	available = _get_bin_stock_bulk({pair for pair, qty in requested.items() if qty > 0})
+
+	ttl = _get_ttl(pos_profile)
+	now = _now()
+	script = cache.register_script(_RESERVE_SCRIPT)
+	pipe = cache.pipeline()
+	pairs = list(requested)
+	for item_code, warehouse in pairs:
+		script(
+			keys=_pair_keys(item_code, warehouse),
+			args=[
+				reservation_id,
+				requested[(item_code, warehouse)],
+				available.get((item_code, warehouse), 0),
+				now,
+				now + ttl,
+				ttl,
+			],
+			client=pipe,
+		)
+
+	shortages = []
+	held = []
+	for (item_code, warehouse), (reserved, free) in zip(pairs, pipe.execute()):
+		qty = requested[(item_code, warehouse)]
+		if not cint(reserved):
+			shortages.append(
+				{
+					"item_code": item_code,
+					"warehouse": warehouse,
+					"requested_qty": qty,
+					"available_qty": max(flt(frappe.safe_decode(free)), 0),
+				}
+			)
+			if (item_code, warehouse) in previous:
+				held.append((item_code, warehouse))
+		elif qty > 0:
+			held.append((item_code, warehouse))
+
+	pipe = cache.pipeline()
+	pipe.delete(cart_key)
+	if held:
+		pipe.sadd(cart_key, *[_SEPARATOR.join(pair) for pair in held])
+		pipe.expire(cart_key, ttl)
+	pipe.execute()
+
+	return {"enabled": True, "shortages": shortages}
+
+
+@frappe.whitelist()
+def release_cart_reservation(reservation_id):
+	"""Release everything a cart reserved."""
+	if not reservation_id:
+		return
+
+	cache = frappe.cache()
+	cart_key = _cart_key(reservation_id)
+	pairs = _get_cart_pairs(cart_key)
+
+	pipe = cache.pipeline()
+	for item_code, warehouse in pairs:
+		qty_key, expiry_key = _pair_keys(item_code, warehouse)
+		pipe.hdel(qty_key, reservation_id)
+		pipe.zrem(expiry_key, reservation_id)
+	pipe.delete(cart_key)
+	pipe.execute()
+
+
+def release_after_commit(reservation_id):
+	"""Release a submitted cart once its stock ledger entries are committed."""
+	if reservation_id:
+		frappe.db.after_commit.add(lambda: release_cart_reservation(reservation_id))
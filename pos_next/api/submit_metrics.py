@@ -0,0 +1,286 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Submit Metrics
+Latency and query counts of the invoice submit pipeline, per phase, and
+counters of failed submissions by the stage that failed.
+
+- ``start_trace`` opens a trace for one operation (update_invoice,
+  submit_invoice). ``trace.enter(phase)`` closes the running phase and opens
+  the next; ``measured`` times doc event hooks (validate_wallet_payment,
+  realtime emits, ...) as nested ``hook:<name>`` phases while a trace runs.
+  Queries are counted by wrapping ``frappe.db.sql`` for the trace's lifetime.
+- Each finished trace pushes one sample per phase (and the total) into a
+  capped Redis list of the last SAMPLE_SIZE samples; ``get_submit_metrics``
+  turns them into rolling percentiles.
+- With ``pos_next_slow_submit_ms`` in site config, a trace slower than that
+  is written as one line to the ``pos_next.submit`` log.
+- Every failed submit_invoice increments today's counter for its stage in a
+  Redis hash per day, kept for RETENTION_DAYS.
+"""
+
+import functools
+import json
+import math
+import time
+
+import frappe
+from frappe.utils import add_days, cint, flt, nowdate
+
+from pos_next.api.cache_utils import raw_key
+
+FAILURES_KEY_PREFIX = "pos_next:submit_failures"
+SAMPLES_KEY_PREFIX = "pos_next:submit_samples"
+PHASES_KEY = "pos_next:submit_phases"
+RETENTION_DAYS = 7
+SAMPLE_SIZE = 1000
+SAMPLES_TTL = RETENTION_DAYS * 24 * 60 * 60
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _failures_key(date):
+	return raw_key(f"{FAILURES_KEY_PREFIX}:{date}")
+
+
+def _samples_key(operation, phase):
+	return raw_key(f"{SAMPLES_KEY_PREFIX}:{operation}:{phase}")
+
+
+class SubmitTrace:
+	"""Timings and query counts of the phases of one operation."""
+
+	def __init__(self, operation):
+		self.operation = operation
+		self.phases = {}
+		self.queries = 0
+		self.started = time.perf_counter()
+		self._current = None
+		self._sql = None
+
+	def _install(self):
+		db = frappe.db
+		original = db.sql
+
+		@functools.wraps(original)
+		def counting_sql(*args, **kwargs):
+			self.queries += 1
+			return original(*args, **kwargs)
+
+		self._sql = original
+		db.sql = counting_sql
+
+	def _uninstall(self):
+		if self._sql is not None:
+			# Drop the instance attribute, exposing the Database method again
+			frappe.db.__dict__.pop("sql", None)
+			self._sql = None
+
+	def _add(self, phase, elapsed, queries):
+		totals = self.phases.setdefault(phase, [0.0, 0])
+		totals[0] += elapsed
+		totals[1] += queries
+
+	def _close_current(self):
+		if self._current:
+			phase, started, queries = self._current
+			self._add(phase, (time.perf_counter() - started) * 1000, self.queries - queries)
+			self._current = None
+
+	def enter(self, phase):
+		"""Close the running phase and start ``phase``; returns ``phase``."""
+		self._close_current()
+		self._current = (phase, time.perf_counter(), self.queries)
+		return phase
+
+	def measure(self, phase, fn, *args, **kwargs):
+		"""Run ``fn`` as a nested phase (its time also counts in the running phase)."""
+		started = time.perf_counter()
+		queries = self.queries
+		try:
+			return fn(*args, **kwargs)
+		finally:
+			self._add(phase, (time.perf_counter() - started) * 1000, self.queries - queries)
+
+	def finish(self, reference=None, failed=False):
+		"""Stop the trace, store its samples and log it when slow."""
+		self._close_current()
+		self._uninstall()
+		if getattr(frappe.local, "pos_next_submit_trace", None) is self:
+			frappe.local.pos_next_submit_trace = None
+
+		total = (time.perf_counter() - self.started) * 1000
+		self._add("total", total, self.queries)
+		try:
+			_store_samples(self.operation, self.phases)
+			_log_if_slow(self, total, reference, failed)
+		except Exception:
+			# Metrics must never fail or replace the operation's result
+			pass
+
+
+class _NullTrace:
+	"""Stand-in while another trace runs (e.g. update_invoice inside submit_invoice)."""
+
+	def enter(self, phase):
+		return phase
+
+	def measure(self, phase, fn, *args, **kwargs):
+		return fn(*args, **kwargs)
+
+	def finish(self, reference=None, failed=False):
+		pass
+
+
+def start_trace(operation):
+	"""Start tracing ``operation``; call ``finish()`` on the result when done."""
+	if getattr(frappe.local, "pos_next_submit_trace", None):
+		return _NullTrace()
+
+	trace = SubmitTrace(operation)
+	try:
+		trace._install()
+	except Exception:
+		pass
+	frappe.local.pos_next_submit_trace = trace
+	return trace
+
+
+def measured(phase):
+	"""Decorator: time a doc event hook as ``hook:<phase>`` of the running trace."""
+
+	def decorator(fn):
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+			trace = getattr(frappe.local, "pos_next_submit_trace", None)
+			if not trace:
+				return fn(*args, **kwargs)
+			return trace.measure(f"hook:{phase}", fn, *args, **kwargs)
+
+		return wrapper
+
+	return decorator
+
+
+def _store_samples(operation, phases):
+	cache = frappe.cache()
+	pipe = cache.pipeline()
+	phases_key = raw_key(PHASES_KEY)
+	for phase, (elapsed, queries) in phases.items():
+		key = _samples_key(operation, phase)
+		pipe.lpush(key, f"{elapsed:.2f}:{queries}")
+		pipe.ltrim(key, 0, SAMPLE_SIZE - 1)
+		pipe.expire(key, SAMPLES_TTL)
+		pipe.sadd(phases_key, f"{operation}:{phase}")
+	pipe.expire(phases_key, SAMPLES_TTL)
+	pipe.execute()
+
+
+def _log_if_slow(trace, total, reference, failed):
+	threshold = flt(frappe.conf.get("pos_next_slow_submit_ms"))
+	if not threshold or total < threshold:
+		return
+
+	frappe.logger("pos_next.submit").warning(
+		json.dumps(
+			{
+				"operation": trace.operation,
+				"reference": reference,
+				"failed": failed,
+				"total_ms": round(total, 1),
+				"queries": trace.queries,
+				"phases": {
+					phase: {"ms": round(elapsed, 1), "queries": queries}
+					for phase, (elapsed, queries) in trace.phases.items()
+				},
+			},
+			default=str,
+		)
+	)
+
+
+def _percentile(values, percentile):
+	index = max(math.ceil(percentile / 100 * len(values)) - 1, 0)
+	return values[index]
+
+
+@frappe.whitelist()
+def get_submit_metrics(days=RETENTION_DAYS):
+	"""
+	Return rolling latency percentiles per phase and failures per stage.
+
+	Args:
+		days (int): Days of failure counts to include
+
+	Returns:
+		dict: {
+			"phases": {"<operation>:<phase>": {samples, p50, p90, p95, p99, max,
+				avg_ms, avg_queries}} over the last SAMPLE_SIZE samples (ms),
+			"failures": {date: {stage: count}},
+		}
+	"""
+	frappe.only_for("System Manager")
+
+	cache = frappe.cache()
+	names = sorted(frappe.safe_decode(name) for name in cache.smembers(PHASES_KEY))
+
+	pipe = cache.pipeline()
+	for name in names:
+		operation, _sep, phase = name.partition(":")
+		pipe.lrange(_samples_key(operation, phase), 0, -1)
+
+	phases = {}
+	for name, samples in zip(names, pipe.execute()):
+		if not samples:
+			continue
+
+		durations = []
+		queries = []
+		for sample in samples:
+			elapsed, _sep, count = frappe.safe_decode(sample).partition(":")
+			durations.append(flt(elapsed))
+			queries.append(cint(count))
+		durations.sort()
+
+		stats = {"samples": len(durations)}
+		for percentile in PERCENTILES:
+			stats[f"p{percentile}"] = round(_percentile(durations, percentile), 1)
+		stats["max"] = round(durations[-1], 1)
+		stats["avg_ms"] = round(sum(durations) / len(durations), 1)
+		stats["avg_queries"] = round(sum(queries) / len(queries), 1)
+		phases[name] = stats
+
+	return {"phases": phases, "failures": get_failure_counts(days)}
+
+
+def record_failure(stage):
+	"""Count a failed submission at ``stage``."""
+	try:
+		key = _failures_key(nowdate())
+		pipe = frappe.cache().pipeline()
+		pipe.hincrby(key, stage, 1)
+		pipe.expire(key, RETENTION_DAYS * 24 * 60 * 60)
+		pipe.execute()
+	except Exception:
+		# Metrics must never replace the submit error
+		pass
+
+
+def get_failure_counts(days=RETENTION_DAYS):
+	"""
+	Return failed submissions per stage for the last ``days`` days.
+
+	Returns:
+		dict: {date: {stage: count}}, oldest first, days without failures included
+	"""
+	today = nowdate()
+	dates = [add_days(today, -offset) for offset in reversed(range(cint(days) or 1))]
+
+	pipe = frappe.cache().pipeline()
+	for date in dates:
+		pipe.hgetall(_failures_key(date))
+
+	return {
+		str(date): {frappe.safe_decode(stage): cint(count) for stage, count in counts.items()}
+		for date, counts in zip(dates, pipe.execute())
+	}
@@ -3,10 +3,11 @@
 # For license information, please see license.txt
 
 from __future__ import unicode_literals
+import base64
 import frappe
 import json
 from frappe import _
-from frappe.utils import cint
+from pos_next.api import payment_modes
 
 
 @frappe.whitelist()
@@ -64,6 +65,45 @@ def _parse_list_parameter(value, param_name="parameter"):
 	return value
 
 
+def encode_cursor(values):
+	"""
+	Encode the sort-key values of the last row of a page as an opaque cursor.
+
+	Args:
+		values: List of sort-key values (e.g. [item_name, name])
+
+	Returns:
+		str: URL-safe cursor string
+	"""
+	payload = json.dumps([str(v) if v is not None else None for v in values])
+	return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, size):
+	"""
+	Decode a cursor produced by encode_cursor.
+
+	Args:
+		cursor: Cursor string (empty = first page)
+		size: Expected number of sort-key values
+
+	Returns:
+		list: Sort-key values, or None for the first page
+	"""
+	if not cursor:
+		return None
+
+	try:
+		values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+	except Exception:
+		values = None
+
+	if not isinstance(values, list) or len(values) != size:
+		frappe.throw(_("Invalid pagination cursor"))
+
+	return values
+
+
 def check_user_company():
 	"""Check if the authenticated user has a company linked to them."""
 	user = frappe.session.user
@@ -89,11 +129,7 @@ def get_wallet_payment_modes():
 	Returns:
 		list: List of Mode of Payment names with is_wallet_payment=1
 	"""
-	return frappe.get_all(
-		"Mode of Payment",
-		filters={"is_wallet_payment": 1},
-		pluck="name"
-	)
+	return payment_modes.get_wallet_payment_modes()
 
 
 def is_wallet_payment_mode(mode_of_payment):
@@ -106,7 +142,4 @@ def is_wallet_payment_mode(mode_of_payment):
 	Returns:
 		bool: True if the mode is a wallet payment
 	"""
-	if not mode_of_payment:
-		return False
-
-	return cint(frappe.get_cached_value("Mode of Payment", mode_of_payment, "is_wallet_payment"))
+	return payment_modes.is_wallet_payment(mode_of_payment)
@@ -10,7 +10,11 @@ import frappe
 from frappe import _
 from frappe.utils import flt, cint
 
+from pos_next.api import payment_modes, pos_config
+from pos_next.api.submit_metrics import measured
 
+
+@measured("validate_wallet_payment")
 def validate_wallet_payment(doc, method=None):
 	"""
 	Validate wallet payment on Sales Invoice.
@@ -38,10 +42,11 @@ def validate_wallet_payment(doc, method=None):
 		)
 
 
+@measured("process_loyalty_to_wallet")
 def process_loyalty_to_wallet(doc, method=None):
 	"""
-	Convert earned loyalty points to wallet balance after invoice submission.
-	Called during on_submit hook.
+	Queue the conversion of earned loyalty points to wallet balance.
+	Called during on_submit hook; the conversion runs as a post-submit task.
 	"""
 	if not doc.is_pos or doc.is_return:
 		return
@@ -54,6 +59,21 @@ def process_loyalty_to_wallet(doc, method=None):
 	if not cint(pos_settings.get("enable_loyalty_program")) or not cint(pos_settings.get("loyalty_to_wallet")):
 		return
 
+	from pos_next.api import post_submit
+
+	post_submit.enqueue_task(doc.name, post_submit.TASK_LOYALTY_TO_WALLET)
+
+
+def convert_loyalty_to_wallet(sales_invoice, payload=None):
+	"""
+	Post-submit task: convert the loyalty points an invoice earned to wallet balance.
+	Errors propagate, so the task is retried.
+	"""
+	doc = frappe.get_doc("Sales Invoice", sales_invoice)
+	pos_settings = get_pos_settings(doc.pos_profile)
+	if not pos_settings:
+		return
+
 	# Check if customer has loyalty program
 	loyalty_program = frappe.db.get_value("Customer", doc.customer, "loyalty_program")
 	if not loyalty_program:
@@ -83,44 +103,40 @@ def process_loyalty_to_wallet(doc, method=None):
 	if credit_amount <= 0:
 		return
 
-	try:
-		# Get or create customer wallet
-		wallet = get_or_create_wallet(doc.customer, doc.company, pos_settings)
+	# Already converted (e.g. the task is run again by hand)
+	if frappe.db.exists(
+		"Wallet Transaction",
+		{
+			"reference_doctype": "Sales Invoice",
+			"reference_name": doc.name,
+			"source_type": "Loyalty Program",
+			"docstatus": ["!=", 2],
+		},
+	):
+		return
 
-		if not wallet:
-			return
-
-		# Create wallet transaction
-		from pos_next.pos_next.doctype.wallet_transaction.wallet_transaction import create_wallet_credit
-
-		transaction = create_wallet_credit(
-			wallet=wallet.name,
-			amount=credit_amount,
-			source_type="Loyalty Program",
-			remarks=_("Loyalty points conversion from {0}: {1} points = {2}").format(
-				doc.name,
-				loyalty_entry.loyalty_points,
-				frappe.format_value(credit_amount, {"fieldtype": "Currency"})
-			),
-			reference_doctype="Sales Invoice",
-			reference_name=doc.name,
-			submit=True
-		)
+	# Get or create customer wallet
+	wallet = get_or_create_wallet(doc.customer, doc.company, pos_settings)
 
-		frappe.msgprint(
-			_("Loyalty points converted to wallet: {0} points = {1}").format(
-				loyalty_entry.loyalty_points,
-				frappe.format_value(credit_amount, {"fieldtype": "Currency"})
-			),
-			alert=True,
-			indicator="green"
-		)
+	if not wallet:
+		return
 
-	except Exception as e:
-		frappe.log_error(
-			title="Loyalty to Wallet Conversion Error",
-			message=f"Invoice: {doc.name}, Error: {str(e)}\n{frappe.get_traceback()}"
-		)
+	# Create wallet transaction
+	from pos_next.pos_next.doctype.wallet_transaction.wallet_transaction import create_wallet_credit
+
+	create_wallet_credit(
+		wallet=wallet.name,
+		amount=credit_amount,
+		source_type="Loyalty Program",
+		remarks=_("Loyalty points conversion from {0}: {1} points = {2}").format(
+			doc.name,
+			loyalty_entry.loyalty_points,
+			frappe.format_value(credit_amount, {"fieldtype": "Currency"})
+		),
+		reference_doctype="Sales Invoice",
+		reference_name=doc.name,
+		submit=True
+	)
 
 
 def get_wallet_amount_from_payments(payments):
@@ -133,13 +149,7 @@ def get_wallet_amount_from_payments(payments):
 		if not payment.mode_of_payment:
 			continue
 
-		is_wallet = frappe.db.get_value(
-			"Mode of Payment",
-			payment.mode_of_payment,
-			"is_wallet_payment"
-		)
-
-		if is_wallet:
+		if payment_modes.is_wallet_payment(payment.mode_of_payment):
 			wallet_amount += flt(payment.amount)
 
 	return wallet_amount
@@ -226,10 +236,7 @@ def get_pending_wallet_payments(customer, exclude_invoice=None):
 		)
 
 		for payment in payments:
-			is_wallet = frappe.db.get_value(
-				"Mode of Payment", payment.mode_of_payment, "is_wallet_payment"
-			)
-			if is_wallet:
+			if payment_modes.is_wallet_payment(payment.mode_of_payment):
 				pending_amount += flt(payment.amount)
 
 	return pending_amount
@@ -339,9 +346,8 @@ def get_pos_settings(pos_profile):
 	if not pos_profile:
 		return None
 
-	return frappe.db.get_value(
-		"POS Settings",
-		{"pos_profile": pos_profile},
+	return pos_config.get_pos_settings(
+		pos_profile,
 		[
 			"enable_loyalty_program",
 			"default_loyalty_program",
@@ -349,7 +355,6 @@ def get_pos_settings(pos_profile):
 			"auto_create_wallet",
 			"loyalty_to_wallet"
 		],
-		as_dict=True
 	)
 
 
@@ -364,12 +369,7 @@ def get_wallet_payment_methods(pos_profile):
 
 	wallet_methods = []
 	for method in payment_methods:
-		is_wallet = frappe.db.get_value(
-			"Mode of Payment",
-			method.mode_of_payment,
-			"is_wallet_payment"
-		)
-		if is_wallet:
+		if payment_modes.is_wallet_payment(method.mode_of_payment):
 			wallet_methods.append({
 				"mode_of_payment": method.mode_of_payment,
 				"default": method.default,
@@ -0,0 +1,124 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+"""
+Warehouse Tree
+Cached warehouse hierarchy for expanding group warehouses to leaf warehouses.
+
+Stock helpers used to call ``frappe.db.get_value("Warehouse", ..., "is_group")``
+and ``frappe.db.get_descendants`` on every request. The nested-set snapshot
+(name, lft, rgt, is_group of every warehouse) is now kept in Redis, and each
+process keeps the decoded tree plus a small LRU of resolved expansions. A
+version counter in Redis, bumped by Warehouse doc events, tells processes when
+their copy is stale, so resolving warehouses needs no database queries.
+"""
+
+from bisect import bisect_right
+from collections import OrderedDict
+
+import frappe
+
+from pos_next.api.cache_utils import bump_counter, get_counter, invalidate_after_commit
+
+SNAPSHOT_KEY = "pos_next:warehouse_tree"
+VERSION_KEY = "pos_next:warehouse_tree_version"
+LRU_SIZE = 256
+
+# {site: {"version": int, "tree": dict, "expanded": OrderedDict}}
+_process_cache = {}
+
+
+def _build_snapshot():
+	"""Load the hierarchy ordered by lft (one query, only on cache misses)."""
+	rows = frappe.db.sql(
+		"""
+		SELECT name, lft, rgt, is_group
+		FROM `tabWarehouse`
+		ORDER BY lft
+		""",
+		as_dict=1,
+	)
+	return {
+		"names": [row.name for row in rows],
+		"lfts": [row.lft or 0 for row in rows],
+		"nodes": {row.name: (row.lft or 0, row.rgt or 0, row.is_group) for row in rows},
+	}
+
+
+def _get_state():
+	"""Return this process's copy of the tree, refreshed when the version moved."""
+	version = get_counter(VERSION_KEY)
+	site = frappe.local.site
+	state = _process_cache.get(site)
+	if state and state["version"] == version:
+		return state
+
+	tree = frappe.cache().get_value(SNAPSHOT_KEY)
+	if not tree:
+		tree = _build_snapshot()
+		frappe.cache().set_value(SNAPSHOT_KEY, tree)
+
+	state = {"version": version, "tree": tree, "expanded": OrderedDict()}
+	_process_cache[site] = state
+	return state
+
+
+def is_group_warehouse(warehouse):
+	"""Return True when the warehouse is a group node."""
+	node = _get_state()["tree"]["nodes"].get(warehouse)
+	return bool(node and node[2])
+
+
+def get_leaf_warehouses(warehouse):
+	"""
+	Resolve a warehouse to the leaf warehouses that hold its stock.
+
+	Args:
+		warehouse (str): Warehouse name (group or leaf)
+
+	Returns:
+		list: [warehouse] for leaf (or unknown) warehouses; the leaf descendants
+			of a group warehouse, falling back to [warehouse] if it has none
+	"""
+	if not warehouse:
+		return []
+
+	state = _get_state()
+	expanded = state["expanded"]
+	if warehouse in expanded:
+		expanded.move_to_end(warehouse)
+		return list(expanded[warehouse])
+
+	tree = state["tree"]
+	node = tree["nodes"].get(warehouse)
+	leaves = [warehouse]
+	if node and node[2]:
+		lft, rgt, _is_group = node
+		names, lfts = tree["names"], tree["lfts"]
+		descendants = names[bisect_right(lfts, lft) : bisect_right(lfts, rgt)]
+		leaves = [name for name in descendants if not tree["nodes"][name][2]] or [warehouse]
+
+	expanded[warehouse] = tuple(leaves)
+	if len(expanded) > LRU_SIZE:
+		expanded.popitem(last=False)
+
+	return list(leaves)
+
+
+def invalidate():
+	"""Drop the shared snapshot and tell every process to reload it."""
+	frappe.cache().delete_value(SNAPSHOT_KEY)
+	bump_counter(VERSION_KEY)
+
+
+# ==========================================
+# Doc Events
+# ==========================================
+
+
+def on_warehouse_change(doc, method=None, *args):
+	"""Warehouse on_update / after_rename / on_trash hook."""
+	try:
+		invalidate_after_commit(invalidate)
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Warehouse Tree Cache Error")
@@ -97,6 +97,7 @@ fixtures = [
 				[
 					"Sales Invoice-posa_pos_opening_shift",
 					"Sales Invoice-posa_is_printed",
+					"Sales Invoice-posa_offline_id",
 					"Item-custom_company",
 					"POS Profile-posa_cash_mode_of_payment",
 					"POS Profile-posa_allow_delete",
@@ -188,12 +189,44 @@ override_doctype_class = {
 
 doc_events = {
 	"Item": {
-		"validate": "pos_next.validations.validate_item"
+		"validate": "pos_next.validations.validate_item",
+		"on_update": [
+			"pos_next.api.item_search.on_item_update",
+			"pos_next.api.catalog_cache.on_item_update",
+			"pos_next.api.barcode_map.on_item_update"
+		],
+		"after_rename": [
+			"pos_next.api.item_search.on_item_update",
+			"pos_next.api.catalog_cache.on_item_structure_change",
+			"pos_next.api.barcode_map.on_item_rename"
+		],
+		"on_trash": [
+			"pos_next.api.item_search.on_item_trash",
+			"pos_next.api.catalog_cache.on_item_structure_change",
+			"pos_next.api.barcode_map.on_item_trash"
+		]
+	},
+	"Warehouse": {
+		"on_update": "pos_next.api.warehouse_tree.on_warehouse_change",
+		"after_rename": "pos_next.api.warehouse_tree.on_warehouse_change",
+		"on_trash": "pos_next.api.warehouse_tree.on_warehouse_change"
+	},
+	"Stock Ledger Entry": {
+		"on_submit": "pos_next.api.bundle_availability.on_stock_ledger_entry"
+	},
+	"Product Bundle": {
+		"on_update": "pos_next.api.bundle_availability.on_product_bundle_update",
+		"on_trash": "pos_next.api.bundle_availability.on_product_bundle_trash"
+	},
+	"Item Price": {
+		"on_update": "pos_next.api.catalog_cache.on_item_price_change",
+		"on_trash": "pos_next.api.catalog_cache.on_item_price_change"
 	},
 	"Customer": {
 		"after_insert": "pos_next.api.customers.auto_assign_loyalty_program"
 	},
 	"Sales Invoice": {
+		"before_validate": "pos_next.api.sales_invoice_hooks.before_validate",
 		"validate": [
 			"pos_next.api.sales_invoice_hooks.validate",
 			"pos_next.api.wallet.validate_wallet_payment"
@@ -207,7 +240,30 @@ doc_events = {
 		"after_insert": "pos_next.realtime_events.emit_invoice_created_event"
 	},
 	"POS Profile": {
-		"on_update": "pos_next.realtime_events.emit_pos_profile_updated_event"
+		"on_update": [
+			"pos_next.realtime_events.emit_pos_profile_updated_event",
+			"pos_next.api.pos_config.on_config_change",
+			"pos_next.api.payment_modes.on_payment_config_change"
+		],
+		"after_rename": [
+			"pos_next.api.pos_config.on_config_change",
+			"pos_next.api.payment_modes.on_payment_config_change"
+		],
+		"on_trash": [
+			"pos_next.api.pos_config.on_config_change",
+			"pos_next.api.payment_modes.on_payment_config_change"
+		]
+	},
+	"Stock Settings": {
+		"on_update": "pos_next.api.pos_config.on_config_change"
+	},
+	"Mode of Payment": {
+		"on_update": "pos_next.api.payment_modes.on_payment_config_change",
+		"after_rename": "pos_next.api.payment_modes.on_payment_config_change",
+		"on_trash": "pos_next.api.payment_modes.on_payment_config_change"
+	},
+	"Company": {
+		"on_update": "pos_next.api.payment_modes.on_payment_config_change"
 	}
 }
 
@@ -215,12 +271,20 @@ doc_events = {
 # ---------------
 
 scheduler_events = {
+	"all": [
+		"pos_next.api.invoice_submissions.requeue_stale",
+		"pos_next.api.post_submit.requeue_due",
+		"pos_next.api.bundle_availability.requeue_dirty",
+	],
 	"hourly": [
 		"pos_next.tasks.branding_monitor.monitor_branding_integrity",
+		"pos_next.api.bundle_availability.refresh_all",
 	],
 	"daily": [
 		"pos_next.tasks.cleanup_expired_promotions.cleanup_expired_promotions",
 		"pos_next.tasks.branding_monitor.validate_all_active_sessions",
+		"pos_next.api.invoice_submissions.delete_old_submissions",
+		"pos_next.api.post_submit.delete_old_tasks",
 	],
 	"monthly": [
 		"pos_next.tasks.branding_monitor.reset_tampering_counter",
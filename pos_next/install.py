@@ -33,6 +33,7 @@ def after_migrate():
 		install_fixtures(quiet=True)
 		setup_default_print_format(quiet=True)
 		frappe.db.commit()
+		ensure_item_search_index()
 		log_message("POS Next: Fixtures updated successfully", level="success")
 	except Exception as e:
 		frappe.db.rollback()
@@ -253,6 +254,23 @@ def setup_default_print_format(quiet=False):
 		)
 
 
+def ensure_item_search_index():
+	"""
+	Queue the initial build of the POS item search index when it is empty.
+	Failures are logged only; search falls back to LIKE scans until built.
+	"""
+	try:
+		from pos_next.api.item_search import ensure_index
+
+		ensure_index()
+	except Exception as e:
+		log_message(f"Error queueing item search index build: {str(e)}", level="error")
+		frappe.log_error(
+			title="Item Search Index Setup Error",
+			message=frappe.get_traceback()
+		)
+
+
 def log_message(message, level="info", indent=0):
 	"""
 	Standardized logging function with consistent formatting
@@ -12,6 +12,8 @@ from frappe.utils import cint, flt
 from erpnext.accounts.doctype.sales_invoice.sales_invoice import SalesInvoice
 from erpnext.accounts.utils import get_account_currency
 
+from pos_next.api import payment_modes
+
 
 class CustomSalesInvoice(SalesInvoice):
 	"""
@@ -101,12 +103,8 @@ class CustomSalesInvoice(SalesInvoice):
 		returns Customer as party_type and the invoice customer as party.
 		For regular payments, returns empty strings.
 		"""
-		is_wallet_mode_of_payment = frappe.db.get_value(
-			"Mode of Payment", mode_of_payment, "is_wallet_payment"
-		)
-
 		party_type, party = "", ""
-		if is_wallet_mode_of_payment:
+		if payment_modes.is_wallet_payment(mode_of_payment):
 			party_type, party = "Customer", self.customer
 
 		return party_type, party
@@ -0,0 +1,14 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class POSBundleAvailability(Document):
+	pass
+
+
+def on_doctype_update():
+	# Reads are always "these bundles at this warehouse"
+	frappe.db.add_index("POS Bundle Availability", ["warehouse", "bundle_item"])
@@ -5,8 +5,8 @@ from __future__ import unicode_literals
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import strip, flt
-from frappe.utils import getdate, today
+from frappe.utils import strip, flt, cint
+from frappe.utils import getdate, now, today
 
 
 class POSCoupon(Document):
@@ -157,30 +157,53 @@ def apply_coupon_discount(coupon, cart_total, net_total=None):
     }
 
 
+def coupon_has_uses_left(coupon_code):
+    """Return False for a disabled or fully redeemed coupon (True when it does not exist)."""
+    coupon = frappe.db.get_value(
+        "POS Coupon",
+        {"coupon_code": coupon_code.upper()},
+        ["disabled", "used", "maximum_use"],
+        as_dict=True,
+    )
+    if not coupon:
+        return True
+
+    if cint(coupon.disabled):
+        return False
+    return not cint(coupon.maximum_use) or cint(coupon.used) < cint(coupon.maximum_use)
+
+
 def increment_coupon_usage(coupon_code):
-    """Increment the usage counter for a coupon"""
-    try:
-        coupon = frappe.get_doc("POS Coupon", {"coupon_code": coupon_code.upper()})
-        coupon.used = (coupon.used or 0) + 1
-        coupon.db_set('used', coupon.used)
-        frappe.db.commit()
-    except Exception as e:
-        frappe.log_error(
-            title="Coupon Usage Increment Failed",
-            message=f"Failed to increment usage for coupon {coupon_code}: {str(e)}"
-        )
+    """Take one use of a coupon, inside the caller's transaction.
+
+    A single conditional UPDATE validates and redeems: two concurrent
+    redemptions of the last use cannot both succeed, and rolling back the
+    caller's transaction (e.g. a failed invoice submit) gives the use back.
+
+    Returns:
+        bool: True when a use was taken, False when the coupon is fully
+        redeemed, disabled or does not exist
+    """
+    frappe.db.sql(
+        """
+        UPDATE `tabPOS Coupon`
+        SET used = IFNULL(used, 0) + 1, modified = %s, modified_by = %s
+        WHERE coupon_code = %s
+            AND IFNULL(disabled, 0) = 0
+            AND (IFNULL(maximum_use, 0) = 0 OR IFNULL(used, 0) < maximum_use)
+        """,
+        (now(), frappe.session.user, coupon_code.upper()),
+    )
+    return bool(frappe.db.sql("SELECT ROW_COUNT()")[0][0])
 
 
 def decrement_coupon_usage(coupon_code):
-    """Decrement the usage counter for a coupon (for cancelled invoices)"""
-    try:
-        coupon = frappe.get_doc("POS Coupon", {"coupon_code": coupon_code.upper()})
-        if coupon.used and coupon.used > 0:
-            coupon.used = coupon.used - 1
-            coupon.db_set('used', coupon.used)
-            frappe.db.commit()
-    except Exception as e:
-        frappe.log_error(
-            title="Coupon Usage Decrement Failed",
-            message=f"Failed to decrement usage for coupon {coupon_code}: {str(e)}"
-        )
+    """Give back one use of a coupon (for cancelled invoices), inside the caller's transaction."""
+    frappe.db.sql(
+        """
+        UPDATE `tabPOS Coupon`
+        SET used = used - 1, modified = %s, modified_by = %s
+        WHERE coupon_code = %s AND used > 0
+        """,
+        (now(), frappe.session.user, coupon_code.upper()),
+    )
@@ -1,9 +1,80 @@
 # Copyright (c) 2021, Youssef Restom and Contributors
 # See license.txt
 
-# import frappe
-import unittest
+import frappe
+from frappe.tests.utils import FrappeTestCase
 
+from pos_next.api.invoices import submit_invoice
+from pos_next.pos_next.doctype.pos_coupon.pos_coupon import (
+    coupon_has_uses_left,
+    increment_coupon_usage,
+)
+from pos_next.tests.test_invoices import (
+    COMPANY,
+    get_invoices_for_offline_id,
+    make_invoice_payload,
+    make_test_fixtures,
+)
 
-class TestPOSCoupon(unittest.TestCase):
-    pass
+
+def make_coupon(maximum_use=1, used=0):
+    coupon_code = frappe.generate_hash(length=10).upper()
+    coupon = frappe.get_doc({
+        "doctype": "POS Coupon",
+        "coupon_name": f"_Test POS Coupon {coupon_code}",
+        "coupon_code": coupon_code,
+        "coupon_type": "Promotional",
+        "company": COMPANY,
+        "discount_type": "Percentage",
+        "discount_percentage": 10,
+        "apply_on": "Grand Total",
+        "maximum_use": maximum_use,
+    }).insert()
+    if used:
+        frappe.db.set_value("POS Coupon", coupon.name, "used", used)
+    return coupon
+
+
+class TestPOSCoupon(FrappeTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        make_test_fixtures()
+
+    def test_increment_stops_at_maximum_use(self):
+        coupon = make_coupon(maximum_use=2)
+
+        self.assertTrue(increment_coupon_usage(coupon.coupon_code))
+        self.assertTrue(coupon_has_uses_left(coupon.coupon_code))
+        self.assertTrue(increment_coupon_usage(coupon.coupon_code))
+        self.assertFalse(increment_coupon_usage(coupon.coupon_code))
+        self.assertFalse(coupon_has_uses_left(coupon.coupon_code))
+        self.assertEqual(frappe.db.get_value("POS Coupon", coupon.name, "used"), 2)
+
+    def test_live_sale_with_exhausted_coupon_is_refused(self):
+        coupon = make_coupon(maximum_use=1, used=1)
+
+        self.assertRaises(
+            frappe.ValidationError,
+            submit_invoice,
+            invoice=make_invoice_payload(),
+            data={"coupon_code": coupon.coupon_code},
+        )
+
+    def test_offline_sale_with_exhausted_coupon_is_logged(self):
+        coupon = make_coupon(maximum_use=1, used=1)
+        offline_id = frappe.generate_hash(length=20)
+
+        result = submit_invoice(
+            invoice=make_invoice_payload(offline_id=offline_id),
+            data={"coupon_code": coupon.coupon_code},
+        )
+
+        self.assertEqual(get_invoices_for_offline_id(offline_id), [{"name": result["name"], "docstatus": 1}])
+        self.assertEqual(frappe.db.get_value("POS Coupon", coupon.name, "used"), 1)
+        self.assertTrue(
+            frappe.db.exists(
+                "Error Log",
+                {"method": "POS Coupon Over-Redemption", "error": ["like", f"%{offline_id}%"]},
+            )
+        )
@@ -0,0 +1,14 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class POSInvoiceSubmission(Document):
+	pass
+
+
+def on_doctype_update():
+	# The submission job takes a shift's pending invoices oldest first
+	frappe.db.add_index("POS Invoice Submission", ["pos_opening_shift", "status", "creation"])
@@ -0,0 +1,15 @@
+# Copyright (c) 2026, BrainWise and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class POSPostSubmitTask(Document):
+	pass
+
+
+def on_doctype_update():
+	# Jobs take an invoice's pending tasks in creation order
+	frappe.db.add_index("POS Post Submit Task", ["sales_invoice", "status", "creation"])
+	frappe.db.add_index("POS Post Submit Task", ["status", "next_attempt"])
@@ -5,6 +5,8 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import cint, flt
 
+from pos_next.api import pos_config
+
 
 class POSSettings(Document):
 	def validate(self):
@@ -23,6 +25,11 @@ class POSSettings(Document):
 	def on_update(self):
 		"""Sync allow_negative_stock with Stock Settings"""
 		self.sync_negative_stock_setting()
+		pos_config.invalidate_after_commit()
+
+	def on_trash(self):
+		"""Drop cached POS configuration"""
+		pos_config.invalidate_after_commit()
 
 	def sync_negative_stock_setting(self):
 		"""
@@ -7,6 +7,8 @@ from frappe.model.document import Document
 from frappe.utils import flt
 from erpnext.accounts.utils import get_balance_on
 
+from pos_next.api import payment_modes
+
 
 class Wallet(Document):
 	def validate(self):
@@ -165,10 +167,7 @@ def get_pending_wallet_payments(customer, exclude_invoice=None):
 		)
 
 		for payment in payments:
-			is_wallet = frappe.db.get_value(
-				"Mode of Payment", payment.mode_of_payment, "is_wallet_payment"
-			)
-			if is_wallet:
+			if payment_modes.is_wallet_payment(payment.mode_of_payment):
 				pending_amount += flt(payment.amount)
 
 	return pending_amount
@@ -7,18 +7,62 @@ Real-time event handlers for POS MZ.
 Emits Socket.IO events when stock-affecting transactions occur.
 """
 
+from collections import defaultdict
+
 import frappe
 from frappe import _
 
-from pos_next.api.items import get_stock_quantities
+from pos_next.api import stock_events
+from pos_next.api.cache_utils import raw_key
+from pos_next.api.pos_config import get_pos_settings
+from pos_next.api.submit_metrics import measured
+
+# Changed (item, warehouse) pairs waiting for the next broadcast window
+PENDING_STOCK_KEY = "pos_next:stock_update_pending"
+# Delta mode: warehouses with pending deltas, and a hash of item -> delta per warehouse
+PENDING_DELTA_WAREHOUSES_KEY = "pos_next:stock_update_delta_warehouses"
+PENDING_DELTA_KEY_PREFIX = "pos_next:stock_update_delta"
+DELTA_COUNT_KEY_PREFIX = "pos_next:stock_update_delta_count"
+# Every Nth delta event of a warehouse is sent as absolute quantities instead
+DELTA_CHECKPOINT_INTERVAL = 20
+# Held while a broadcast job is queued; whoever sets it queues the job. Changes
+# arriving before a worker picks the job up are published with it
+STOCK_WINDOW_KEY = "pos_next:stock_update_window"
+# Safety expiry so a lost job never blocks broadcasting
+STOCK_WINDOW_TTL = 60
+STOCK_EVENT_CHUNK_SIZE = 1000
+
+STOCK_MODE_ABSOLUTE = "Absolute"
+STOCK_MODE_DELTA = "Delta"
+
+_SEPARATOR = "\x1f"
+
+
+def _get_stock_event_mode(pos_profile):
+	if not pos_profile:
+		return STOCK_MODE_ABSOLUTE
+
+	return get_pos_settings(pos_profile, "realtime_stock_mode") or STOCK_MODE_ABSOLUTE
 
 
+@measured("emit_stock_update_event")
 def emit_stock_update_event(doc, method=None):
 	"""
-	Emit real-time stock update event when Sales Invoice is submitted.
-
-	This event notifies all connected POS terminals about stock changes,
-	allowing them to update their cached item quantities in real-time.
+	Queue a real-time stock update for a submitted or cancelled Sales Invoice.
+
+	Stock is not read here. After commit, the invoice's changes are added to
+	Redis, and a broadcast job queued once per window publishes each
+	warehouse's updates to its own room (``doc:Warehouse/<name>``). Terminals
+	join the room of their POS Profile warehouse, so a sale only reaches tills
+	that stock from that warehouse.
+
+	The POS Settings "Realtime Stock Mode" selects the payload:
+	- Absolute: the (item, warehouse) pairs are re-read from Bin with one
+	  query per window (Product Bundles computed from their components)
+	- Delta: signed stock_qty deltas taken from the invoice's items and packed
+	  items are summed per window and sent as-is; every
+	  DELTA_CHECKPOINT_INTERVAL-th event per warehouse is sent as absolute
+	  quantities to correct drift
 
 	Args:
 		doc: Sales Invoice document
@@ -32,8 +76,9 @@ def emit_stock_update_event(doc, method=None):
 		return
 
 	try:
-		# Collect unique item codes per warehouse to avoid redundant queries
-		item_codes_by_warehouse = {}
+		# Stock leaves the warehouse on submit (returns carry negative stock_qty)
+		sign = 1 if method == "on_cancel" else -1
+		deltas = defaultdict(float)
 		for item in doc.items:
 			item_code = getattr(item, "item_code", None)
 			warehouse = getattr(item, "warehouse", None)
@@ -48,58 +93,217 @@ def emit_stock_update_event(doc, method=None):
 			elif hasattr(item, "stock_qty") and not frappe.utils.flt(item.stock_qty):
 				continue
 
-			item_codes_by_warehouse.setdefault(warehouse, set()).add(item_code)
+			deltas[(item_code, warehouse)] += sign * frappe.utils.flt(
+				getattr(item, "stock_qty", None) or item.qty
+			)
 
-		if not item_codes_by_warehouse:
-			return
+		# Bundle components (bundles themselves are not stock items)
+		for packed in doc.get("packed_items") or []:
+			if packed.item_code and packed.warehouse:
+				deltas[(packed.item_code, packed.warehouse)] += sign * frappe.utils.flt(packed.qty)
 
-		# Build stock updates with current quantities
-		stock_updates = []
-		warehouses = set()
-		for warehouse, codes in item_codes_by_warehouse.items():
-			warehouses.add(warehouse)
-			# Use shared stock utility to keep logic consistent with API responses
-			warehouse_updates = get_stock_quantities(list(codes), warehouse)
-
-			# Ensure events always have numeric qty fields, even if API returns None
-			for update in warehouse_updates:
-				actual_qty = frappe.utils.flt(update.get("actual_qty"))
-				update["actual_qty"] = actual_qty
-				update["stock_qty"] = actual_qty if update.get("stock_qty") is None else update["stock_qty"]
-				update["warehouse"] = update.get("warehouse") or warehouse
-
-			stock_updates.extend(warehouse_updates)
-
-		if not stock_updates:
+		if not deltas:
 			return
 
-		# Prepare event data
-		event_data = {
-			"invoice_name": doc.name,
-			"warehouses": list(warehouses),
-			"stock_updates": stock_updates,
-			"timestamp": frappe.utils.now(),
-			"event_type": "cancel" if method == "on_cancel" else "submit"
-		}
-
-		# Emit event to all connected clients
-		# Event name: pos_stock_update
-		# Clients can subscribe to this event and filter by warehouse
-		frappe.publish_realtime(
-			event="pos_stock_update",
-			message=event_data,
-			user=None,  # Broadcast to all users
-			after_commit=True  # Only emit after successful DB commit
-		)
+		mode = _get_stock_event_mode(doc.get("pos_profile"))
+		# Only after a successful commit, so broadcasts never show rolled-back stock
+		if mode == STOCK_MODE_DELTA:
+			frappe.db.after_commit.add(lambda: _queue_stock_deltas(deltas))
+		else:
+			frappe.db.after_commit.add(lambda: _queue_stock_pairs(deltas.keys()))
 
 	except Exception as e:
 		# Log error but don't fail the transaction
 		frappe.log_error(
 			title=_("Real-time Stock Update Event Error"),
-			message=f"Failed to emit stock update event for {doc.name}: {str(e)}"
+			message=f"Failed to queue stock update event for {doc.name}: {str(e)}"
 		)
 
 
+def _queue_stock_pairs(pairs):
+	"""Add pairs to the pending set and open a broadcast window."""
+	try:
+		frappe.cache().sadd(
+			PENDING_STOCK_KEY,
+			*[f"{item_code}{_SEPARATOR}{warehouse}" for item_code, warehouse in pairs],
+		)
+		_open_stock_window()
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Real-time Stock Update Event Error")
+
+
+def _queue_stock_deltas(deltas):
+	"""Add signed deltas to the per-warehouse pending hashes and open a broadcast window."""
+	try:
+		pipe = frappe.cache().pipeline()
+		for (item_code, warehouse), delta in deltas.items():
+			pipe.hincrbyfloat(raw_key(f"{PENDING_DELTA_KEY_PREFIX}:{warehouse}"), item_code, delta)
+			pipe.sadd(raw_key(PENDING_DELTA_WAREHOUSES_KEY), warehouse)
+		pipe.execute()
+		_open_stock_window()
+	except Exception:
+		frappe.log_error(frappe.get_traceback(), "Real-time Stock Update Event Error")
+
+
+def _open_stock_window():
+	"""Schedule a broadcast job unless one is already scheduled."""
+	if frappe.cache().set(raw_key(STOCK_WINDOW_KEY), 1, nx=True, ex=STOCK_WINDOW_TTL):
+		frappe.enqueue(
+			"pos_next.realtime_events.broadcast_stock_updates",
+			queue="short",
+		)
+
+
+def broadcast_stock_updates():
+	"""
+	Background job: publish every stock change queued during the window.
+
+	Changes are only queued after their transaction commits, so the job never
+	waits for a commit; the window is the time the job spends in the queue.
+	It is closed before draining, so changes queued from then on open a new
+	window (and job) instead of being missed by this one.
+	"""
+	frappe.cache().delete(raw_key(STOCK_WINDOW_KEY))
+
+	while True:
+		pipe = frappe.cache().pipeline()
+		pipe.spop(raw_key(PENDING_STOCK_KEY), STOCK_EVENT_CHUNK_SIZE)
+		members = pipe.execute()[0]
+		if not members:
+			break
+
+		pairs_by_warehouse = defaultdict(set)
+		for member in members:
+			item_code, _sep, warehouse = frappe.safe_decode(member).partition(_SEPARATOR)
+			pairs_by_warehouse[warehouse].add(item_code)
+
+		_publish_stock_updates(pairs_by_warehouse)
+
+	while True:
+		pipe = frappe.cache().pipeline()
+		pipe.spop(raw_key(PENDING_DELTA_WAREHOUSES_KEY), STOCK_EVENT_CHUNK_SIZE)
+		warehouses = pipe.execute()[0]
+		if not warehouses:
+			break
+
+		for warehouse in warehouses:
+			_publish_stock_deltas(frappe.safe_decode(warehouse))
+
+
+def _publish_stock_deltas(warehouse):
+	"""Publish a warehouse's summed deltas, or a checkpoint every Nth event."""
+	delta_key = raw_key(f"{PENDING_DELTA_KEY_PREFIX}:{warehouse}")
+	pipe = frappe.cache().pipeline()
+	pipe.hgetall(delta_key)
+	pipe.delete(delta_key)
+	raw = pipe.execute()[0]
+	deltas = {
+		frappe.safe_decode(item_code): frappe.utils.flt(frappe.safe_decode(delta))
+		for item_code, delta in raw.items()
+	}
+	if not deltas:
+		return
+
+	count = frappe.cache().incr(raw_key(f"{DELTA_COUNT_KEY_PREFIX}:{warehouse}"))
+	if count % DELTA_CHECKPOINT_INTERVAL == 0:
+		_publish_stock_updates({warehouse: set(deltas)})
+		return
+
+	stock_updates = [
+		{"item_code": item_code, "warehouse": warehouse, "delta": delta}
+		for item_code, delta in sorted(deltas.items())
+		if delta
+	]
+	if stock_updates:
+		_publish(warehouse, stock_updates, STOCK_MODE_DELTA)
+
+
+def _publish_stock_updates(pairs_by_warehouse):
+	"""
+	Read stock for all pairs and publish per warehouse room.
+
+	Stock items are read from Bin with one query. Product Bundles have no Bin;
+	their availability is computed live from the components, since the
+	materialized bundle table is refreshed by a separate job that may not have
+	run yet for this sale.
+	"""
+	from pos_next.api.items import _compute_bundle_availability_bulk
+
+	item_codes = {code for codes in pairs_by_warehouse.values() for code in codes}
+	bundle_codes = set(
+		frappe.get_all(
+			"Product Bundle",
+			filters={"new_item_code": ["in", list(item_codes)]},
+			pluck="new_item_code",
+		)
+	)
+
+	stock_map = {}
+	stock_codes = item_codes - bundle_codes
+	if stock_codes:
+		stock_rows = frappe.db.sql(
+			"""
+			SELECT item_code, warehouse, actual_qty, reserved_qty
+			FROM `tabBin`
+			WHERE item_code IN %(item_codes)s
+			AND warehouse IN %(warehouses)s
+			""",
+			{"item_codes": tuple(stock_codes), "warehouses": tuple(pairs_by_warehouse)},
+			as_dict=1,
+		)
+		stock_map = {(row.item_code, row.warehouse): row for row in stock_rows}
+
+	for warehouse, codes in pairs_by_warehouse.items():
+		bundle_map = {}
+		if codes & bundle_codes:
+			bundle_map = _compute_bundle_availability_bulk(list(codes & bundle_codes), warehouse)
+
+		stock_updates = []
+		for item_code in sorted(codes):
+			if item_code in bundle_codes:
+				actual_qty = frappe.utils.flt(bundle_map.get(item_code))
+				reserved_qty = 0.0
+			else:
+				row = stock_map.get((item_code, warehouse))
+				actual_qty = frappe.utils.flt(row.actual_qty) if row else 0.0
+				reserved_qty = frappe.utils.flt(row.reserved_qty) if row else 0.0
+			stock_updates.append(
+				{
+					"item_code": item_code,
+					"warehouse": warehouse,
+					"actual_qty": actual_qty,
+					"stock_qty": actual_qty,
+					"reserved_qty": reserved_qty,
+					"available_qty": actual_qty - reserved_qty,
+				}
+			)
+
+		_publish(warehouse, stock_updates, STOCK_MODE_ABSOLUTE)
+
+
+def _publish(warehouse, stock_updates, mode):
+	message = {
+		"warehouses": [warehouse],
+		"stock_updates": stock_updates,
+		"mode": mode.lower(),
+		"timestamp": frappe.utils.now(),
+	}
+	# Stamps message["seq"] so terminals can detect and replay missed events
+	stock_events.record_event(warehouse, "pos_stock_update", message)
+
+	# Event name: pos_stock_update
+	# Published to the warehouse's document room; terminals subscribe with
+	# frappe.realtime.doc_subscribe("Warehouse", <profile warehouse>).
+	# Delta updates carry "delta" (signed stock_qty) instead of actual_qty.
+	frappe.publish_realtime(
+		event="pos_stock_update",
+		message=message,
+		doctype="Warehouse",
+		docname=warehouse,
+	)
+
+
+@measured("emit_invoice_created_event")
 def emit_invoice_created_event(doc, method=None):
 	"""
 	Emit real-time event when invoice is created.
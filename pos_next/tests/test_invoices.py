@@ -0,0 +1,195 @@
+# Copyright (c) 2026, BrainWise and Contributors
+# See license.txt
+
+import frappe
+from erpnext.accounts.doctype.pos_profile.test_pos_profile import make_pos_profile
+from erpnext.stock.doctype.item.test_item import make_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from pos_next.api.invoices import (
+	_collect_stock_errors,
+	_submit_invoice,
+	submit_invoice,
+	submit_invoices_bulk,
+)
+
+COMPANY = "_Test Company"
+WAREHOUSE = "_Test Warehouse - _TC"
+ITEM = "_Test POS Next Item"
+OTHER_ITEM = "_Test POS Next Other Item"
+NO_STOCK_ITEM = "_Test POS Next Item Without Stock"
+MIN_STOCK = 100
+
+
+def get_stock(item_code):
+	return flt(frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": WAREHOUSE}, "actual_qty"))
+
+
+def make_invoice_payload(item_code=ITEM, qty=1, rate=100, offline_id=None):
+	"""A POS sale as terminals send it to submit_invoice."""
+	invoice = {
+		"doctype": "Sales Invoice",
+		"company": COMPANY,
+		"customer": "_Test Customer",
+		"pos_profile": "_Test POS Profile",
+		"currency": "INR",
+		"selling_price_list": "_Test Price List",
+		"items": [
+			{
+				"item_code": item_code,
+				"qty": qty,
+				"rate": rate,
+				"uom": "Nos",
+				"conversion_factor": 1,
+				"warehouse": WAREHOUSE,
+			}
+		],
+		"payments": [{"mode_of_payment": "Cash", "amount": qty * rate}],
+	}
+	if offline_id:
+		invoice["posa_offline_id"] = offline_id
+	return invoice
+
+
+def get_invoices_for_offline_id(offline_id):
+	return frappe.get_all(
+		"Sales Invoice", filters={"posa_offline_id": offline_id}, fields=["name", "docstatus"]
+	)
+
+
+def delete_invoices(offline_ids):
+	"""Cancel and delete the invoices of these sales, returning their stock."""
+	for name in frappe.get_all("Sales Invoice", filters={"posa_offline_id": ["in", offline_ids]}, pluck="name"):
+		invoice = frappe.get_doc("Sales Invoice", name)
+		if invoice.docstatus == 1:
+			invoice.cancel()
+		frappe.delete_doc("Sales Invoice", name, force=True, ignore_permissions=True, delete_permanently=True)
+
+
+def make_test_fixtures():
+	"""Items, stock and a POS Profile shared by the invoice API tests."""
+	frappe.db.set_single_value("Stock Settings", "allow_negative_stock", 0)
+
+	for item_code in (ITEM, OTHER_ITEM, NO_STOCK_ITEM):
+		make_item(item_code, {"is_stock_item": 1, "stock_uom": "Nos"})
+
+	for item_code in (ITEM, OTHER_ITEM):
+		missing = MIN_STOCK - get_stock(item_code)
+		if missing > 0:
+			make_stock_entry(item_code=item_code, target=WAREHOUSE, qty=missing, basic_rate=50)
+
+	return make_pos_profile(company=COMPANY, warehouse=WAREHOUSE)
+
+
+class TestInvoices(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.pos_profile = make_test_fixtures()
+
+	def setUp(self):
+		self.committed_offline_ids = []
+
+	def tearDown(self):
+		# submit_invoices_bulk commits every invoice, out of reach of the test rollback
+		if self.committed_offline_ids:
+			delete_invoices(self.committed_offline_ids)
+			frappe.db.commit()
+
+	def test_stock_errors_sum_lines_of_the_same_item(self):
+		available = get_stock(ITEM)
+		errors = _collect_stock_errors(
+			[
+				{"item_code": ITEM, "warehouse": WAREHOUSE, "qty": available - 1},
+				{"item_code": ITEM, "warehouse": WAREHOUSE, "qty": 2},
+			]
+		)
+
+		self.assertEqual(len(errors), 1)
+		self.assertEqual(errors[0]["item_code"], ITEM)
+		self.assertEqual(flt(errors[0]["requested_qty"]), available + 1)
+		self.assertEqual(flt(errors[0]["available_qty"]), available)
+
+	def test_stock_errors_report_every_short_item(self):
+		errors = _collect_stock_errors(
+			[
+				{"item_code": ITEM, "warehouse": WAREHOUSE, "qty": 1},
+				{"item_code": OTHER_ITEM, "warehouse": WAREHOUSE, "qty": get_stock(OTHER_ITEM) + 1},
+				{"item_code": NO_STOCK_ITEM, "warehouse": WAREHOUSE, "qty": 1},
+			]
+		)
+
+		self.assertEqual({error["item_code"] for error in errors}, {OTHER_ITEM, NO_STOCK_ITEM})
+
+	def test_stock_errors_use_stock_uom_quantities(self):
+		available = get_stock(ITEM)
+		errors = _collect_stock_errors(
+			[{"item_code": ITEM, "warehouse": WAREHOUSE, "qty": 1, "conversion_factor": available + 1}]
+		)
+
+		self.assertEqual(len(errors), 1)
+		self.assertEqual(flt(errors[0]["requested_qty"]), available + 1)
+
+	def test_submit_replays_a_known_offline_id(self):
+		offline_id = frappe.generate_hash(length=20)
+
+		first = submit_invoice(invoice=make_invoice_payload(offline_id=offline_id), data={})
+		second = submit_invoice(invoice=make_invoice_payload(offline_id=offline_id), data={})
+
+		self.assertEqual(first["name"], second["name"])
+		self.assertFalse(first.get("replayed"))
+		self.assertTrue(second.get("replayed"))
+		self.assertEqual(get_invoices_for_offline_id(offline_id), [{"name": first["name"], "docstatus": 1}])
+
+	def test_replay_does_not_post_stock_twice(self):
+		offline_id = frappe.generate_hash(length=20)
+		before = get_stock(ITEM)
+
+		submit_invoice(invoice=make_invoice_payload(qty=2, offline_id=offline_id), data={})
+		submit_invoice(invoice=make_invoice_payload(qty=2, offline_id=offline_id), data={})
+
+		self.assertEqual(get_stock(ITEM), before - 2)
+
+	def test_bulk_submit_reports_failures_without_dropping_the_batch(self):
+		offline_ids = [frappe.generate_hash(length=20) for _ in range(3)]
+		self.committed_offline_ids.extend(offline_ids)
+		payloads = [
+			make_invoice_payload(offline_id=offline_ids[0]),
+			make_invoice_payload(item_code=NO_STOCK_ITEM, offline_id=offline_ids[1]),
+			make_invoice_payload(offline_id=offline_ids[2]),
+		]
+
+		results = submit_invoices_bulk([{"invoice": payload, "data": {}} for payload in payloads])
+
+		self.assertEqual([result["success"] for result in results], [True, False, True])
+		self.assertEqual([result["offline_id"] for result in results], offline_ids)
+		self.assertTrue(results[1]["error"])
+		self.assertEqual(len(get_invoices_for_offline_id(offline_ids[0])), 1)
+		self.assertEqual(get_invoices_for_offline_id(offline_ids[1]), [])
+		self.assertEqual(len(get_invoices_for_offline_id(offline_ids[2])), 1)
+
+	def test_failed_submit_rolls_back_only_its_own_work(self):
+		offline_id = frappe.generate_hash(length=20)
+		after_commit = frappe.db.after_commit
+
+		def marker():
+			pass
+
+		after_commit.add(marker)
+		queued_before = len(after_commit._functions)
+		try:
+			self.assertRaises(
+				frappe.ValidationError,
+				_submit_invoice,
+				make_invoice_payload(item_code=NO_STOCK_ITEM, offline_id=offline_id),
+				{},
+			)
+
+			# Work queued earlier in the transaction survives; the draft does not
+			self.assertEqual(len(after_commit._functions), queued_before)
+			self.assertIn(marker, after_commit._functions)
+			self.assertEqual(get_invoices_for_offline_id(offline_id), [])
+		finally:
+			after_commit.reset()
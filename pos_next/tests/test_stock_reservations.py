@@ -0,0 +1,52 @@
+# Copyright (c) 2026, BrainWise and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from pos_next.api.invoices import submit_invoice
+from pos_next.api.stock_reservations import get_reserved_by_others, sync_cart_reservation
+from pos_next.tests.test_invoices import (
+	ITEM,
+	OTHER_ITEM,
+	WAREHOUSE,
+	make_invoice_payload,
+	make_test_fixtures,
+)
+
+
+def enable_stock_reservations(pos_profile):
+	name = frappe.db.get_value("POS Settings", {"pos_profile": pos_profile})
+	settings = frappe.get_doc("POS Settings", name) if name else frappe.new_doc("POS Settings")
+	settings.update({"pos_profile": pos_profile, "enabled": 1, "enable_stock_reservations": 1})
+	settings.save()
+
+
+def cart_line(item_code, stock_qty):
+	return {"item_code": item_code, "warehouse": WAREHOUSE, "stock_qty": stock_qty}
+
+
+class TestStockReservations(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		cls.pos_profile = make_test_fixtures()
+		enable_stock_reservations(cls.pos_profile.name)
+
+	def test_cart_reservations_are_released(self):
+		reservation_id = frappe.generate_hash(length=20)
+		pairs = [(ITEM, WAREHOUSE), (OTHER_ITEM, WAREHOUSE)]
+
+		sync_cart_reservation(
+			reservation_id, self.pos_profile.name, [cart_line(ITEM, 2), cart_line(OTHER_ITEM, 3)]
+		)
+		self.assertEqual(get_reserved_by_others(pairs), {pairs[0]: 2, pairs[1]: 3})
+
+		# The cashier takes a line out of the cart
+		sync_cart_reservation(reservation_id, self.pos_profile.name, [cart_line(ITEM, 2)])
+		self.assertEqual(get_reserved_by_others(pairs), {pairs[0]: 2, pairs[1]: 0})
+
+		submit_invoice(invoice=make_invoice_payload(qty=2), data={"reservation_id": reservation_id})
+		# The submitted cart is released once the invoice commits
+		frappe.db.after_commit.run()
+		self.assertEqual(get_reserved_by_others(pairs), {pairs[0]: 0, pairs[1]: 0})
@@ -39,8 +39,21 @@ def item_query(doctype, txt, searchfield, start, page_len, filters):
 	values = []
 
 	if txt:
-		conditions.append(f"({searchfield} LIKE %s OR item_name LIKE %s)")
-		values.extend([f"%{txt}%", f"%{txt}%"])
+		from pos_next.api import item_search
+
+		# Use the token index when it finds the item, otherwise scan with LIKE
+		index_condition, index_values = (None, [])
+		if item_search.is_index_ready():
+			index_condition, index_values = item_search.get_search_condition(txt)
+
+		if index_condition and frappe.db.sql(
+			f"SELECT 1 FROM `tabItem` WHERE disabled = 0 AND {index_condition} LIMIT 1", index_values
+		):
+			conditions.append(index_condition)
+			values.extend(index_values)
+		else:
+			conditions.append(f"({searchfield} LIKE %s OR item_name LIKE %s)")
+			values.extend([f"%{txt}%", f"%{txt}%"])
 
 	company = filters.get("company") if filters else None
 